@@ -3,9 +3,6 @@
 # =========================
 import streamlit as st
 import pandas as pd
-import joblib
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import TfidfVectorizer
 import sys, os
 
 st.caption("🚀 Build SIGMA-Q 2025-11-07-Rev3")
@@ -16,33 +13,31 @@ if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
 # --- Importações internas do SIGMA-Q ---
-from utils.atualizador import carregar_base, monitorar_base
-from utils.logger import registrar_classificacoes
-from utils.model_manager import carregar_modelos, verificar_modelos
-from utils.auto_updater import verificar_atualizacao
+from utils.atualizador import DEFAULT_PATH
+from utils.logger import registrar_classificacoes, log_disponivel, contar_registros, carregar_log, lotes_log, limpar_log
+from utils.model_manager import carregar_modelos, verificar_modelos, versao_modelos, modelo_disponivel
+from utils import registro_modelos
+from utils.observador_base import obter_observador
+from utils.retrain import iniciar_treinamento, status_treinamento, treinamento_em_andamento, EM_ANDAMENTO, CONCLUIDO, ERRO, MODO_SELECAO
+from utils.text_normalizer import detectar_coluna_texto
+from utils.servico_dados import obter_conjunto, versao_publicada
+from utils import exportacao
+from utils.ingestao_delta import COL_HASH
+from utils.servidor_inferencia import obter_cliente
+from utils.compactacao import relatorio_memoria
+from utils.agregados import obter_agregados
+from utils.similaridade import obter_indice
+from utils.selecao_modelo import ultimo_relatorio
+from utils.lazy import importar_tardio
+from utils.instrumentacao import etapa, iniciar_execucao, finalizar_execucao
+
+# Medições de tempo por etapa desta execução do script
+iniciar_execucao()
+
+# --- Bibliotecas pesadas: importadas só quando o gráfico é desenhado ---
+plt = importar_tardio("matplotlib.pyplot")
+alt = importar_tardio("altair")
 
-# Adiciona a pasta raiz ao caminho do Python
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-from utils.atualizador import carregar_base, monitorar_base
-from utils.logger import registrar_classificacoes
-from utils.auto_updater import verificar_atualizacao
-
-
-
-# Verifica alterações na base oficial do Quality Control
-if os.path.exists("data/base_de_dados_unificada.xlsx"):
-    ultima_modificacao = os.path.getmtime("data/base_de_dados_unificada.xlsx")
-    atualizado, ultima_modificacao = verificar_atualizacao("data/base_de_dados_unificada.xlsx", ultima_modificacao)
-
-else:
-    ultima_modificacao = None
-    atualizado = False
-
-
-if atualizado:
-    df = carregar_base()
-    st.experimental_rerun()
 
 
 # =========================
@@ -63,9 +58,9 @@ st.sidebar.header("📊 Status do Sistema")
 # Verifica a base oficial
 base_ok = os.path.exists("data/base_de_dados_unificada.xlsx")
 
-modelo_ok = os.path.exists("model/modelo_classificacao.pkl")
-vet_ok = os.path.exists("model/vectorizer.pkl")
-log_ok = os.path.exists("data/logs/log_classificacoes.xlsx")
+# O vetorizador TF-IDF vem embutido no pacote (ou no Pipeline .pkl antigo)
+modelo_ok = modelo_disponivel()
+log_ok = log_disponivel()
 
 # Indicadores de status
 if base_ok:
@@ -73,12 +68,12 @@ if base_ok:
 else:
     st.sidebar.error("❌ Base de dados não encontrada")
 
-if modelo_ok and vet_ok:
+if modelo_ok:
     st.sidebar.success("💾 Modelos prontos para uso")
 else:
     st.sidebar.warning("⚠️ Modelos ausentes – treine novamente")
 
-if modelo_ok and vet_ok:
+if modelo_ok:
     st.sidebar.info("🧠 Modelos carregados")
 else:
     st.sidebar.warning("📦 Aguardando treinamento...")
@@ -94,8 +89,7 @@ if base_ok:
 # Histórico de acurácia
 if log_ok:
     try:
-        df_log = pd.read_excel("data/logs/log_classificacoes.xlsx")
-        total_registros = len(df_log)
+        total_registros = contar_registros()
         st.sidebar.metric("Classificações registradas", total_registros)
     except:
         st.sidebar.metric("Classificações registradas", "N/A")
@@ -111,16 +105,41 @@ if st.sidebar.button("💾 Exportar Log de Classificações"):
     if log_ok:
         from datetime import datetime
         destino = f"data/logs/export_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        import shutil
-        shutil.copy("data/logs/log_classificacoes.xlsx", destino)
-        st.sidebar.success(f"📤 Log exportado como {destino}")
+        # Gravado em segundo plano, partição a partição (progresso abaixo)
+        tarefa = exportacao.iniciar_exportacao(lotes_log(), destino, total=contar_registros())
+        st.session_state.setdefault("exportacoes", []).append(tarefa.id)
     else:
         st.sidebar.warning("⚠️ Nenhum log disponível para exportar.")
 
+
+@st.fragment(run_every=2)
+def painel_exportacoes():
+    """
+    Progresso das exportações disparadas nesta sessão (rodam em uma thread
+    de trabalho; o dashboard continua respondendo).
+    """
+    for tarefa_id in st.session_state.get("exportacoes", [])[-5:]:
+        tarefa = exportacao.obter_exportacao(tarefa_id)
+        if tarefa is None:
+            continue
+        if tarefa.estado == exportacao.EM_ANDAMENTO:
+            st.progress(tarefa.progresso, text=tarefa.mensagem)
+            if st.button("⏹️ Cancelar", key=f"cancelar_{tarefa.id}"):
+                tarefa.cancelar()
+        elif tarefa.estado == exportacao.CONCLUIDO:
+            st.success(f"{tarefa.mensagem} ({tarefa.segundos:.1f}s)")
+        elif tarefa.estado == exportacao.ERRO:
+            st.error(tarefa.mensagem)
+        else:
+            st.info(tarefa.mensagem)
+
+
+with st.sidebar:
+    painel_exportacoes()
+
 if st.sidebar.button("🧹 Limpar Histórico de Logs"):
     if log_ok:
-        import os
-        os.remove("data/logs/log_classificacoes.xlsx")
+        limpar_log()
         st.sidebar.success("🧾 Histórico de logs limpo.")
         st.rerun()
     else:
@@ -129,12 +148,120 @@ if st.sidebar.button("🧹 Limpar Histórico de Logs"):
 # --- TREINAMENTO DIRETO ---
 st.sidebar.header("🧠 Treinamento do Modelo")
 
-if st.sidebar.button("Treinar Modelo de IA"):
-    from utils.model_trainer import treinar_modelo
-    modelo, vetorizador = treinar_modelo()
-    if modelo:
-        st.sidebar.success("✅ Modelo treinado com sucesso!")
-        st.rerun()
+if st.sidebar.button("Treinar Modelo de IA", disabled=treinamento_em_andamento()):
+    if iniciar_treinamento():
+        st.sidebar.info("🚀 Treinamento iniciado em segundo plano.")
+    else:
+        st.sidebar.warning("⏳ Já existe um treinamento em andamento.")
+
+# Busca de hiperparâmetros com validação cruzada; promove o vencedor se superar o atual
+if st.sidebar.button("🔬 Seleção de Modelo (busca de hiperparâmetros)", disabled=treinamento_em_andamento()):
+    if iniciar_treinamento(MODO_SELECAO):
+        st.sidebar.info("🔬 Seleção de modelo iniciada em segundo plano.")
+    else:
+        st.sidebar.warning("⏳ Já existe um treinamento em andamento.")
+
+
+@st.fragment(run_every=2)
+def painel_treinamento():
+    """
+    Acompanha o treinamento em segundo plano sem bloquear o dashboard.
+    Quando o job termina, o app é recarregado uma vez com o novo modelo.
+    """
+    status = status_treinamento()
+    if not status:
+        return
+
+    if status["estado"] == EM_ANDAMENTO:
+        st.session_state["treino_acompanhado"] = status.get("job_id")
+        st.progress(status.get("progresso", 0.0), text=status.get("mensagem", ""))
+        st.caption("O dashboard continua usando o modelo anterior até o fim do treinamento.")
+        return
+
+    if status["estado"] == CONCLUIDO:
+        st.success(status.get("mensagem", "✅ Modelo treinado com sucesso!"))
+    elif status["estado"] == ERRO:
+        st.error(status.get("mensagem", "❌ Erro durante o treinamento."))
+
+    # Recarrega o app uma única vez quando o job acompanhado termina
+    if st.session_state.get("treino_acompanhado") == status.get("job_id"):
+        st.session_state["treino_acompanhado"] = None
+        if status["estado"] == CONCLUIDO:
+            st.rerun(scope="app")
+
+
+with st.sidebar:
+    painel_treinamento()
+
+# Resultado da última seleção de modelo (relatório em data/logs/selecao)
+relatorio_selecao = ultimo_relatorio()
+if relatorio_selecao is not None:
+    with st.sidebar.expander("🔬 Última seleção de modelo"):
+        resumo_selecao = relatorio_selecao["resumo"]
+        st.caption(
+            f"{resumo_selecao['id']} — {resumo_selecao['candidatos']} candidatos ({resumo_selecao['modo']}), "
+            f"{'promovido' if resumo_selecao['promovido'] else 'modelo atual mantido'}"
+        )
+        st.write(f"🏆 {resumo_selecao['melhor_candidato']}")
+        f1_atual = resumo_selecao["f1_macro_teste_atual"]
+        st.metric(
+            "F1 macro (teste)", resumo_selecao["f1_macro_teste"],
+            None if f1_atual is None else round(resumo_selecao["f1_macro_teste"] - f1_atual, 4),
+        )
+        st.dataframe(relatorio_selecao["candidatos"].head(10), hide_index=True, use_container_width=True)
+        st.dataframe(relatorio_selecao["por_classe"], hide_index=True, use_container_width=True)
+
+# =========================
+# REGISTRO DE MODELOS
+# =========================
+# Últimos pacotes treinados; promover/reverter só troca o ponteiro do ativo
+# (ativo, candidato e anterior já estão carregados na memória)
+estado_registro = registro_modelos.situacao()
+if estado_registro["modelos"]:
+    with st.sidebar.expander("🗂️ Registro de modelos"):
+        st.caption(f"Ativo: {estado_registro['ativo'] or '— (.pkl)'} · Candidato: {estado_registro['candidato'] or '—'}")
+        st.dataframe(registro_modelos.listar(), hide_index=True, use_container_width=True)
+
+        sombra = registro_modelos.resultado_sombra()
+        if sombra and sombra.get("em_andamento"):
+            st.caption(f"🌓 Avaliando o candidato {sombra['candidato']} em sombra...")
+        elif sombra and sombra.get("concordancia") is not None:
+            texto_sombra = f"🌓 Candidato {sombra['candidato']} em sombra ({sombra['linhas']} linhas): concordância {sombra['concordancia']:.1%}"
+            if "acuracia_candidato" in sombra:
+                texto_sombra += f", acurácia {sombra['acuracia_ativo']:.1%} → {sombra['acuracia_candidato']:.1%}"
+            st.caption(texto_sombra)
+
+        col_promover, col_reverter = st.columns(2)
+        if col_promover.button("⬆️ Promover candidato", disabled=estado_registro["candidato"] is None):
+            registro_modelos.promover()
+            st.rerun()
+        if col_reverter.button("↩️ Reverter", disabled=estado_registro["anterior"] is None):
+            registro_modelos.reverter()
+            st.rerun()
+
+# =========================
+# OBSERVADOR DA BASE OFICIAL
+# =========================
+# Thread única por processo (inotify ou polling) com debounce; a cada nova
+# versão o serviço de dados reconstrói a base compartilhada em segundo plano
+# e cada sessão recarrega o app uma vez quando ela é publicada
+observador_base = obter_observador(DEFAULT_PATH)
+st.session_state.setdefault("versao_base_vista", versao_publicada())
+
+
+@st.fragment(run_every=2)
+def acompanhar_base():
+    """
+    Recarrega o dashboard quando o serviço de dados publica uma nova versão.
+    """
+    if versao_publicada() > st.session_state["versao_base_vista"]:
+        st.session_state["versao_base_vista"] = versao_publicada()
+        st.toast("📂 Nova versão dos dados! Recarregando...")
+        st.rerun(scope="app")
+
+
+with st.sidebar:
+    acompanhar_base()
 
 st.sidebar.divider()
 st.sidebar.subheader("📡 Status do Sistema")
@@ -146,7 +273,6 @@ else:
     st.sidebar.warning("⚠️ Base ausente")
 
 # Status dos modelos
-from utils.model_manager import verificar_modelos
 if verificar_modelos():
     st.sidebar.success("🧠 Modelos carregados")
 else:
@@ -170,8 +296,18 @@ with st.spinner("📥 Carregando base oficial (oculta)..."):
   # =========================
 # CARREGAMENTO DA BASE DE DADOS (com debug)
 # =========================
+# Base compartilhada por todas as sessões: lida e normalizada uma única vez
+# por versão dos dados; aqui a sessão só recebe uma visão somente leitura
 try:
-    df = carregar_base(usecols=usecols)
+    with etapa("base_compartilhada") as medicao:
+        conjunto = obter_conjunto(usecols=usecols)
+        df = conjunto.df
+        medicao["linhas"] = len(df)
+    st.write(f"📂 Caminho da base: {DEFAULT_PATH}")
+    st.success(f"⚡ Base carregada ({len(df)} registros, {len(df.columns)} colunas, versão {conjunto.versao_dados}).")
+except FileNotFoundError as e:
+    st.error(f"❌ {e}")
+    st.stop()
 except Exception as e:
     import traceback
     st.error("❌ Erro ao carregar base:")
@@ -181,14 +317,11 @@ except Exception as e:
     # =========================
 # TREINAMENTO AUTOMÁTICO DO MODELO (se não existir)
 # =========================
-from utils.model_manager import verificar_modelos
-from utils.model_trainer import treinar_modelo
-
 if not verificar_modelos():
-    st.info("🧠 Nenhum modelo encontrado — iniciando treinamento automático...")
-    modelo, vetorizador = treinar_modelo()
-    if modelo:
-        st.success("✅ Treinamento automático concluído com sucesso!")
+    if treinamento_em_andamento():
+        st.info("⏳ Treinamento automático em andamento — acompanhe o progresso na barra lateral.")
+    elif base_ok and iniciar_treinamento():
+        st.info("🧠 Nenhum modelo encontrado — treinamento automático iniciado em segundo plano.")
 
 
 # NÃO exibir df completo no front-end!
@@ -198,40 +331,20 @@ st.info("🔒 Base oficial carregada internamente. Dados linha-a-linha não são
 if st.checkbox("Mostrar amostra segura (5 linhas) - uso interno", value=False):
     st.dataframe(df.head(5), use_container_width=True)
 
+# Memória ocupada por coluna (base compactada pelo carregador)
+if st.checkbox("Mostrar uso de memória por coluna - uso interno", value=False):
+    st.dataframe(relatorio_memoria(df), use_container_width=True)
+
 # Mostrar somentes agregados/contagens úteis para o usuário
 st.subheader("🔎 Visão resumida (agregados)")
 col1, col2, col3 = st.columns(3)
 col1.metric("Total de Registros (Base oficial)", len(df))
-col2.metric("Categorias distintas", df["CATEGORIA"].nunique() if "CATEGORIA" in df.columns else "N/A")
-col3.metric("Motivos distintos", df["MOTIVO"].nunique() if "MOTIVO" in df.columns else "N/A")
-
-# Verificação automática (em segundo plano)
-atualizado, _ = monitorar_base(intervalo=15)
-if atualizado:
-    st.rerun()
-
-from utils.text_processor import preprocessar_dataframe
+# Preenchidos pela camada de agregados, depois da classificação
+resumo_categorias, resumo_motivos = col2.empty(), col3.empty()
 
 # Garantir nome de coluna correto (tolerância a variações)
-col_ops = [
-    "DESCRICAO_DA_FALHA", 
-    "DESCRIÇÃO_DA_FALHA",
-    "DESCRICAO",
-    "DESCRICAO_DA_FALHA",
-    "DESC_FALHA",      # ← versão sem ponto
-    "DESC._FALHA",     # ← versão com ponto (como na sua planilha)
-]
-
-for c in col_ops:
-    if c in df.columns:
-        col_text = c
-        break
-
-if col_text:
-    df = preprocessar_dataframe(df, coluna_texto=col_text)
-    if st.checkbox("Mostrar preview de textos processados", value=False):
-        st.dataframe(df[[col_text, "TEXTO_PROCESSADO"]].head(5))
-else:
+col_text = detectar_coluna_texto(df)
+if not col_text:
     st.warning("⚠️ Coluna de texto para pré-processamento não encontrada.")
 
 
@@ -240,32 +353,24 @@ else:
 # =========================
 st.header("🤖 Classificação Automática")
 
-from utils.model_manager import carregar_modelos, verificar_modelos
-
 # Verifica se os modelos estão disponíveis
 if not verificar_modelos():
     st.warning("⚠️ Nenhum modelo de IA encontrado. Treine o modelo antes de continuar.")
     st.stop()
 
-# Carrega modelo e vetorizador
-modelo, vetorizador = carregar_modelos()
-
-# Normaliza os nomes das colunas
-df.columns = (
-    df.columns.str.strip()
-              .str.upper()
-              .str.replace("Ç", "C")
-              .str.replace("Ã", "A")
-              .str.replace("Õ", "O")
-              .str.replace(" ", "_")
-)
+# Usa o serviço local de inferência quando configurado (SIGMAQ_INFERENCIA);
+# caso contrário, carrega modelo e vetorizador neste processo
+cliente_inferencia = obter_cliente()
+if cliente_inferencia is not None:
+    modelo, vetorizador = cliente_inferencia, None
+    versao_modelo = cliente_inferencia.versao_modelo()
+    st.sidebar.success(f"🛰️ Inferência via serviço local ({cliente_inferencia.endereco})")
+else:
+    modelo, vetorizador = carregar_modelos()
+    versao_modelo = versao_modelos()
 
-# Verifica se existe uma coluna de descrição de falha
-col_text = None
-for c in ["DESCRICAO_DA_FALHA", "DESC_FALHA", "DESC._FALHA", "DESCRICAO"]:
-    if c in df.columns:
-        col_text = c
-        break
+# Colunas já normalizadas pelo carregador; coluna de descrição da falha
+col_text = conjunto.col_texto
 
 if not col_text:
     st.warning("⚠️ Nenhuma coluna de texto encontrada para classificação automática.")
@@ -274,36 +379,61 @@ if not col_text:
 # =========================
 # EXECUTA A CLASSIFICAÇÃO
 # =========================
-descricoes = df[col_text].astype(str)
-
 with st.spinner("🧠 Classificando falhas..."):
-    try:
-        # Se o modelo for um Pipeline (TF-IDF + Classificador), ele já faz o transform internamente
-        predicoes = modelo.predict(descricoes)
-    except Exception:
-        # Caso o modelo seja apenas o classificador e precise do vetor separadamente
-        X_tfidf = vetorizador.transform(descricoes)
-        predicoes = modelo.predict(X_tfidf)
+    # Uma classificação por (versão dos dados, versão do modelo) no processo,
+    # só das linhas novas ou alteradas (ver ingestao_delta); as outras
+    # sessões recebem a mesma base classificada
+    with etapa("classificacao_compartilhada") as medicao:
+        conjunto = obter_conjunto(usecols=usecols, modelo=modelo, vetorizador=vetorizador, versao_modelo=versao_modelo)
+        df = conjunto.df
+        medicao["linhas"] = len(df)
+    st.session_state["versao_base_vista"] = max(st.session_state["versao_base_vista"], conjunto.versao)
+
+delta = conjunto.delta or {"novas": 0, "reclassificadas": 0}
+if delta["novas"] or delta["reclassificadas"]:
+    st.caption(f"🔁 {delta['novas']} linhas novas/alteradas processadas, {delta['reclassificadas']} reclassificadas.")
+
+# Candidato do registro avaliado em sombra sobre a base atual (thread, não bloqueia)
+if cliente_inferencia is None:
+    registro_modelos.iniciar_sombra(
+        df[col_text], df["CATEGORIA_PREDITA"], df["CATEGORIA"] if "CATEGORIA" in df.columns else None,
+        versao_dados=conjunto.versao_dados,
+    )
+
+if st.checkbox("Mostrar preview de textos processados", value=False):
+    st.dataframe(df[[col_text, "TEXTO_PROCESSADO"]].head(5))
 
-    # Atribui as previsões ao DataFrame
-    df["CATEGORIA_PREDITA"] = predicoes
+# =========================
+# AGREGADOS DO DASHBOARD
+# =========================
+# Calculados uma única vez por (versão dos dados, versão do modelo);
+# os gráficos abaixo leem apenas estas tabelas pequenas
+agregados, _ = obter_agregados(df, col_text, conjunto.versao_dados, versao_modelo)
+kpis = agregados["kpis"]
+contagem_categorias = agregados["por_categoria"].set_index("CATEGORIA_PREDITA")["TOTAL"]
+contagem_modelos = (
+    agregados["por_modelo"].set_index("MODELO")["TOTAL"] if "por_modelo" in agregados else None
+)
+
+def _valor_kpi(valor):
+    return "N/A" if valor is None else valor
+
+resumo_categorias.metric("Categorias distintas", _valor_kpi(kpis["categorias_distintas"]))
+resumo_motivos.metric("Motivos distintos", _valor_kpi(kpis["motivos_distintos"]))
 
 # Exibe resultados
 st.success("✅ Classificação concluída com sucesso!")
 st.subheader("Top categorias previstas")
-st.table(df["CATEGORIA_PREDITA"].value_counts().head(10))
+st.table(contagem_categorias.head(10))
 
 
 # Exemplo seguro (até 3 registros por categoria)
 st.subheader("Exemplos (segurança) — até 3 por categoria")
-sample_preview = df.groupby("CATEGORIA_PREDITA").head(3)[[col_text, "CATEGORIA_PREDITA"]]
-st.table(sample_preview)
+st.table(agregados["exemplos"])
 
 # =========================
 # REGISTRO AUTOMÁTICO DE CLASSIFICAÇÕES
 # =========================
-from utils.logger import registrar_classificacoes
-
 try:
     # Detecta automaticamente a coluna correta de falha
     col_falha = None
@@ -327,222 +457,250 @@ except Exception as e:
 # =========================
 st.header("📈 Análise e Visualização de Desempenho")
 
-try:
-    # Se o DataFrame atual tiver classificação
-    if "CATEGORIA_PREDITA" in df.columns:
-        st.subheader("📊 Distribuição de Defeitos por Categoria Predita")
-        contagem = df["CATEGORIA_PREDITA"].value_counts()
-        st.bar_chart(contagem)
-
-        # Gráfico por modelo
-        if "MODELO" in df.columns:
-            st.subheader("🏭 Quantidade de Defeitos por Modelo")
-            modelo_counts = df["MODELO"].value_counts()
-            st.bar_chart(modelo_counts)
-
-        # KPIs
-        st.subheader("📌 Indicadores Gerais")
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total de Registros", len(df))
-        col2.metric("Categorias Distintas", df["CATEGORIA_PREDITA"].nunique())
-        col3.metric("Última Atualização", pd.Timestamp.now().strftime("%d/%m/%Y %H:%M"))
+with etapa("graficos_analise"):
+    try:
+        # Se o DataFrame atual tiver classificação
+        if "CATEGORIA_PREDITA" in df.columns:
+            st.subheader("📊 Distribuição de Defeitos por Categoria Predita")
+            st.bar_chart(contagem_categorias)
+
+            # Gráfico por modelo
+            if contagem_modelos is not None:
+                st.subheader("🏭 Quantidade de Defeitos por Modelo")
+                st.bar_chart(contagem_modelos.sort_values(ascending=False))
+
+            # KPIs
+            st.subheader("📌 Indicadores Gerais")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total de Registros", kpis["total_registros"])
+            col2.metric("Categorias Distintas", kpis["categorias_preditas"])
+            col3.metric("Última Atualização", pd.Timestamp.now().strftime("%d/%m/%Y %H:%M"))
 
-except Exception as e:
-    st.error(f"❌ Erro ao gerar visualizações: {e}")
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar visualizações: {e}")
 
 # =========================
 # 🕒 HISTÓRICO DE CLASSIFICAÇÕES (versão aprimorada)
 # =========================
-import altair as alt
-from datetime import datetime, timedelta
+with etapa("graficos_historico"):
+    if log_disponivel():
+        st.subheader("🕒 Histórico de Classificações")
 
+        try:
+            log_df = carregar_log(colunas=["DATA_LOG", "CATEGORIA_PREDITA"])
 
-log_path = os.path.join("data", "logs", "log_classificacoes.xlsx")
-
-if os.path.exists(log_path):
-    st.subheader("🕒 Histórico de Classificações")
-
-    try:
-        log_df = pd.read_excel(log_path)
+            # Verifica e converte coluna de data
+            if "DATA_LOG" not in log_df.columns:
+                st.warning("⚠️ A coluna 'DATA_LOG' não foi encontrada no log.")
+            else:
+                log_df["DATA_LOG"] = pd.to_datetime(log_df["DATA_LOG"], errors="coerce")
+                log_df = log_df.dropna(subset=["DATA_LOG"])
+                log_df["DIA"] = log_df["DATA_LOG"].dt.date
+
+                # Agrupa registros por dia
+                historico = log_df.groupby("DIA").size().reset_index(name="TOTAL")
+
+                # Calcula média móvel de 7 dias (se houver dados suficientes)
+                if len(historico) >= 7:
+                    historico["MEDIA_MOVEL"] = (
+                        historico["TOTAL"].rolling(window=7, min_periods=1).mean()
+                    )
+                else:
+                    historico["MEDIA_MOVEL"] = historico["TOTAL"]
+
+                # Define cores dinâmicas conforme volume
+                color_scale = alt.Scale(
+                    domain=[historico["TOTAL"].min(), historico["TOTAL"].max()],
+                    scheme="blues"
+                )
 
-        # Verifica e converte coluna de data
-        if "DATA_LOG" not in log_df.columns:
-            st.warning("⚠️ A coluna 'DATA_LOG' não foi encontrada no log.")
-        else:
-            log_df["DATA_LOG"] = pd.to_datetime(log_df["DATA_LOG"], errors="coerce")
-            log_df = log_df.dropna(subset=["DATA_LOG"])
-            log_df["DIA"] = log_df["DATA_LOG"].dt.date
+                # Cria gráfico com Altair
+                chart = (
+                    alt.Chart(historico)
+                    .mark_bar(size=20)
+                    .encode(
+                        x=alt.X("DIA:T", title="Data", axis=alt.Axis(format="%d/%m")),
+                        y=alt.Y("TOTAL:Q", title="Classificações"),
+                        color=alt.Color("TOTAL:Q", scale=color_scale, legend=None),
+                        tooltip=[
+                            alt.Tooltip("DIA:T", title="Data", format="%d/%m/%Y"),
+                            alt.Tooltip("TOTAL:Q", title="Total de Registros"),
+                            alt.Tooltip("MEDIA_MOVEL:Q", title="Média móvel (7 dias)", format=".1f")
+                        ],
+                    )
+                )
 
-            # Agrupa registros por dia
-            historico = log_df.groupby("DIA").size().reset_index(name="TOTAL")
+                # Linha da média móvel
+                line = (
+                    alt.Chart(historico)
+                    .mark_line(color="orange", strokeWidth=2)
+                    .encode(x="DIA:T", y="MEDIA_MOVEL:Q")
+                )
 
-            # Calcula média móvel de 7 dias (se houver dados suficientes)
-            if len(historico) >= 7:
-                historico["MEDIA_MOVEL"] = (
-                    historico["TOTAL"].rolling(window=7, min_periods=1).mean()
+                # Combina gráfico de barras + linha
+                final_chart = (chart + line).properties(
+                    width="container",
+                    height=300,
+                    title="Tendência de Classificações Diárias (com média móvel de 7 dias)",
                 )
-            else:
-                historico["MEDIA_MOVEL"] = historico["TOTAL"]
 
-            # Define cores dinâmicas conforme volume
-            color_scale = alt.Scale(
-                domain=[historico["TOTAL"].min(), historico["TOTAL"].max()],
-                scheme="blues"
-            )
+                st.altair_chart(final_chart, use_container_width=True)
 
-            # Cria gráfico com Altair
-            chart = (
-                alt.Chart(historico)
-                .mark_bar(size=20)
-                .encode(
-                    x=alt.X("DIA:T", title="Data", axis=alt.Axis(format="%d/%m")),
-                    y=alt.Y("TOTAL:Q", title="Classificações"),
-                    color=alt.Color("TOTAL:Q", scale=color_scale, legend=None),
-                    tooltip=[
-                        alt.Tooltip("DIA:T", title="Data", format="%d/%m/%Y"),
-                        alt.Tooltip("TOTAL:Q", title="Total de Registros"),
-                        alt.Tooltip("MEDIA_MOVEL:Q", title="Média móvel (7 dias)", format=".1f")
-                    ],
+                # KPIs do histórico
+                st.markdown("### 📊 Indicadores Gerais")
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Total de Registros", len(log_df))
+                col2.metric("Categorias Distintas", log_df["CATEGORIA_PREDITA"].nunique())
+                col3.metric(
+                    "Última Atualização",
+                    log_df["DATA_LOG"].max().strftime("%d/%m/%Y %H:%M"),
                 )
-            )
 
-            # Linha da média móvel
-            line = (
-                alt.Chart(historico)
-                .mark_line(color="orange", strokeWidth=2)
-                .encode(x="DIA:T", y="MEDIA_MOVEL:Q")
-            )
+        except Exception as e:
+            st.error(f"❌ Erro ao carregar histórico: {e}")
 
-            # Combina gráfico de barras + linha
-            final_chart = (chart + line).properties(
-                width="container",
-                height=300,
-                title="Tendência de Classificações Diárias (com média móvel de 7 dias)",
-            )
+    else:
+        st.info("ℹ️ Nenhum histórico de classificações encontrado ainda.")
 
-            st.altair_chart(final_chart, use_container_width=True)
 
-            # KPIs do histórico
-            st.markdown("### 📊 Indicadores Gerais")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total de Registros", len(log_df))
-            col2.metric("Categorias Distintas", log_df["CATEGORIA_PREDITA"].nunique())
-            col3.metric(
-                "Última Atualização",
-                log_df["DATA_LOG"].max().strftime("%d/%m/%Y %H:%M"),
-            )
 
-    except Exception as e:
-        st.error(f"❌ Erro ao carregar histórico: {e}")
+# =========================
+# 🔎 DEFEITOS SIMILARES
+# =========================
+st.header("🔎 Defeitos Similares")
 
-else:
-    st.info("ℹ️ Nenhum histórico de classificações encontrado ainda.")
+# O índice é montado na primeira consulta e depois só recebe as linhas novas
+consulta_similar = st.text_input("Descreva a falha para buscar os casos mais parecidos do histórico")
+k_similares = st.slider("Quantidade de resultados", min_value=5, max_value=50, value=10)
 
+if consulta_similar.strip():
+    with etapa("similares"):
+        indice_similares = obter_indice(
+            df, col_text, modelo, vetorizador,
+            versao_modelo=versao_modelo, versao_dados=conjunto.versao_dados,
+        )
+        similares = indice_similares.buscar(consulta_similar, k=k_similares)
 
+    if similares.empty:
+        st.info("ℹ️ Nenhum defeito similar encontrado no histórico.")
+    else:
+        st.dataframe(similares, hide_index=True, use_container_width=True)
 
 # =========================
 # EXPORTAR RESULTADOS
 # =========================
 st.header("💾 Exportar Resultados")
 
+formato_saida = st.radio("Formato", exportacao.FORMATOS, horizontal=True)
+
 if st.button("Salvar base classificada"):
-    saida = "data/base_classificada.xlsx"
-    df.to_excel(saida, index=False)
-    st.success(f"📁 Base salva em: `{saida}`")
+    saida = f"data/base_classificada.{formato_saida}"
+    # Exportação em segundo plano, lote a lote, direto da tabela Arrow
+    # compartilhada; o arquivo só aparece completo
+    tarefa = exportacao.iniciar_exportacao(
+        conjunto.tabela if conjunto.tabela is not None else df, saida,
+        colunas=[c for c in df.columns if c != COL_HASH],
+    )
+    st.session_state.setdefault("exportacoes", []).append(tarefa.id)
+    st.info(f"⏳ Salvando a base em `{saida}` — acompanhe o progresso na barra lateral.")
 
    # =========================
 # RELATÓRIOS TÉCNICOS (ETAPA 7.1)
 # =========================
 st.header("📊 Relatórios Técnicos de Produção")
 
-if "CATEGORIA_PREDITA" in df.columns:
-    tab1, tab2, tab3 = st.tabs(["📈 Visão Geral", "📦 Por Modelo", "🔍 Análises Detalhadas"])
-# --- 📈 Visão Geral ---
-with tab1:
-    st.subheader("📊 Distribuição de Ocorrências por Categoria e Modelo")
-
-    # Cria layout em colunas
-    col1, col2 = st.columns([2, 1])
-
-    # ----- COLUNA 1 → GRÁFICO DE BARRAS -----
-    with col1:
-        st.markdown("### 📦 Quantidade de Ocorrências por Categoria")
-        st.bar_chart(df["CATEGORIA_PREDITA"].value_counts())
-
-    # ----- COLUNA 2 → GRÁFICO DE PIZZA -----
-    with col2:
-        st.markdown("### 🥧 Proporção de Ocorrências")
-        cat_counts = df["CATEGORIA_PREDITA"].value_counts()
-
-        import matplotlib.pyplot as plt
-        colors = plt.cm.tab20.colors
-        explode = [0.05 if i == 0 else 0.02 for i in range(len(cat_counts))]
-
-        fig, ax = plt.subplots(figsize=(4, 4), facecolor="#0e1117")
-        wedges, texts, autotexts = ax.pie(
-            cat_counts,
-            autopct="%1.1f%%",
-            startangle=90,
-            colors=colors,
-            pctdistance=0.8,
-            explode=explode,
-            wedgeprops={"edgecolor": "white", "linewidth": 1, "antialiased": True},
-            textprops={"fontsize": 9, "color": "white", "weight": "bold"}
-        )
+with etapa("graficos_relatorios"):
+    if "CATEGORIA_PREDITA" in df.columns:
+        tab1, tab2, tab3 = st.tabs(["📈 Visão Geral", "📦 Por Modelo", "🔍 Análises Detalhadas"])
+    # --- 📈 Visão Geral ---
+    with tab1:
+        st.subheader("📊 Distribuição de Ocorrências por Categoria e Modelo")
+
+        # Cria layout em colunas
+        col1, col2 = st.columns([2, 1])
+
+        # ----- COLUNA 1 → GRÁFICO DE BARRAS -----
+        with col1:
+            st.markdown("### 📦 Quantidade de Ocorrências por Categoria")
+            st.bar_chart(contagem_categorias)
+
+        # ----- COLUNA 2 → GRÁFICO DE PIZZA -----
+        with col2:
+            st.markdown("### 🥧 Proporção de Ocorrências")
+            cat_counts = contagem_categorias
+
+            colors = plt.cm.tab20.colors
+            explode = [0.05 if i == 0 else 0.02 for i in range(len(cat_counts))]
+
+            fig, ax = plt.subplots(figsize=(4, 4), facecolor="#0e1117")
+            wedges, texts, autotexts = ax.pie(
+                cat_counts,
+                autopct="%1.1f%%",
+                startangle=90,
+                colors=colors,
+                pctdistance=0.8,
+                explode=explode,
+                wedgeprops={"edgecolor": "white", "linewidth": 1, "antialiased": True},
+                textprops={"fontsize": 9, "color": "white", "weight": "bold"}
+            )
 
-        ax.set_title("Proporção de Ocorrências por Categoria", fontsize=11, color="white", pad=12)
-        ax.legend(cat_counts.index, title="Categorias", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-        ax.set_aspect("equal")
-        st.pyplot(fig)
-
-# --- 📦 Por Modelo ---
-with tab2:
-    st.subheader("Distribuição de Defeitos por Modelo")
-
-# Detecta coluna equivalente ao modelo
-col_modelo = None
-for c in ["MODELO", "DESCRICAO", "DESCRIÇÃO", "CODIGO", "CÓDIGO", "CÓD_PRODUTO"]:
-    if c in df.columns:
-        col_modelo = c
-        break
-
-if col_modelo:
-    st.bar_chart(df.groupby(col_modelo)["CATEGORIA_PREDITA"].count())
-    st.write("Top 5 modelos com mais ocorrências:")
-    st.table(df[col_modelo].value_counts().head(5))
-else:
-    st.warning("⚠️ Nenhuma coluna de modelo ou descrição encontrada na base.")
+            ax.set_title("Proporção de Ocorrências por Categoria", fontsize=11, color="white", pad=12)
+            ax.legend(cat_counts.index, title="Categorias", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+            ax.set_aspect("equal")
+            st.pyplot(fig)
+
+    # --- 📦 Por Modelo ---
+    with tab2:
+        st.subheader("Distribuição de Defeitos por Modelo")
+
+    # Coluna equivalente ao modelo detectada pela camada de agregados
+    if contagem_modelos is not None:
+        st.bar_chart(contagem_modelos)
+        st.write("Top 5 modelos com mais ocorrências:")
+        st.table(contagem_modelos.sort_values(ascending=False).head(5))
+    else:
+        st.warning("⚠️ Nenhuma coluna de modelo ou descrição encontrada na base.")
 
 
-# --- 🔍 Análises Detalhadas ---
-with tab3:
-    st.subheader("Top 5 defeitos mais recorrentes")
-    top_defeitos = df["CATEGORIA_PREDITA"].value_counts().head(5)
-    st.table(top_defeitos)
+    # --- 🔍 Análises Detalhadas ---
+    with tab3:
+        st.subheader("Top 5 defeitos mais recorrentes")
+        top_defeitos = contagem_categorias.head(5)
+        st.table(top_defeitos)
 
+        # =========================
+    # ANÁLISES DETALHADAS — EVOLUÇÃO TEMPORAL
     # =========================
-# ANÁLISES DETALHADAS — EVOLUÇÃO TEMPORAL
-# =========================
-st.subheader("📅 Evolução Temporal de Ocorrências")
+    st.subheader("📅 Evolução Temporal de Ocorrências")
 
-# Detecta coluna de data (independente de nome ou formato)
-col_data = None
-for c in df.columns:
-    nome = str(c).strip().upper()
-    if nome in ["DATA", "DT", "DATA_REGISTRO", "DATA_LOG"]:
-        col_data = c
-        break
+    # Coluna de data detectada pela camada de agregados (contagem diária)
+    if "diario" in agregados:
+        grafico = agregados["diario"]
 
-if col_data:
-    df[col_data] = pd.to_datetime(df[col_data], errors="coerce")
-    df["DIA"] = df[col_data].dt.date
+        if not grafico.empty:
+            st.line_chart(grafico.set_index("DIA"), use_container_width=True)
+        else:
+            st.info("ℹ️ Nenhum registro temporal disponível para plotar.")
+    else:
+        st.info("ℹ️ Nenhuma coluna de data encontrada na base para gerar gráfico temporal.")
 
-    # Gera gráfico temporal
-    grafico = df.groupby("DIA")["CATEGORIA_PREDITA"].count().reset_index(name="TOTAL")
 
-    if not grafico.empty:
-        st.line_chart(grafico.set_index("DIA"), use_container_width=True)
+# =========================
+# ⏱️ TEMPOS POR ETAPA
+# =========================
+# Grava as medições desta execução (data/logs/desempenho.jsonl e
+# data/logs/metricas_sigmaq.prom) e mostra o resumo na barra lateral
+medicoes = finalizar_execucao({"linhas_base": len(df), "versao_modelo": versao_modelo})
+
+with st.sidebar.expander("⏱️ Tempos por etapa (última carga)"):
+    if medicoes:
+        tempos = pd.DataFrame({
+            "ETAPA": ["↳ " * m["nivel"] + m["etapa"] for m in medicoes],
+            "SEGUNDOS": [m["segundos"] for m in medicoes],
+            "LINHAS": pd.array([m["linhas"] for m in medicoes], dtype="Int64"),
+            "MEMÓRIA (MB)": [m["memoria_delta_mb"] for m in medicoes],
+        })
+        st.dataframe(tempos, hide_index=True, use_container_width=True)
+        st.caption(f"Total das etapas principais: {sum(m['segundos'] for m in medicoes if m['nivel'] == 0):.2f} s")
     else:
-        st.info("ℹ️ Nenhum registro temporal disponível para plotar.")
-else:
-    st.info("ℹ️ Nenhuma coluna de data encontrada na base para gerar gráfico temporal.")
+        st.caption("Nenhuma etapa medida nesta execução.")
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Scripts de medição de desempenho do SIGMA-Q.
@@ -0,0 +1,201 @@
+# ============================================
+# benchmarks/bench_modelos.py
+# ============================================
+# Tempo de carga e memória residente dos modelos para N
+# sessões simultâneas: caminho antigo (joblib.load dos dois
+# arquivos a cada sessão) contra o cache por processo do
+# model_manager (carga única + memory-map). Mede também a
+# carga + 1ª predição em um processo novo: dois .pkl
+# (joblib + sklearn) contra o pacote único (pacote_modelo).
+#
+# Uso:
+#   python -m benchmarks.bench_modelos --sessoes 15 --processos 4
+# ============================================
+
+import os
+import gc
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import joblib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils import model_manager
+from utils.pacote_modelo import empacotar, carregar_pacote
+
+
+def rss_mb() -> float:
+    """
+    Memória residente do processo atual em MB (Linux: /proc/self/statm).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def pss_mb(pid: int) -> float | None:
+    """
+    Memória proporcional (PSS) de um processo — páginas compartilhadas
+    são divididas entre os processos que as mapeiam.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linha in f:
+                if linha.startswith("Pss:"):
+                    return int(linha.split()[1]) / 1e3
+    except Exception:
+        return None
+
+
+def treinar_modelo_sintetico(destino: str, classes: int, linhas: int):
+    """
+    Treina um Pipeline TF-IDF + LogisticRegression com a mesma configuração
+    do model_trainer sobre descrições sintéticas e grava em `destino`.
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    rng = np.random.default_rng(0)
+    letras = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulario = ["".join(rng.choice(letras, size=rng.integers(4, 10))) for _ in range(3000)]
+    textos = [" ".join(rng.choice(vocabulario, size=rng.integers(3, 8))) for _ in range(linhas)]
+    rotulos = rng.integers(0, classes, size=linhas).astype(str)
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
+        ("clf", LogisticRegression(max_iter=200)),
+    ])
+    pipeline.fit(textos, rotulos)
+    joblib.dump(pipeline, os.path.join(destino, "modelo_classificacao.pkl"))
+    joblib.dump(pipeline.named_steps["tfidf"], os.path.join(destino, "vectorizer.pkl"))
+    empacotar(pipeline, os.path.join(destino, "modelo_classificacao.sigmaq"))
+
+
+def _worker(modo: str):
+    # Processo que carrega o modelo e fica parado para medirmos o PSS
+    if modo == "antigo":
+        modelo = joblib.load(model_manager.MODELO_PATH)
+    else:
+        modelo, _ = model_manager.obter_modelos()
+    modelo.predict(["sem som"])
+    print("pronto", flush=True)
+    sys.stdin.read()
+
+
+def _latencia(modo: str):
+    # Processo novo: carga do modelo + 1ª predição (inclui importar o sklearn no .pkl)
+    inicio = time.perf_counter()
+    if modo == "pkl":
+        modelo = joblib.load(model_manager.MODELO_PATH)
+        joblib.load(model_manager.VETORIZADOR_PATH)
+    else:
+        modelo = carregar_pacote(model_manager.PACOTE_PATH)
+    carga = time.perf_counter() - inicio
+    modelo.predict(["sem som"])
+    print(f"{carga} {time.perf_counter() - inicio}", flush=True)
+
+
+def medir_latencia(diretorio: str, modo: str, repeticoes: int = 3) -> tuple[float, float]:
+    env = dict(os.environ, SIGMAQ_BENCH_MODELOS=diretorio)
+    medidas = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_modelos", "--latencia", modo],
+            capture_output=True, env=env, text=True, check=True,
+        ).stdout.split()
+        medidas.append((float(saida[-2]), float(saida[-1])))
+    return min(medidas, key=lambda m: m[1])
+
+
+def medir_processos(diretorio: str, processos: int, modo: str) -> float | None:
+    env = dict(os.environ, SIGMAQ_BENCH_MODELOS=diretorio)
+    filhos = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_modelos", "--worker", modo],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True,
+        )
+        for _ in range(processos)
+    ]
+    for filho in filhos:
+        filho.stdout.readline()
+    valores = [pss_mb(f.pid) for f in filhos]
+    for filho in filhos:
+        filho.stdin.close()
+        filho.wait()
+    return None if None in valores else sum(valores)
+
+
+def _apontar_para(diretorio: str):
+    model_manager.PACOTE_PATH = os.path.join(diretorio, "modelo_classificacao.sigmaq")
+    model_manager.MODELO_PATH = os.path.join(diretorio, "modelo_classificacao.pkl")
+    model_manager.VETORIZADOR_PATH = os.path.join(diretorio, "vectorizer.pkl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de modelos do SIGMA-Q")
+    parser.add_argument("--sessoes", type=int, default=15)
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--classes", type=int, default=30)
+    parser.add_argument("--linhas", type=int, default=20_000)
+    parser.add_argument("--worker", choices=["antigo", "novo"])
+    parser.add_argument("--latencia", choices=["pkl", "pacote"])
+    args = parser.parse_args()
+
+    if args.worker or args.latencia:
+        _apontar_para(os.environ["SIGMAQ_BENCH_MODELOS"])
+        _worker(args.worker) if args.worker else _latencia(args.latencia)
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        treinar_modelo_sintetico(diretorio, args.classes, args.linhas)
+        _apontar_para(diretorio)
+        tamanho = os.path.getsize(model_manager.MODELO_PATH) / 1e6
+        print(f"📦 Modelo sintético: {tamanho:.1f} MB, {args.classes} classes")
+
+        # Processo novo: dois .pkl x pacote único
+        print("⏱️ Carga + 1ª predição em processo novo (melhor de 3)")
+        for modo in ("pkl", "pacote"):
+            carga, total = medir_latencia(diretorio, modo)
+            print(f"  {modo:7s} carga {carga:6.3f}s  1ª predição {total:6.3f}s")
+
+        # Antes: cada sessão carrega os dois arquivos
+        gc.collect()
+        base = rss_mb()
+        inicio = time.perf_counter()
+        sessoes = [
+            (joblib.load(model_manager.MODELO_PATH), joblib.load(model_manager.VETORIZADOR_PATH))
+            for _ in range(args.sessoes)
+        ]
+        t_antigo = time.perf_counter() - inicio
+        mem_antigo = rss_mb() - base
+        del sessoes
+        gc.collect()
+
+        # Depois: cache por processo
+        base = rss_mb()
+        inicio = time.perf_counter()
+        sessoes = [model_manager.obter_modelos() for _ in range(args.sessoes)]
+        t_novo = time.perf_counter() - inicio
+        mem_novo = rss_mb() - base
+
+        print(f"👥 {args.sessoes} sessões no mesmo processo")
+        print(f"  antes   {t_antigo:7.3f}s  +{mem_antigo:7.1f} MB RSS")
+        print(f"  depois  {t_novo:7.3f}s  +{mem_novo:7.1f} MB RSS")
+
+        if args.processos:
+            pss_antigo = medir_processos(diretorio, args.processos, "antigo")
+            pss_novo = medir_processos(diretorio, args.processos, "novo")
+            if pss_antigo is not None:
+                print(f"🧩 {args.processos} processos (PSS total, inclui o interpretador)")
+                print(f"  sem mmap  {pss_antigo:8.1f} MB")
+                print(f"  com mmap  {pss_novo:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# ============================================
+# benchmarks/bench_normalizacao.py
+# ============================================
+# Compara a vazão do motor de normalização (padrão único
+# + valores distintos + memo) com o caminho antigo linha
+# a linha, e confere que a saída é idêntica.
+#
+# Uso:
+#   python -m benchmarks.bench_normalizacao --linhas 200000 --distintos 5000
+# ============================================
+
+import os
+import re
+import sys
+import time
+import argparse
+import unicodedata
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils import text_normalizer
+from utils.text_normalizer import SUBSTITUICOES, normalizar_texto, aplicar_unicos
+
+
+# =========================
+# Caminho antigo (referência)
+# =========================
+def normalizar_texto_referencia(texto: str) -> str:
+    """
+    Implementação original: um re.sub por entrada do dicionário.
+    """
+    if not isinstance(texto, str):
+        return texto
+
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+    texto = texto.lower().strip()
+
+    for errado, certo in SUBSTITUICOES.items():
+        texto = re.sub(rf"\b{errado}\b", certo, texto)
+
+    texto = re.sub(r'\b(\w+)( \1\b)+', r'\1', texto)
+    texto = re.sub(r'[;.,]+$', '', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto
+
+
+# =========================
+# Geração de descrições sintéticas
+# =========================
+def gerar_descricoes(linhas: int, distintos: int, seed: int = 42) -> pd.Series:
+    """
+    Gera descrições de falha repetitivas, misturando os erros de
+    digitação do vocabulário com termos técnicos e pontuação.
+    """
+    rng = np.random.default_rng(seed)
+    termos = list(SUBSTITUICOES) + [
+        "ruido", "ruido ruido", "placa", "Áudio", "Vibração", "não liga",
+        "tela", "falha", "cabo", "conector", "solda fria", "LED",
+    ]
+    pool = []
+    for _ in range(distintos):
+        n = rng.integers(2, 6)
+        texto = " ".join(rng.choice(termos, size=n))
+        if rng.random() < 0.3:
+            texto = texto.upper()
+        if rng.random() < 0.2:
+            texto = f"  {texto}. "
+        pool.append(texto)
+    return pd.Series(rng.choice(pool, size=linhas), name="DESC_FALHA")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da normalização textual do SIGMA-Q")
+    parser.add_argument("--linhas", type=int, default=200_000)
+    parser.add_argument("--distintos", type=int, default=5_000)
+    args = parser.parse_args()
+
+    serie = gerar_descricoes(args.linhas, args.distintos)
+
+    # Caminho antigo: .apply linha a linha
+    inicio = time.perf_counter()
+    antigo = serie.astype(str).apply(normalizar_texto_referencia)
+    t_antigo = time.perf_counter() - inicio
+
+    # Caminho novo, memo frio
+    text_normalizer._normalizar_memo.cache_clear()
+    inicio = time.perf_counter()
+    novo = aplicar_unicos(serie.astype(str), normalizar_texto)
+    t_frio = time.perf_counter() - inicio
+
+    # Caminho novo, memo quente (equivalente a um rerun do Streamlit)
+    inicio = time.perf_counter()
+    aplicar_unicos(serie.astype(str), normalizar_texto)
+    t_quente = time.perf_counter() - inicio
+
+    if not antigo.equals(novo):
+        diferentes = (antigo != novo).sum()
+        raise SystemExit(f"❌ Saídas divergentes em {diferentes} linhas.")
+
+    print(f"📊 {args.linhas} linhas, {serie.nunique()} descrições distintas")
+    for nome, t in [("linha a linha", t_antigo), ("únicos (memo frio)", t_frio), ("únicos (memo quente)", t_quente)]:
+        print(f"  {nome:<22} {t:8.3f}s  {args.linhas / t:12,.0f} linhas/s")
+    print(f"✅ Saídas idênticas — ganho {t_antigo / t_frio:.1f}x (frio), {t_antigo / t_quente:.1f}x (quente)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ============================================
+# benchmarks/bench_treino_incremental.py
+# ============================================
+# Compara, mês a mês, o refit completo do model_trainer
+# (TF-IDF + LogisticRegression sobre todo o histórico)
+# com o treino incremental (hashing + SGD com partial_fit
+# apenas sobre as linhas novas). Uma categoria nova surge
+# no meio da série para exercitar esse caso.
+#
+# Uso:
+#   python -m benchmarks.bench_treino_incremental --meses 6 --linhas-mes 20000
+# ============================================
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.treino_incremental import novo_pipeline_incremental
+
+
+def gerar_mes(rng, linhas: int, categorias: list, vocab: dict, ruido: list) -> pd.DataFrame:
+    """
+    Descrições com um termo característico da categoria, um termo de
+    outra categoria qualquer (confusão) e ruído comum.
+    """
+    rotulos = rng.choice(categorias, size=linhas)
+    confusao = rng.choice(categorias, size=linhas)
+    textos = [
+        " ".join([rng.choice(vocab[c]), rng.choice(vocab[o])] + list(rng.choice(ruido, size=3)))
+        for c, o in zip(rotulos, confusao)
+    ]
+    return pd.DataFrame({"DESC_FALHA": textos, "CATEGORIA": rotulos})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refit completo x treino incremental")
+    parser.add_argument("--meses", type=int, default=6)
+    parser.add_argument("--linhas-mes", type=int, default=20_000)
+    parser.add_argument("--categorias", type=int, default=12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    todas = [f"CAT{i:02d}" for i in range(args.categorias)]
+    vocab = {c: [f"{c.lower()}termo{j}" for j in range(15)] for c in todas}
+    ruido = [f"ruido{j}" for j in range(400)] + ["sem", "som", "placa", "queimado", "mancha"]
+
+    # A última categoria só aparece a partir da metade da série
+    nova = todas[-1]
+    inicio_nova = args.meses // 2
+    teste = gerar_mes(rng, 5_000, todas, vocab, ruido)
+
+    historico = pd.DataFrame()
+    incremental = novo_pipeline_incremental()
+    t_full_total = t_inc_total = 0.0
+
+    print(f"{'mês':>3} {'linhas':>8} | {'refit (s)':>9} {'acc':>6} | {'incr. (s)':>9} {'acc':>6}")
+    for mes in range(args.meses):
+        categorias = todas if mes >= inicio_nova else [c for c in todas if c != nova]
+        novo = gerar_mes(rng, args.linhas_mes, categorias, vocab, ruido)
+        historico = pd.concat([historico, novo], ignore_index=True)
+        teste_mes = teste[teste["CATEGORIA"].isin(categorias)]
+
+        # Refit completo, mesma configuração do model_trainer
+        inicio = time.perf_counter()
+        full = Pipeline([
+            ("tfidf", TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
+            ("clf", LogisticRegression(max_iter=1000, solver="lbfgs")),
+        ]).fit(historico["DESC_FALHA"], historico["CATEGORIA"])
+        t_full = time.perf_counter() - inicio
+        acc_full = full.score(teste_mes["DESC_FALHA"], teste_mes["CATEGORIA"])
+
+        # Incremental: apenas as linhas do mês
+        inicio = time.perf_counter()
+        X = incremental.named_steps["tfidf"].transform(novo["DESC_FALHA"])
+        incremental.named_steps["clf"].partial_fit(X, novo["CATEGORIA"].to_numpy())
+        t_inc = time.perf_counter() - inicio
+        acc_inc = (incremental.predict(teste_mes["DESC_FALHA"]) == teste_mes["CATEGORIA"].to_numpy()).mean()
+
+        t_full_total += t_full
+        t_inc_total += t_inc
+        marca = " ← categoria nova" if mes == inicio_nova else ""
+        print(f"{mes + 1:>3} {len(historico):>8} | {t_full:9.2f} {acc_full:6.3f} | {t_inc:9.2f} {acc_inc:6.3f}{marca}")
+
+    print(f"✅ Tempo acumulado: refit {t_full_total:.1f}s x incremental {t_inc_total:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
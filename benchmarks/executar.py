@@ -0,0 +1,238 @@
+# ============================================
+# benchmarks/executar.py
+# ============================================
+# Suíte de benchmark do SIGMA-Q: gera uma base sintética e
+# mede cada etapa do pipeline separadamente (tempo, vazão e
+# pico de memória). O resultado vai para um JSON em
+# benchmarks/resultados/ para comparar commits.
+#
+# Uso:
+#   python -m benchmarks.executar --linhas 200000
+#   python -m benchmarks.executar --comparar antes.json depois.json
+# ============================================
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.gerador import gerar_base, salvar_base
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTADOS_DIR = os.path.join(RAIZ, "benchmarks", "resultados")
+
+
+# =========================
+# Medição de memória
+# =========================
+def _status_mb(campo: str) -> float | None:
+    # Lê VmHWM (pico) ou VmRSS (atual) de /proc/self/status
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) / 1e3
+    except Exception:
+        return None
+
+
+def _resetar_pico() -> bool:
+    # Linux: zera o pico de RSS (VmHWM) do processo
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except Exception:
+        return False
+
+
+def medir(nome: str, funcao, linhas: int, resultados: list):
+    """
+    Executa `funcao()` medindo duração, vazão (linhas/s) e pico de memória.
+    Usa o pico de RSS do Linux quando disponível (sem custo de medição);
+    caso contrário, o pico do tracemalloc.
+    """
+    gc.collect()
+    usar_rss = _resetar_pico()
+    rss_inicial = _status_mb("VmRSS") if usar_rss else 0.0
+    if not usar_rss:
+        tracemalloc.start()
+
+    inicio = time.perf_counter()
+    retorno = funcao()
+    duracao = time.perf_counter() - inicio
+
+    if usar_rss:
+        pico = _status_mb("VmHWM")
+        fonte = "rss"
+    else:
+        pico = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        fonte = "tracemalloc"
+
+    resultados.append({
+        "etapa": nome,
+        "segundos": round(duracao, 4),
+        "linhas": linhas,
+        "linhas_por_segundo": round(linhas / duracao, 1) if duracao > 0 else None,
+        "pico_memoria_mb": round(pico, 1) if pico is not None else None,
+        "acrescimo_pico_mb": round(pico - rss_inicial, 1) if pico is not None else None,
+        "fonte_memoria": fonte,
+    })
+    print(
+        f"  {nome:<32} {duracao:8.3f}s  {linhas / max(duracao, 1e-9):>12,.0f} linhas/s"
+        f"  pico {pico or 0:8.1f} MB (+{(pico or 0) - rss_inicial:.1f})"
+    )
+    return retorno
+
+
+# =========================
+# Suíte
+# =========================
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except Exception:
+        return None
+
+
+def executar(linhas: int, vocabulario: int, distintos: int, categorias: int, motivos: int, modelos: int) -> dict:
+    """
+    Roda todas as etapas em um diretório temporário (não toca data/ nem model/).
+    """
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    diretorio_original = os.getcwd()
+    trabalho = tempfile.mkdtemp(prefix="sigmaq_bench_")
+    os.chdir(trabalho)
+    resultados = []
+
+    try:
+        from utils import cache_base, atualizador, logger, model_trainer, inferencia
+        from utils.agregados import calcular_agregados
+        from utils.compactacao import compactar_dataframe, relatorio_memoria
+        from utils.text_normalizer import normalizar_dataframe, detectar_coluna_texto
+        from utils.text_processor import preprocessar_dataframe, carregar_spacy_modelo
+
+        # Isola caches e artefatos no diretório temporário
+        cache_base.CACHE_DIR = os.path.join(trabalho, "data", "cache")
+        inferencia._cache = inferencia.CachePredicoes(os.path.join(trabalho, "data", "cache", "predicoes.sqlite"))
+        caminho_base = os.path.join(trabalho, "data", "base_de_dados_unificada.xlsx")
+        model_trainer.BASE_PATH = caminho_base
+
+        print(f"🧪 Gerando base sintética ({linhas:,} linhas)...")
+        bruto = gerar_base(linhas, vocabulario, distintos, categorias, motivos, modelos)
+        salvar_base(bruto, caminho_base)
+
+        print("⏱️ Etapas:")
+        df, _ = medir("carregar_base (xlsx)", lambda: atualizador.ler_base(caminho_base), linhas, resultados)
+        medir("carregar_base (snapshot)", lambda: atualizador.ler_base(caminho_base), linhas, resultados)
+        normalizado = medir("normalizar_dataframe", lambda: normalizar_dataframe(bruto.copy()), linhas, resultados)
+        compacto = medir("compactar_dataframe", lambda: compactar_dataframe(normalizado), linhas, resultados)
+        print(relatorio_memoria(normalizado, compacto).to_string(index=False))
+
+        col_texto = detectar_coluna_texto(df)
+        nlp = carregar_spacy_modelo()
+        nome_pre = "preprocessar_dataframe" + ("" if nlp else " (sem spaCy)")
+        df = medir(nome_pre, lambda: preprocessar_dataframe(df, coluna_texto=col_texto), linhas, resultados)
+
+        pipeline, _ = medir("treinar_modelo", model_trainer.treinar_pipeline, linhas, resultados)
+        model_trainer.salvar_artefatos(pipeline)
+        vetorizador = pipeline.named_steps["tfidf"]
+
+        medir("predict (todas as linhas, vetorizado)", lambda: pipeline.predict(df[col_texto].astype(str)), linhas, resultados)
+        previsoes = medir(
+            "predict (únicos, cache frio)",
+            lambda: inferencia.classificar_descricoes(df[col_texto], pipeline, vetorizador, versao_modelo="bench"),
+            linhas, resultados,
+        )
+        medir(
+            "predict (únicos, cache quente)",
+            lambda: inferencia.classificar_descricoes(df[col_texto], pipeline, vetorizador, versao_modelo="bench"),
+            linhas, resultados,
+        )
+        df["CATEGORIA_PREDITA"] = previsoes
+
+        medir(
+            "registrar_classificacoes",
+            lambda: logger.registrar_classificacoes(df[[col_texto, "CATEGORIA_PREDITA"]]),
+            linhas, resultados,
+        )
+        medir("agregacoes_dashboard", lambda: calcular_agregados(df, col_texto), linhas, resultados)
+
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    return {
+        "commit": _commit_atual(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "linhas": linhas, "vocabulario": vocabulario, "distintos": distintos,
+            "categorias": categorias, "motivos": motivos, "modelos": modelos,
+        },
+        "etapas": resultados,
+    }
+
+
+def comparar(antes: str, depois: str):
+    """
+    Mostra a variação de tempo e memória por etapa entre dois JSONs.
+    """
+    with open(antes, encoding="utf-8") as f:
+        a = {e["etapa"]: e for e in json.load(f)["etapas"]}
+    with open(depois, encoding="utf-8") as f:
+        b = {e["etapa"]: e for e in json.load(f)["etapas"]}
+
+    print(f"{'etapa':<32} {'antes (s)':>10} {'depois (s)':>10} {'Δ tempo':>9} {'Δ acrésc. MB':>12}")
+    for etapa in dict.fromkeys(list(a) + list(b)):
+        if etapa not in a or etapa not in b:
+            print(f"{etapa:<32} {'—':>10} {'—':>10}")
+            continue
+        ta, tb = a[etapa]["segundos"], b[etapa]["segundos"]
+        delta = (tb - ta) / ta * 100 if ta else 0.0
+        mem = (b[etapa].get("acrescimo_pico_mb") or 0) - (a[etapa].get("acrescimo_pico_mb") or 0)
+        alerta = " ⚠️" if delta > 10 else ""
+        print(f"{etapa:<32} {ta:10.3f} {tb:10.3f} {delta:+8.1f}% {mem:+12.1f}{alerta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmark do SIGMA-Q")
+    parser.add_argument("--linhas", type=int, default=50_000)
+    parser.add_argument("--vocabulario", type=int, default=500)
+    parser.add_argument("--distintos", type=int, default=8_000)
+    parser.add_argument("--categorias", type=int, default=12)
+    parser.add_argument("--motivos", type=int, default=40)
+    parser.add_argument("--modelos", type=int, default=150)
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: benchmarks/resultados/)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    resultado = executar(args.linhas, args.vocabulario, args.distintos, args.categorias, args.motivos, args.modelos)
+
+    saida = args.saida or os.path.join(
+        RESULTADOS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{resultado['commit'] or 'local'}_{args.linhas}.json"
+    )
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
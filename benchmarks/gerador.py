@@ -0,0 +1,111 @@
+# ============================================
+# benchmarks/gerador.py
+# ============================================
+# Gerador de bases sintéticas de Quality Control no
+# formato da planilha oficial do SIGMA-Q. Usa os erros de
+# digitação do text_normalizer e cardinalidades realistas
+# para CATEGORIA, MOTIVO e MODELO.
+# ============================================
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.text_normalizer import SUBSTITUICOES
+
+# Cardinalidades padrão (ordem de grandeza da base real)
+CATEGORIAS = 12
+MOTIVOS = 40
+MODELOS = 150
+
+_MESES = ["JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO", "JULHO",
+          "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO"]
+_TERMOS_BASE = ["ruido", "placa", "tela", "cabo", "conector", "solda fria", "led", "hélice",
+                "não liga", "rca", "não atua", "fio", "cortado", "mal montado", "folha reflexiva",
+                "bobina", "trincado", "riscado", "sem imagem", "desligando", "oxidado"]
+
+
+def _vocabulario(tamanho: int, rng) -> list:
+    """
+    Termos técnicos: o vocabulário fixo, as chaves e correções do
+    dicionário de erros de digitação e termos sintéticos até `tamanho`.
+    """
+    termos = list(dict.fromkeys(_TERMOS_BASE + list(SUBSTITUICOES) + list(SUBSTITUICOES.values())))
+    letras = np.array(list("abcdefghijlmnoprstuv"))
+    while len(termos) < tamanho:
+        termos.append("".join(rng.choice(letras, size=rng.integers(4, 9))))
+    return termos[:max(tamanho, 1)]
+
+
+def gerar_base(
+    linhas: int,
+    vocabulario: int = 500,
+    distintos: int = 8_000,
+    categorias: int = CATEGORIAS,
+    motivos: int = MOTIVOS,
+    modelos: int = MODELOS,
+    inicio: str = "2025-01-01",
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Gera um DataFrame com `linhas` registros de defeitos.
+
+    As descrições são sorteadas de um conjunto de `distintos` textos
+    (a base real é muito repetitiva); cada categoria tem termos
+    preferenciais para que o classificador tenha sinal a aprender.
+    Os nomes de colunas seguem a planilha original (acentos e espaços).
+    """
+    rng = np.random.default_rng(seed)
+    termos = _vocabulario(vocabulario, rng)
+
+    nomes_categoria = [f"CAT{i:02d}" for i in range(categorias)]
+    nomes_motivo = [f"MOTIVO {i:02d}" for i in range(motivos)]
+    nomes_modelo = [f"{rng.choice(['CM', 'LCM', 'TV', 'AF', 'SB'])}-{100 + i * 7}" for i in range(modelos)]
+
+    # Termos preferenciais por categoria
+    preferidos = {c: rng.choice(termos, size=min(8, len(termos)), replace=False) for c in nomes_categoria}
+
+    # Pool de descrições distintas, cada uma associada a uma categoria
+    pool_cat = rng.choice(nomes_categoria, size=distintos)
+    pool_txt = []
+    for cat in pool_cat:
+        palavras = list(rng.choice(preferidos[cat], size=2)) + list(rng.choice(termos, size=rng.integers(1, 4)))
+        texto = " ".join(palavras)
+        if rng.random() < 0.4:
+            texto = texto.upper()
+        if rng.random() < 0.15:
+            texto = f" {texto}."
+        pool_txt.append(texto)
+
+    # Distribuição de Zipf: poucas descrições respondem pela maioria das linhas
+    pesos = 1.0 / np.arange(1, distintos + 1)
+    idx = rng.choice(distintos, size=linhas, p=pesos / pesos.sum())
+
+    datas = pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, 365 * 24 * 60, size=linhas)), unit="min")
+    modelos_idx = rng.zipf(1.5, size=linhas) % modelos
+
+    return pd.DataFrame({
+        "Data": datas.normalize(),
+        "Mês": np.array(_MESES)[datas.month - 1],
+        "Semana": datas.isocalendar().week.to_numpy(),
+        "Turno": rng.choice(["1°", "2°", "3°", "C"], size=linhas),
+        "Código": rng.integers(1000, 9999, size=linhas),
+        "Modelo": np.array(nomes_modelo)[modelos_idx],
+        "Categoria": np.array(pool_cat)[idx],
+        "Linha": rng.choice(["AF", "TV1", "TV2", "SB"], size=linhas),
+        "Técnico": rng.choice(["CARLOS", "LUIZ", "ANA", "MARIA", "JOÃO"], size=linhas),
+        "Desc. Falha": np.array(pool_txt, dtype=object)[idx],
+        "Motivo": rng.choice(nomes_motivo, size=linhas),
+        "Análise": rng.choice(["CORTADO", "MAL MONTADO", "QUEIMADO", "SEM SOLDA"], size=linhas),
+        "Quantidade": rng.integers(1, 4, size=linhas),
+    })
+
+
+def salvar_base(df: pd.DataFrame, caminho: str):
+    """
+    Grava a base sintética em xlsx (mesmo formato da base oficial).
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    df.to_excel(caminho, index=False)
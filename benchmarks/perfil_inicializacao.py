@@ -0,0 +1,133 @@
+# ============================================
+# benchmarks/perfil_inicializacao.py
+# ============================================
+# Perfil de inicialização do app/main.py: executa, em um
+# interpretador novo, todos os imports de nível de módulo
+# do dashboard com `python -X importtime` e mostra o custo
+# de cada pacote. Termina com código 1 quando o tempo total
+# passa do limite ou quando uma biblioteca pesada (que deve
+# ser tardia) é importada antes da primeira tela.
+#
+# Uso:
+#   python -m benchmarks.perfil_inicializacao
+#   python -m benchmarks.perfil_inicializacao --limite 1.0 --top 20
+#   python -m pytest tests/test_inicializacao.py   (verificação no CI)
+# ============================================
+
+import os
+import re
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MAIN_PATH = os.path.join(RAIZ, "app", "main.py")
+
+# Tempo máximo (s) dos imports antes do primeiro widget
+LIMITE_SEGUNDOS = 1.0
+
+# Bibliotecas que só podem ser importadas no primeiro uso
+PESADOS = ["matplotlib", "sklearn", "spacy", "altair", "joblib"]
+
+_LINHA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def imports_do_main(caminho: str = MAIN_PATH) -> list:
+    """
+    Extrai os imports executados ao carregar o script (nível de módulo,
+    incluindo blocos if/try/with), ignorando os de dentro de funções.
+    """
+    with open(caminho, encoding="utf-8") as f:
+        arvore = ast.parse(f.read(), filename=caminho)
+
+    imports = []
+
+    def visitar(nos):
+        for no in nos:
+            if isinstance(no, (ast.Import, ast.ImportFrom)):
+                imports.append(ast.unparse(no))
+            elif isinstance(no, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            else:
+                for campo in ("body", "orelse", "finalbody", "handlers"):
+                    visitar(getattr(no, campo, []) or [])
+
+    visitar(arvore.body)
+    return list(dict.fromkeys(imports))
+
+
+def _codigo_perfil(imports: list) -> str:
+    # Script do processo filho: importa tudo e informa tempo e módulos pesados
+    return "\n".join([
+        "import sys, time, json",
+        "_ja_carregados = sorted(sys.modules)",
+        "_inicio = time.perf_counter()",
+        *imports,
+        "_total = time.perf_counter() - _inicio",
+        f"_pesados = [m for m in {PESADOS!r} if m in sys.modules]",
+        "print(json.dumps({'total': _total, 'pesados': _pesados, 'inicializacao': _ja_carregados}))",
+    ])
+
+
+def medir_inicializacao(imports: list) -> dict:
+    """
+    Roda os imports em um interpretador novo com -X importtime.
+    Retorna o tempo total, os pacotes de topo com custo acumulado (s)
+    e as bibliotecas pesadas que foram carregadas.
+    """
+    env = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _codigo_perfil(imports)],
+        cwd=RAIZ, env=env, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar os módulos do app:\n{processo.stderr[-2000:]}")
+
+    resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+    do_interpretador = set(resultado.pop("inicializacao"))
+
+    pacotes = {}
+    for linha in processo.stderr.splitlines():
+        m = _LINHA_IMPORTTIME.match(linha)
+        # Sem recuo = import de topo (o custo acumulado inclui as dependências);
+        # os módulos da própria inicialização do interpretador ficam de fora
+        if m and len(m.group(3)) <= 1 and m.group(4) not in do_interpretador:
+            pacotes[m.group(4)] = int(m.group(2)) / 1e6
+
+    resultado["pacotes"] = dict(sorted(pacotes.items(), key=lambda kv: kv[1], reverse=True))
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perfil de inicialização do dashboard SIGMA-Q")
+    parser.add_argument("--limite", type=float, default=LIMITE_SEGUNDOS, help="tempo máximo em segundos")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções (vale a mais rápida)")
+    parser.add_argument("--top", type=int, default=15, help="pacotes exibidos")
+    args = parser.parse_args(argv)
+
+    imports = imports_do_main()
+    medicoes = [medir_inicializacao(imports) for _ in range(max(args.repeticoes, 1))]
+    melhor = min(medicoes, key=lambda r: r["total"])
+
+    print(f"🚀 Imports de nível de módulo do app/main.py: {len(imports)}")
+    print(f"{'pacote':<40} {'acumulado (s)':>14}")
+    for nome, segundos in list(melhor["pacotes"].items())[:args.top]:
+        print(f"{nome:<40} {segundos:14.3f}")
+    print(f"⏱️ Total: {melhor['total']:.3f}s (limite {args.limite:.2f}s)")
+
+    falhou = False
+    if melhor["pesados"]:
+        print(f"❌ Bibliotecas pesadas importadas na inicialização: {', '.join(melhor['pesados'])}")
+        falhou = True
+    if melhor["total"] > args.limite:
+        print("❌ Inicialização acima do limite.")
+        falhou = True
+    if not falhou:
+        print("✅ Inicialização dentro do limite.")
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
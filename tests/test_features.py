@@ -0,0 +1,36 @@
+# ============================================
+# tests/test_features.py
+# ============================================
+# Armazém de features: os segmentos gravados por uma
+# instância, relidos por outra (outro processo, retreino,
+# reinício do dashboard), têm as mesmas contagens que o
+# CountVectorizer calcula sobre os textos.
+# ============================================
+
+import random
+
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from utils.features import ArmazemFeatures
+
+PALAVRAS = "botao tampa risco peca solta painel quebrado trinca vazamento oleo motor porta".split()
+
+
+def _textos(n: int) -> list:
+    return [" ".join(random.Random(i).choices(PALAVRAS, k=8)) for i in range(n)]
+
+
+def test_segmentos_relidos_tem_as_contagens_dos_textos(tmp_path):
+    textos = _textos(2000)
+    vetorizador = TfidfVectorizer(ngram_range=(1, 2))
+
+    escritor = ArmazemFeatures(vetorizador, str(tmp_path))
+    escritor.contagens(textos[:1000])
+    escritor.contagens(textos[1000:])
+
+    leitor = ArmazemFeatures(vetorizador, str(tmp_path))
+    contagens, termos = leitor.contagens(textos)
+
+    esperado = CountVectorizer(ngram_range=(1, 2), vocabulary=termos).transform(textos)
+    assert len(leitor.linhas) == len(textos)
+    assert (contagens != esperado).nnz == 0
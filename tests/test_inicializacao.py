@@ -0,0 +1,18 @@
+# ============================================
+# tests/test_inicializacao.py
+# ============================================
+# Garante no CI o orçamento de inicialização do dashboard:
+# os imports de nível de módulo do app/main.py ficam abaixo
+# de LIMITE_SEGUNDOS e nenhuma biblioteca pesada é
+# carregada antes da primeira tela.
+# ============================================
+
+import pytest
+
+from benchmarks.perfil_inicializacao import main, LIMITE_SEGUNDOS
+
+
+def test_inicializacao_dentro_do_limite(capsys):
+    with pytest.raises(SystemExit) as saida:
+        main(["--limite", str(LIMITE_SEGUNDOS), "--top", "0"])
+    assert saida.value.code == 0, capsys.readouterr().out
@@ -0,0 +1,201 @@
+# ============================================
+# utils/agregados.py
+# ============================================
+# Camada de agregados do dashboard SIGMA-Q.
+# Todas as métricas dos gráficos, KPIs e abas são
+# calculadas em uma única passada por (versão dos dados,
+# versão do modelo) e guardadas como tabelas pequenas —
+# em memória e em data/cache/agregados (Parquet) — para
+# que os reruns do Streamlit não percorram as linhas.
+# ============================================
+
+import os
+import json
+import shutil
+import threading
+import pandas as pd
+
+from utils.instrumentacao import instrumentado
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+AGREGADOS_DIR = os.path.join(BASE_DIR, "data", "cache", "agregados")
+
+# Quantas combinações (dados, modelo) manter em disco
+MAX_VERSOES = 3
+
+# Colunas aceitas para modelo e data (mesma ordem de preferência do dashboard)
+COLUNAS_MODELO = ["MODELO", "DESCRICAO", "DESCRIÇÃO", "CODIGO", "CÓDIGO", "CÓD_PRODUTO"]
+COLUNAS_DATA = ["DATA", "DT", "DATA_REGISTRO", "DATA_LOG"]
+
+# Linhas de exemplo por categoria
+EXEMPLOS_POR_CATEGORIA = 3
+
+COL_PREDITA = "CATEGORIA_PREDITA"
+
+
+def _primeira_coluna(df: pd.DataFrame, opcoes: list) -> str | None:
+    nomes = {str(c).strip().upper(): c for c in df.columns}
+    for opcao in opcoes:
+        if opcao in nomes:
+            return nomes[opcao]
+    return None
+
+
+def _contagem(serie: pd.Series, nome: str) -> pd.DataFrame:
+    # value_counts de categóricas inclui categorias com zero ocorrências
+    contagem = serie.value_counts()
+    contagem = contagem[contagem > 0]
+    return contagem.rename_axis(nome).reset_index(name="TOTAL")
+
+
+# =========================
+# Cálculo (uma passada)
+# =========================
+def calcular_agregados(df: pd.DataFrame, col_texto: str) -> dict:
+    """
+    Calcula todas as métricas exibidas pelo dashboard a partir das linhas
+    classificadas. Retorna um dicionário com "kpis" (valores escalares) e
+    tabelas pequenas (DataFrames), sem alterar `df`.
+    """
+    col_modelo = _primeira_coluna(df, COLUNAS_MODELO)
+    col_data = _primeira_coluna(df, COLUNAS_DATA)
+
+    por_categoria = _contagem(df[COL_PREDITA], COL_PREDITA)
+
+    kpis = {
+        "total_registros": int(len(df)),
+        "categorias_distintas": int(df["CATEGORIA"].nunique()) if "CATEGORIA" in df.columns else None,
+        "motivos_distintos": int(df["MOTIVO"].nunique()) if "MOTIVO" in df.columns else None,
+        "categorias_preditas": int(len(por_categoria)),
+        "col_texto": col_texto,
+        "col_modelo": col_modelo,
+        "col_data": col_data,
+        "calculado_em": pd.Timestamp.now().isoformat(),
+    }
+
+    tabelas = {"por_categoria": por_categoria}
+
+    if col_modelo is not None:
+        por_modelo = (
+            df.groupby(col_modelo, observed=True)[COL_PREDITA].count()
+            .rename_axis("MODELO").reset_index(name="TOTAL")
+        )
+        tabelas["por_modelo"] = por_modelo[por_modelo["TOTAL"] > 0]
+
+    if col_data is not None:
+        dia = pd.to_datetime(df[col_data], errors="coerce").dt.date.rename("DIA")
+        tabelas["diario"] = df.groupby(dia)[COL_PREDITA].count().reset_index(name="TOTAL")
+
+    tabelas["exemplos"] = (
+        df.groupby(COL_PREDITA, observed=True).head(EXEMPLOS_POR_CATEGORIA)[[col_texto, COL_PREDITA]]
+        .astype(str).reset_index(drop=True)
+    )
+
+    return {"kpis": kpis, **tabelas}
+
+
+# =========================
+# Persistência
+# =========================
+def _diretorio(versao_dados: str, versao_modelo: str) -> str:
+    return os.path.join(AGREGADOS_DIR, f"{versao_dados}_{versao_modelo}")
+
+
+def _salvar(diretorio: str, agregados: dict):
+    temporario = diretorio + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario, exist_ok=True)
+    for nome, tabela in agregados.items():
+        if nome == "kpis":
+            with open(os.path.join(temporario, "kpis.json"), "w", encoding="utf-8") as f:
+                json.dump(tabela, f, ensure_ascii=False, indent=2)
+        else:
+            tabela.to_parquet(os.path.join(temporario, f"{nome}.parquet"), index=False)
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.replace(temporario, diretorio)
+
+
+def _carregar(diretorio: str) -> dict | None:
+    try:
+        with open(os.path.join(diretorio, "kpis.json"), encoding="utf-8") as f:
+            agregados = {"kpis": json.load(f)}
+        for arquivo in os.listdir(diretorio):
+            if arquivo.endswith(".parquet"):
+                agregados[arquivo[:-len(".parquet")]] = pd.read_parquet(os.path.join(diretorio, arquivo))
+        if "diario" in agregados:
+            agregados["diario"]["DIA"] = pd.to_datetime(agregados["diario"]["DIA"]).dt.date
+        return agregados
+    except Exception:
+        return None
+
+
+def _aplicar_retencao():
+    try:
+        versoes = [os.path.join(AGREGADOS_DIR, d) for d in os.listdir(AGREGADOS_DIR) if not d.endswith(".tmp")]
+    except FileNotFoundError:
+        return
+    versoes.sort(key=os.path.getmtime, reverse=True)
+    for antiga in versoes[MAX_VERSOES:]:
+        shutil.rmtree(antiga, ignore_errors=True)
+
+
+# =========================
+# Cache por processo
+# =========================
+class _AgregadosCalculados:
+    """
+    Guarda os agregados da última (versão dos dados, versão do modelo).
+    Compartilhado por todas as sessões do Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chave = None
+        self.agregados = None
+
+
+_atual = _AgregadosCalculados()
+
+
+@instrumentado("agregados", linhas=None)
+def obter_agregados(df: pd.DataFrame, col_texto: str, versao_dados: str | None, versao_modelo: str | None) -> tuple[dict, bool]:
+    """
+    Retorna (agregados, recalculado).
+
+    Os agregados são reaproveitados enquanto a versão dos dados e a do
+    modelo não mudarem: primeiro da memória do processo, depois do disco.
+    Sem uma das versões, eles são sempre recalculados (sem cache).
+    """
+    if not versao_dados or not versao_modelo:
+        return calcular_agregados(df, col_texto), True
+
+    chave = (versao_dados, versao_modelo, col_texto)
+    with _atual.lock:
+        if _atual.chave == chave:
+            return _atual.agregados, False
+
+        diretorio = _diretorio(versao_dados, versao_modelo)
+        agregados = _carregar(diretorio)
+        recalculado = agregados is None or agregados["kpis"].get("col_texto") != col_texto
+        if recalculado:
+            agregados = calcular_agregados(df, col_texto)
+            try:
+                _salvar(diretorio, agregados)
+                _aplicar_retencao()
+            except Exception as e:
+                print(f"⚠️ Não foi possível gravar os agregados: {e}")
+
+        _atual.chave, _atual.agregados = chave, agregados
+        return agregados, recalculado
+
+
+def limpar_agregados():
+    """
+    Descarta os agregados em memória e em disco.
+    """
+    with _atual.lock:
+        _atual.chave, _atual.agregados = None, None
+    shutil.rmtree(AGREGADOS_DIR, ignore_errors=True)
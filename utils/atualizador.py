@@ -7,7 +7,14 @@ import streamlit as st
 # Corrige o caminho de importação
 # =========================
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from utils.text_normalizer import normalizar_dataframe
+from utils.text_normalizer import normalizar_colunas
+from utils.cache_base import (
+    carregar_snapshot, salvar_snapshot, mtime_snapshot, impressao_digital, versao_snapshot, ler_snapshot_existente,
+)
+from utils.ingestao_delta import normalizar_delta, COL_HASH_BRUTO
+from utils.compactacao import compactar_dataframe
+from utils.instrumentacao import instrumentado
+from utils.ingestao_excel import ler_planilha
 
 # =========================
 # Caminhos base
@@ -17,9 +24,81 @@ DEFAULT_PATH = os.path.join(BASE_DIR, "data", "base_de_dados_unificada.xlsx")
 
 print(">>> SIGMA-Q carregando base padrão em:", DEFAULT_PATH)
 
+# =========================
+# Leitura da base (sem Streamlit)
+# =========================
+def _sufixo(usecols: list | None) -> str:
+    # Snapshots distintos para seleções de colunas distintas
+    return "" if not usecols else "_" + "_".join(sorted(map(str, usecols)))
+
+
+def ler_base(path: str = None, usecols: list | None = None) -> tuple[pd.DataFrame, bool]:
+    """
+    Lê e normaliza a base oficial. Usa o snapshot Parquet em data/cache
+    quando a planilha não mudou; o xlsx só é lido de novo quando
+    monitorar_base acusa alteração e o conteúdo realmente é diferente.
+    Nesse caso apenas as linhas novas ou alteradas são normalizadas; as
+    demais vêm do snapshot anterior (hash por linha, ver ingestao_delta).
+    Retorna (df, veio_do_cache). Lança FileNotFoundError se não existir.
+    """
+    caminho = path or DEFAULT_PATH
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+
+    sufixo = _sufixo(usecols)
+
+    # Tenta o snapshot colunar antes de abrir o xlsx
+    modificado, _ = monitorar_base(path=caminho, last_mtime=mtime_snapshot(caminho, sufixo))
+    df = carregar_snapshot(caminho, modificado=modificado, sufixo=sufixo)
+    if df is not None:
+        return df.drop(columns=[COL_HASH_BRUTO], errors="ignore"), True
+
+    # Impressão digital tirada antes da leitura (consistência do snapshot)
+    digital = impressao_digital(caminho)
+
+    # Carrega planilha (streaming read_only, sem a árvore completa do openpyxl)
+    df = ler_planilha(caminho, usecols=usecols)
+
+    # Normaliza nomes das colunas
+    df = normalizar_colunas(df)
+
+    # Remove linhas totalmente vazias
+    df = df.dropna(how="all").reset_index(drop=True)
+
+    # Aplica limpeza e padronização textual só nas linhas novas/alteradas
+    df, normalizadas = normalizar_delta(df, ler_snapshot_existente(caminho, sufixo))
+    print(f"🧹 {normalizadas} de {len(df)} linhas normalizadas (restante reaproveitado do snapshot).")
+
+    # Representação compacta (categóricas, string Arrow, números reduzidos, datas)
+    memoria_antes = df.memory_usage(deep=True).sum() / 1e6
+    df = compactar_dataframe(df, ignorar=[COL_HASH_BRUTO])
+    print(f"🗜️ Base compactada: {memoria_antes:.1f} MB → {df.memory_usage(deep=True).sum() / 1e6:.1f} MB.")
+
+    # Grava o snapshot para as próximas execuções
+    salvar_snapshot(caminho, df, digital, sufixo=sufixo)
+    return df.drop(columns=[COL_HASH_BRUTO]), False
+
+
+def versao_base(path: str = None, usecols: list | None = None) -> str | None:
+    """
+    Identifica a versão dos dados carregados por ler_base: o hash do
+    conteúdo registrado no snapshot ou, sem snapshot, mtime + tamanho.
+    """
+    caminho = path or DEFAULT_PATH
+    versao = versao_snapshot(caminho, _sufixo(usecols))
+    if versao:
+        return versao
+    try:
+        info = os.stat(caminho)
+    except OSError:
+        return None
+    return f"{info.st_mtime_ns:x}-{info.st_size:x}"
+
+
 # =========================
 # Função principal: carregar_base
 # =========================
+@instrumentado()
 def carregar_base(path: str = None, usecols: list | None = None) -> pd.DataFrame:
     """
     Carrega a base oficial de dados SIGMA-Q com checagem e normalização.
@@ -32,26 +111,11 @@ def carregar_base(path: str = None, usecols: list | None = None) -> pd.DataFrame
         st.stop()
 
     try:
-        # Carrega planilha
-        df = pd.read_excel(caminho, usecols=usecols)
-
-        # Normaliza nomes das colunas
-        df.columns = (
-            df.columns.str.strip()
-            .str.upper()
-            .str.normalize("NFKD")
-            .str.encode("ascii", errors="ignore")
-            .str.decode("ascii")
-            .str.replace(" ", "_")
-        )
-
-        # Remove linhas totalmente vazias
-        df = df.dropna(how="all").reset_index(drop=True)
-
-        # Aplica limpeza e padronização textual
-        df = normalizar_dataframe(df)
-
-        st.success(f"✅ Base carregada com sucesso ({len(df)} registros, {len(df.columns)} colunas).")
+        df, do_cache = ler_base(caminho, usecols=usecols)
+        if do_cache:
+            st.success(f"⚡ Base carregada do cache ({len(df)} registros, {len(df.columns)} colunas).")
+        else:
+            st.success(f"✅ Base carregada com sucesso ({len(df)} registros, {len(df.columns)} colunas).")
         return df
 
     except Exception as e:
@@ -0,0 +1,176 @@
+# ============================================
+# utils/cache_base.py
+# ============================================
+# Cache colunar (Parquet) da base oficial do SIGMA-Q.
+# A planilha é convertida uma única vez em um snapshot
+# Parquet; as próximas cargas leem o snapshot via
+# memory-map, sem parse do xlsx e sem renormalizar textos.
+# ============================================
+
+import os
+import json
+import hashlib
+import pandas as pd
+
+from utils.compactacao import tipos_arrow_para_pandas
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# =========================
+# Caminhos do cache
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+
+
+def _caminhos_snapshot(caminho: str, sufixo: str = "") -> tuple[str, str]:
+    """
+    Retorna (arquivo_parquet, arquivo_metadados) do snapshot de uma planilha.
+    O nome inclui um hash do caminho absoluto para evitar colisões.
+    """
+    caminho_abs = os.path.abspath(caminho)
+    chave = hashlib.sha1(caminho_abs.encode("utf-8")).hexdigest()[:12]
+    nome = os.path.splitext(os.path.basename(caminho_abs))[0]
+    prefixo = os.path.join(CACHE_DIR, f"{nome}_{chave}{sufixo}")
+    return prefixo + ".parquet", prefixo + ".json"
+
+
+# =========================
+# Impressão digital do arquivo
+# =========================
+def hash_conteudo(caminho: str, bloco: int = 1024 * 1024) -> str:
+    """
+    Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos.
+    """
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def impressao_digital(caminho: str) -> dict:
+    """
+    Retorna a impressão digital da planilha: caminho, mtime, tamanho e hash.
+    """
+    info = os.stat(caminho)
+    return {
+        "path": os.path.abspath(caminho),
+        "mtime": info.st_mtime,
+        "size": info.st_size,
+        "sha256": hash_conteudo(caminho),
+    }
+
+
+def _ler_metadados(arquivo_meta: str) -> dict | None:
+    try:
+        with open(arquivo_meta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _gravar_metadados(arquivo_meta: str, meta: dict):
+    temporario = arquivo_meta + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, arquivo_meta)
+
+
+# =========================
+# Leitura do snapshot
+# =========================
+def carregar_snapshot(caminho: str, modificado: bool, sufixo: str = "") -> pd.DataFrame | None:
+    """
+    Retorna o DataFrame do snapshot se ele ainda corresponder à planilha.
+
+    `modificado` é o resultado de monitorar_base para o mtime registrado no
+    snapshot. Se a planilha não mudou, o snapshot é usado sem recalcular o hash.
+    Se mudou, o hash do conteúdo decide: um arquivo apenas "tocado" (mesmo
+    conteúdo) reaproveita o snapshot e só atualiza os metadados.
+    """
+    if pq is None:
+        return None
+
+    arquivo_parquet, arquivo_meta = _caminhos_snapshot(caminho, sufixo)
+    meta = _ler_metadados(arquivo_meta)
+    if meta is None or not os.path.exists(arquivo_parquet):
+        return None
+
+    if modificado:
+        atual = impressao_digital(caminho)
+        if atual["sha256"] != meta.get("sha256"):
+            return None
+        _gravar_metadados(arquivo_meta, atual)
+
+    try:
+        tabela = pq.read_table(arquivo_parquet, memory_map=True)
+        return tabela.to_pandas(types_mapper=tipos_arrow_para_pandas)
+    except Exception as e:
+        print(f"⚠️ Snapshot inválido, será recriado: {e}")
+        return None
+
+
+def ler_snapshot_existente(caminho: str, sufixo: str = "") -> pd.DataFrame | None:
+    """
+    Lê o último snapshot gravado mesmo que a planilha tenha mudado
+    (base para reaproveitar as linhas já normalizadas).
+    """
+    if pq is None:
+        return None
+    arquivo_parquet, _ = _caminhos_snapshot(caminho, sufixo)
+    try:
+        return pq.read_table(arquivo_parquet, memory_map=True).to_pandas(types_mapper=tipos_arrow_para_pandas)
+    except Exception:
+        return None
+
+
+def mtime_snapshot(caminho: str, sufixo: str = "") -> float | None:
+    """
+    Retorna o mtime da planilha registrado no último snapshot (ou None).
+    """
+    _, arquivo_meta = _caminhos_snapshot(caminho, sufixo)
+    meta = _ler_metadados(arquivo_meta)
+    return meta.get("mtime") if meta else None
+
+
+def versao_snapshot(caminho: str, sufixo: str = "") -> str | None:
+    """
+    Retorna a versão dos dados do último snapshot (início do hash do
+    conteúdo da planilha) ou None se não houver snapshot.
+    """
+    _, arquivo_meta = _caminhos_snapshot(caminho, sufixo)
+    meta = _ler_metadados(arquivo_meta)
+    return meta["sha256"][:16] if meta and meta.get("sha256") else None
+
+
+# =========================
+# Gravação do snapshot
+# =========================
+def salvar_snapshot(caminho: str, df: pd.DataFrame, digital: dict, sufixo: str = "") -> bool:
+    """
+    Grava o DataFrame já normalizado como snapshot Parquet da planilha.
+    `digital` deve ser calculado ANTES da leitura do xlsx, para que uma
+    alteração durante a leitura não fique associada ao snapshot antigo.
+    A gravação é atômica (arquivo temporário + os.replace).
+    Retorna True se o snapshot foi gravado.
+    """
+    if pq is None:
+        return False
+
+    arquivo_parquet, arquivo_meta = _caminhos_snapshot(caminho, sufixo)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    try:
+        temporario = arquivo_parquet + ".tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, arquivo_parquet)
+        _gravar_metadados(arquivo_meta, digital)
+        return True
+    except Exception as e:
+        # Colunas com tipos mistos podem não ser serializáveis em Parquet
+        print(f"⚠️ Não foi possível gravar o snapshot da base: {e}")
+        return False
@@ -0,0 +1,207 @@
+# ============================================
+# utils/classificacao_lote.py
+# ============================================
+# Classificação em lote pela linha de comando, sem Streamlit.
+# Lê xlsx/csv/parquet em blocos de tamanho fixo, aplica a
+# mesma normalização e os mesmos artefatos do dashboard e
+# grava as previsões incrementalmente (memória limitada).
+#
+# Uso:
+#   python -m utils.classificacao_lote entrada.xlsx saida.parquet
+#   python -m utils.classificacao_lote export.csv saida.csv --bloco 100000 --processos 4
+#   python -m utils.classificacao_lote entrada.xlsx saida.parquet --servidor 127.0.0.1:8765
+# ============================================
+
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.text_normalizer import normalizar_colunas, normalizar_dataframe, detectar_coluna_texto
+from utils.model_manager import obter_modelos_versionados
+from utils.inferencia import classificar_descricoes
+from utils.servidor_inferencia import ClienteInferencia
+from utils.exportacao import exportar, formato_do_arquivo
+
+# Linhas por bloco
+TAMANHO_BLOCO = 50_000
+
+
+# =========================
+# Leitura em blocos
+# =========================
+def _blocos_xlsx(caminho: str, tamanho: int, aba=None):
+    # Modo read_only do openpyxl: linhas em streaming, sem a árvore completa
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        ws = wb[aba] if aba else wb.worksheets[0]
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = [str(c) if c is not None else f"COLUNA_{i}" for i, c in enumerate(next(linhas, []))]
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= tamanho:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        wb.close()
+
+
+def _blocos_parquet(caminho: str, tamanho: int):
+    for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho):
+        yield lote.to_pandas()
+
+
+def ler_em_blocos(caminho: str, tamanho: int = TAMANHO_BLOCO, aba=None):
+    """
+    Gera DataFrames de até `tamanho` linhas a partir de xlsx, csv ou parquet.
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao in (".xlsx", ".xlsm"):
+        return _blocos_xlsx(caminho, tamanho, aba)
+    if extensao == ".csv":
+        return pd.read_csv(caminho, chunksize=tamanho, dtype=str, keep_default_na=False, na_values=[""])
+    if extensao == ".parquet":
+        return _blocos_parquet(caminho, tamanho)
+    raise ValueError(f"Formato de entrada não suportado: {extensao}")
+
+
+# =========================
+# Conversão para lotes Arrow
+# =========================
+def _lotes_arrow(df: pd.DataFrame) -> list:
+    # Colunas de texto/mistas viram string para manter o schema estável entre
+    # blocos (colunas vazias no primeiro bloco também); os demais blocos
+    # seguem o schema do primeiro (ver exportacao.exportar)
+    df = df.apply(lambda c: c.where(c.isna(), c.astype(str)) if c.dtype == object else c)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    schema = pa.schema([pa.field(f.name, pa.string()) if f.type == pa.null() else f for f in schema])
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False).to_batches()
+
+
+# =========================
+# Classificação de um bloco
+# =========================
+_modelos_worker = None
+
+
+def _inicializar_worker(usar_cache: bool, servidor: str | None = None):
+    # Cada processo carrega os artefatos uma única vez (memory-map)
+    # ou, com `servidor`, usa o serviço de inferência (conexão reutilizada)
+    global _modelos_worker
+    if servidor:
+        cliente = ClienteInferencia(servidor)
+        _modelos_worker = (cliente, None, cliente.versao_modelo() if usar_cache else None)
+        return
+    modelo, vetorizador, versao = obter_modelos_versionados()
+    _modelos_worker = (modelo, vetorizador, versao if usar_cache else None)
+
+
+def _classificar_textos(textos: list) -> list:
+    modelo, vetorizador, versao = _modelos_worker
+    return classificar_descricoes(pd.Series(textos, dtype=object), modelo, vetorizador, versao_modelo=versao).tolist()
+
+
+def _preparar_bloco(bloco: pd.DataFrame, coluna: str | None) -> tuple[pd.DataFrame, str]:
+    bloco = normalizar_colunas(bloco).dropna(how="all")
+    bloco = normalizar_dataframe(bloco)
+    col_texto = coluna or detectar_coluna_texto(bloco)
+    if not col_texto or col_texto not in bloco.columns:
+        raise ValueError("Nenhuma coluna de descrição de falha encontrada na entrada.")
+    return bloco, col_texto
+
+
+def classificar_arquivo(
+    entrada: str,
+    saida: str,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+    processos: int = 1,
+    coluna: str | None = None,
+    aba=None,
+    usar_cache: bool = True,
+    servidor: str | None = None,
+) -> int:
+    """
+    Classifica o arquivo `entrada` bloco a bloco e grava `saida` com a
+    coluna CATEGORIA_PREDITA. Com `processos` > 1 os blocos são
+    distribuídos entre processos (no máximo 2 blocos por processo em voo,
+    para limitar a memória); a ordem das linhas é preservada.
+    Com `servidor` (host:porta ou unix:/caminho) a predição é feita pelo
+    serviço de inferência em vez de carregar o modelo localmente.
+    Retorna o total de linhas classificadas.
+    """
+    formato_do_arquivo(saida)
+    total = 0
+    inicio = time.perf_counter()
+
+    def classificados():
+        if processos <= 1:
+            _inicializar_worker(usar_cache, servidor)
+            for bloco in ler_em_blocos(entrada, tamanho_bloco, aba):
+                bloco, col_texto = _preparar_bloco(bloco, coluna)
+                yield bloco, _classificar_textos(bloco[col_texto].tolist())
+            return
+        with ProcessPoolExecutor(processos, initializer=_inicializar_worker, initargs=(usar_cache, servidor)) as pool:
+            em_voo = deque()
+            for bloco in ler_em_blocos(entrada, tamanho_bloco, aba):
+                bloco, col_texto = _preparar_bloco(bloco, coluna)
+                em_voo.append((bloco, pool.submit(_classificar_textos, bloco[col_texto].tolist())))
+                if len(em_voo) >= 2 * processos:
+                    bloco_pronto, futuro = em_voo.popleft()
+                    yield bloco_pronto, futuro.result()
+            while em_voo:
+                bloco_pronto, futuro = em_voo.popleft()
+                yield bloco_pronto, futuro.result()
+
+    def lotes():
+        nonlocal total
+        for bloco, previsoes in classificados():
+            bloco["CATEGORIA_PREDITA"] = previsoes
+            total += len(bloco)
+            print(f"📦 {total:,} linhas classificadas ({total / (time.perf_counter() - inicio):,.0f} linhas/s)")
+            yield from _lotes_arrow(bloco)
+
+    # Mesmo escritor das exportações: o arquivo final só é publicado quando
+    # todos os blocos foram gravados; com erro, o temporário é removido
+    exportar(lotes(), saida)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classificação em lote do SIGMA-Q (sem interface)")
+    parser.add_argument("entrada", help="arquivo .xlsx, .csv ou .parquet")
+    parser.add_argument("saida", help="arquivo .csv, .parquet ou .xlsx com a coluna CATEGORIA_PREDITA")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas por bloco")
+    parser.add_argument("--processos", type=int, default=1, help="processos de classificação")
+    parser.add_argument("--coluna", help="coluna de descrição (padrão: detecção automática)")
+    parser.add_argument("--aba", help="aba da planilha (padrão: a primeira)")
+    parser.add_argument("--sem-cache", action="store_true", help="não usar o cache persistente de previsões")
+    parser.add_argument("--servidor", help="endereço do serviço de inferência (host:porta ou unix:/caminho)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.entrada):
+        parser.error(f"arquivo não encontrado: {args.entrada}")
+
+    inicio = time.perf_counter()
+    total = classificar_arquivo(
+        args.entrada, args.saida,
+        tamanho_bloco=args.bloco, processos=args.processos,
+        coluna=args.coluna, aba=args.aba, usar_cache=not args.sem_cache, servidor=args.servidor,
+    )
+    duracao = time.perf_counter() - inicio
+    print(f"✅ {total:,} linhas classificadas em {duracao:.1f}s → {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# ============================================
+# utils/compactacao.py
+# ============================================
+# Representação compacta da base do SIGMA-Q em memória.
+# Colunas de baixa cardinalidade (CATEGORIA, MOTIVO,
+# MODELO, TURNO...) viram categóricas, texto livre vira
+# string Arrow, números são reduzidos ao menor tipo sem
+# perda e datas são convertidas uma única vez.
+# Inclui um relatório de memória por coluna.
+# ============================================
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Texto livre: string Arrow com NaN como ausente (mesma semântica do
+# object dtype em astype(str), isna, factorize e hashes)
+TIPO_TEXTO = pd.StringDtype("pyarrow", na_value=np.nan) if pa is not None else object
+
+# Coluna vira categórica se tiver no máximo esta fração de valores distintos...
+FRACAO_CATEGORICA = 0.5
+
+# ...e no máximo esta quantidade de categorias
+MAX_CATEGORIAS = 5_000
+
+# Colunas de data convertidas para datetime64 (nomes já normalizados)
+COLUNAS_DATA = ["DATA", "DT", "DATA_REGISTRO", "DATA_LOG"]
+
+
+def _somente_texto(serie: pd.Series) -> bool:
+    # Colunas mistas (ex: números e textos) ficam como estão
+    valores = serie.dropna()
+    return len(valores) == 0 or bool(valores.map(type).eq(str).all())
+
+
+def _compactar_numero(serie: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(serie):
+        return serie
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.to_numeric(serie, downcast="integer")
+    if pd.api.types.is_float_dtype(serie):
+        # Floats que são inteiros (sem ausentes) viram inteiros pequenos;
+        # float32 só quando a conversão é exata
+        if serie.notna().all() and np.array_equal(serie, np.round(serie)):
+            return pd.to_numeric(serie, downcast="integer")
+        reduzida = serie.astype(np.float32)
+        if np.array_equal(reduzida.astype(np.float64).to_numpy(), serie.to_numpy(), equal_nan=True):
+            return reduzida
+    return serie
+
+
+def _compactar_data(serie: pd.Series) -> pd.Series:
+    # Converte só se todos os valores preenchidos forem datas válidas
+    convertida = pd.to_datetime(serie, errors="coerce")
+    if convertida.notna().sum() == serie.notna().sum():
+        return convertida
+    return serie
+
+
+def compactar_dataframe(
+    df: pd.DataFrame,
+    fracao_categorica: float = FRACAO_CATEGORICA,
+    max_categorias: int = MAX_CATEGORIAS,
+    ignorar: list | tuple = (),
+) -> pd.DataFrame:
+    """
+    Retorna uma cópia compacta de `df` com os mesmos valores:
+    categóricas para colunas repetitivas, string Arrow para texto livre,
+    inteiros/floats reduzidos e colunas de data como datetime64.
+    Colunas em `ignorar` (ex: hashes) são mantidas como estão.
+    """
+    saida = {}
+    total = max(len(df), 1)
+
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in ignorar:
+            saida[coluna] = serie
+            continue
+
+        if str(coluna).strip().upper() in COLUNAS_DATA and serie.dtype == object:
+            serie = _compactar_data(serie)
+
+        if pd.api.types.is_numeric_dtype(serie):
+            saida[coluna] = _compactar_numero(serie)
+        elif serie.dtype == object and _somente_texto(serie):
+            distintos = serie.nunique(dropna=True)
+            if distintos <= max_categorias and distintos / total <= fracao_categorica:
+                saida[coluna] = serie.astype("category")
+            else:
+                saida[coluna] = serie.astype(TIPO_TEXTO)
+        else:
+            saida[coluna] = serie
+
+    return pd.DataFrame(saida, index=df.index)
+
+
+def tipos_arrow_para_pandas(tipo):
+    """
+    `types_mapper` para pyarrow.Table.to_pandas: strings do Parquet voltam
+    como string Arrow (em vez de object) ao ler um snapshot compacto.
+    """
+    if pa is not None and TIPO_TEXTO is not object and tipo in (pa.string(), pa.large_string()):
+        return TIPO_TEXTO
+    return None
+
+
+def relatorio_memoria(antes: pd.DataFrame, depois: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Memória por coluna (MB, deep=True). Com `depois`, compara os dois
+    DataFrames e mostra o tipo e a redução de cada coluna.
+    """
+    mb_antes = antes.memory_usage(index=False, deep=True) / 1e6
+    relatorio = pd.DataFrame({
+        "COLUNA": mb_antes.index,
+        "TIPO": [str(t) for t in antes.dtypes],
+        "MB": mb_antes.to_numpy().round(3),
+    })
+    if depois is None:
+        return relatorio
+
+    mb_depois = depois.memory_usage(index=False, deep=True).reindex(mb_antes.index) / 1e6
+    relatorio = relatorio.rename(columns={"TIPO": "TIPO_ANTES", "MB": "MB_ANTES"})
+    relatorio["TIPO_DEPOIS"] = [str(depois[c].dtype) for c in mb_antes.index]
+    relatorio["MB_DEPOIS"] = mb_depois.to_numpy().round(3)
+    relatorio["REDUCAO_%"] = ((1 - mb_depois / mb_antes.replace(0, np.nan)) * 100).fillna(0).to_numpy().round(1)
+
+    total = pd.DataFrame([{
+        "COLUNA": "TOTAL", "TIPO_ANTES": "", "MB_ANTES": round(mb_antes.sum(), 3),
+        "TIPO_DEPOIS": "", "MB_DEPOIS": round(mb_depois.sum(), 3),
+        "REDUCAO_%": round((1 - mb_depois.sum() / mb_antes.sum()) * 100, 1) if mb_antes.sum() else 0.0,
+    }])
+    return pd.concat([relatorio, total], ignore_index=True)
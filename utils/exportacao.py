@@ -0,0 +1,376 @@
+# ============================================
+# utils/exportacao.py
+# ============================================
+# Exportação de resultados do SIGMA-Q em segundo plano.
+# A base classificada e o log de classificações são
+# gravados por uma thread de trabalho, lote a lote, em
+# Parquet, CSV (blocos acrescentados ao arquivo) ou xlsx
+# (openpyxl em modo write_only): a memória depende do
+# tamanho do lote, não do total de linhas. A interface
+# acompanha o progresso de cada exportação e o arquivo
+# final só aparece completo (temporário + os.replace).
+#
+# Uso:
+#   python -m utils.exportacao base --formato csv
+#   python -m utils.exportacao log --saida data/logs/log.parquet
+# ============================================
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# =========================
+# Parâmetros
+# =========================
+FORMATOS = ("xlsx", "csv", "parquet")
+
+# Linhas por lote gravado (e por atualização do progresso)
+TAMANHO_LOTE = 50_000
+
+# Separador do CSV (Excel em português usa ";" como separador de lista)
+SEPARADOR_CSV = ";"
+
+# Fatia dos lotes gravados em xlsx: o openpyxl cria um objeto Python por
+# célula, então a memória e o intervalo entre atualizações do progresso
+# dependem desta fatia
+FATIA_XLSX = 5_000
+
+# Limite de linhas de uma aba do Excel (sem o cabeçalho); acima disso
+# a exportação continua em uma nova aba
+LINHAS_POR_ABA = 1_048_575
+
+# Exportações concluídas mantidas na lista do processo
+MAX_HISTORICO = 20
+
+# Estados de uma exportação
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+CANCELADO = "cancelado"
+
+
+def formato_do_arquivo(caminho: str) -> str:
+    """
+    Formato de exportação pela extensão do arquivo ("xlsx", "csv", "parquet").
+    """
+    formato = os.path.splitext(caminho)[1].lower().lstrip(".")
+    formato = "xlsx" if formato == "xlsm" else formato
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída não suportado: .{formato}")
+    return formato
+
+
+# =========================
+# Escrita em lotes
+# =========================
+class EscritorArquivo:
+    """
+    Grava lotes Arrow em parquet (ParquetWriter), csv (pandas, bloco a
+    bloco) ou xlsx (openpyxl em modo write_only). O arquivo final só
+    aparece ao fechar (os.replace do temporário).
+    """
+
+    def __init__(self, caminho: str, schema: pa.Schema, temporario: str | None = None):
+        self.caminho = caminho
+        self.temporario = temporario or caminho + ".tmp"
+        self.formato = formato_do_arquivo(caminho)
+        self.schema = schema
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        if self.formato == "parquet":
+            self._writer = pq.ParquetWriter(self.temporario, schema)
+        elif self.formato == "csv":
+            # utf-8 com BOM: acentos corretos ao abrir no Excel
+            self._arquivo = open(self.temporario, "w", encoding="utf-8-sig", newline="")
+            self._cabecalho = True
+        else:
+            from openpyxl import Workbook
+            self._wb = Workbook(write_only=True)
+            self._nova_aba()
+
+    def _nova_aba(self):
+        self._ws = self._wb.create_sheet()
+        self._ws.append(self.schema.names)
+        self._linhas_aba = 0
+
+    def escrever(self, lote: pa.RecordBatch):
+        if self.formato == "parquet":
+            self._writer.write_batch(lote)
+        elif self.formato == "csv":
+            lote.to_pandas().to_csv(self._arquivo, sep=SEPARADOR_CSV, index=False, header=self._cabecalho)
+            self._cabecalho = False
+        else:
+            for linha in zip(*(coluna.to_pylist() for coluna in lote.columns)):
+                if self._linhas_aba == LINHAS_POR_ABA:
+                    self._nova_aba()
+                self._ws.append(linha)
+                self._linhas_aba += 1
+
+    def _fechar_escritor(self):
+        if self.formato == "parquet":
+            self._writer.close()
+        elif self.formato == "csv":
+            self._arquivo.close()
+
+    def fechar(self):
+        self._fechar_escritor()
+        if self.formato == "xlsx":
+            self._wb.save(self.temporario)
+        os.replace(self.temporario, self.caminho)
+
+    def descartar(self):
+        try:
+            self._fechar_escritor()
+            if self.formato == "xlsx":
+                # Fecha as abas (arquivos temporários do modo write_only)
+                for aba in self._wb.worksheets:
+                    aba.close()
+                    aba._writer.cleanup()
+        finally:
+            if os.path.exists(self.temporario):
+                os.remove(self.temporario)
+
+
+def _decodificar(lote: pa.RecordBatch) -> pa.RecordBatch:
+    # Categóricas (dicionários Arrow) viram a coluna de valores
+    colunas = [c.dictionary_decode() if pa.types.is_dictionary(c.type) else c for c in lote.columns]
+    return pa.RecordBatch.from_arrays(colunas, names=lote.schema.names)
+
+
+def _ajustar(lote: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    # Lotes de arquivos diferentes (ex: partições do log) seguem o esquema
+    # do primeiro; colunas ausentes ficam vazias
+    if lote.schema.equals(schema):
+        return lote
+    colunas = []
+    for campo in schema:
+        i = lote.schema.get_field_index(campo.name)
+        colunas.append(pa.nulls(lote.num_rows, campo.type) if i < 0 else lote.column(i).cast(campo.type))
+    return pa.RecordBatch.from_arrays(colunas, schema=schema)
+
+
+def _sem_dicionarios(schema: pa.Schema) -> pa.Schema:
+    return pa.schema([
+        campo.with_type(campo.type.value_type) if pa.types.is_dictionary(campo.type) else campo
+        for campo in schema
+    ])
+
+
+def lotes_origem(origem, tamanho: int = TAMANHO_LOTE, colunas: list | None = None) -> tuple:
+    """
+    Retorna (lotes Arrow, total de linhas ou None, esquema ou None) de
+    uma tabela Arrow, de um DataFrame (convertido bloco a bloco) ou de
+    um iterável de lotes.
+    """
+    if isinstance(origem, pa.Table):
+        tabela = origem.select(colunas) if colunas else origem
+        return tabela.to_batches(max_chunksize=tamanho), tabela.num_rows, _sem_dicionarios(tabela.schema)
+
+    if isinstance(origem, pd.DataFrame):
+        df = origem[colunas] if colunas else origem
+
+        def blocos():
+            for inicio in range(0, len(df), tamanho):
+                yield from pa.Table.from_pandas(df.iloc[inicio:inicio + tamanho], preserve_index=False).to_batches()
+
+        return blocos(), len(df), _sem_dicionarios(pa.Schema.from_pandas(df, preserve_index=False))
+
+    if colunas:
+        return (lote.select(colunas) for lote in origem), None, None
+    return iter(origem), None, None
+
+
+def exportar(lotes, destino: str, schema: pa.Schema | None = None, progresso=None, cancelada=None, temporario: str | None = None) -> int | None:
+    """
+    Grava os lotes Arrow em `destino` (formato pela extensão), sem manter
+    mais de um lote na memória. `progresso(linhas)` é chamado após cada
+    lote; se `cancelada()` retornar True, o temporário é descartado.
+    Retorna as linhas gravadas (None se cancelada).
+    """
+    fatia = FATIA_XLSX if formato_do_arquivo(destino) == "xlsx" else None
+    escritor = None
+    linhas = 0
+    try:
+        for lote in lotes:
+            lote = _decodificar(lote)
+            if escritor is None:
+                schema = schema or lote.schema
+                escritor = EscritorArquivo(destino, schema, temporario)
+            lote = _ajustar(lote, schema)
+            for inicio in range(0, lote.num_rows, fatia or max(lote.num_rows, 1)):
+                parte = lote.slice(inicio, fatia) if fatia else lote
+                escritor.escrever(parte)
+                linhas += parte.num_rows
+                if progresso is not None:
+                    progresso(linhas)
+                if cancelada is not None and cancelada():
+                    escritor.descartar()
+                    return None
+
+        if escritor is None:
+            if schema is None:
+                raise ValueError("Nada para exportar.")
+            escritor = EscritorArquivo(destino, schema, temporario)
+        escritor.fechar()
+        return linhas
+    except BaseException:
+        if escritor is not None:
+            escritor.descartar()
+        raise
+
+
+# =========================
+# Exportações em segundo plano
+# =========================
+class Exportacao:
+    """
+    Estado de uma exportação em segundo plano: a interface lê `estado`,
+    `progresso` e `mensagem`; `cancelar()` interrompe no próximo lote.
+    """
+
+    def __init__(self, destino: str, formato: str, total: int | None):
+        self.id = uuid.uuid4().hex[:12]
+        self.destino = destino
+        self.formato = formato
+        self.total = total
+        self.linhas = 0
+        self.estado = EM_ANDAMENTO
+        self.mensagem = f"📤 Exportando para {destino}..."
+        self.inicio = time.time()
+        self.fim = None
+        self.thread = None
+        self._cancelar = threading.Event()
+
+    @property
+    def progresso(self) -> float:
+        if self.estado != EM_ANDAMENTO:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.linhas / self.total, 0.99)
+
+    @property
+    def segundos(self) -> float:
+        return (self.fim or time.time()) - self.inicio
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def _reportar(self, linhas: int):
+        self.linhas = linhas
+        total = f"{self.total:,}" if self.total else "?"
+        self.mensagem = f"📤 {self.destino}: {linhas:,} de {total} linhas"
+        if self.total and linhas >= self.total and self.formato == "xlsx":
+            self.mensagem = f"🗜️ {self.destino}: finalizando a planilha..."
+
+    def _executar(self, lotes, schema):
+        try:
+            linhas = exportar(
+                lotes, self.destino, schema=schema, progresso=self._reportar,
+                cancelada=self._cancelar.is_set, temporario=f"{self.destino}.{self.id}.tmp",
+            )
+            if linhas is None:
+                self.estado, self.mensagem = CANCELADO, f"⏹️ Exportação para {self.destino} cancelada."
+            else:
+                self.linhas = linhas
+                self.estado, self.mensagem = CONCLUIDO, f"📁 {linhas:,} linhas exportadas para {self.destino}"
+        except Exception as e:
+            self.estado, self.mensagem = ERRO, f"❌ Erro ao exportar {self.destino}: {e}"
+        finally:
+            self.fim = time.time()
+        print(f"{self.mensagem} ({self.segundos:.1f}s).")
+
+
+class _Exportacoes:
+    """
+    Exportações do processo (as mais recentes por último). Compartilhado
+    por todas as sessões do Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tarefas = {}
+
+
+_exportacoes = _Exportacoes()
+
+
+def iniciar_exportacao(
+    origem, destino: str, total: int | None = None, colunas: list | None = None, tamanho: int = TAMANHO_LOTE,
+) -> Exportacao:
+    """
+    Dispara a exportação de `origem` (tabela Arrow, DataFrame ou iterável
+    de lotes Arrow) para `destino` em uma thread de trabalho e retorna o
+    seu estado. Se o mesmo destino já estiver sendo exportado, retorna a
+    exportação em andamento.
+    """
+    formato = formato_do_arquivo(destino)
+    lotes, total_origem, schema = lotes_origem(origem, tamanho, colunas)
+
+    with _exportacoes.lock:
+        for tarefa in _exportacoes.tarefas.values():
+            if tarefa.destino == destino and tarefa.estado == EM_ANDAMENTO:
+                return tarefa
+
+        exportacao = Exportacao(destino, formato, total if total is not None else total_origem)
+        _exportacoes.tarefas[exportacao.id] = exportacao
+        antigas = [t for t in _exportacoes.tarefas.values() if t.estado != EM_ANDAMENTO]
+        for tarefa in antigas[:max(len(_exportacoes.tarefas) - MAX_HISTORICO, 0)]:
+            del _exportacoes.tarefas[tarefa.id]
+
+        exportacao.thread = threading.Thread(
+            target=exportacao._executar, args=(lotes, schema), name=f"sigmaq-exportacao-{exportacao.id}", daemon=True,
+        )
+        exportacao.thread.start()
+    return exportacao
+
+
+def obter_exportacao(exportacao_id: str) -> Exportacao | None:
+    with _exportacoes.lock:
+        return _exportacoes.tarefas.get(exportacao_id)
+
+
+def exportacoes_em_andamento() -> list:
+    with _exportacoes.lock:
+        return [t for t in _exportacoes.tarefas.values() if t.estado == EM_ANDAMENTO]
+
+
+# =========================
+# Linha de comando
+# =========================
+def main(argv=None):
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from utils.ingestao_delta import ESTADO_PATH, COL_HASH
+    from utils.logger import lotes_log, contar_registros
+
+    parser = argparse.ArgumentParser(description="Exporta a base classificada ou o log do SIGMA-Q")
+    parser.add_argument("origem", choices=["base", "log"], help="base classificada persistida ou log de classificações")
+    parser.add_argument("--formato", choices=FORMATOS, default="xlsx")
+    parser.add_argument("--saida", help="arquivo de destino (padrão: data/base_classificada.<formato> ou data/logs/export_log.<formato>)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por lote")
+    args = parser.parse_args(argv)
+
+    if args.origem == "base":
+        if not os.path.exists(ESTADO_PATH):
+            parser.error(f"base classificada não encontrada: {ESTADO_PATH} (abra o dashboard uma vez)")
+        arquivo = pq.ParquetFile(ESTADO_PATH)
+        colunas = [c for c in arquivo.schema_arrow.names if c != COL_HASH]
+        lotes, total = arquivo.iter_batches(batch_size=args.lote, columns=colunas), arquivo.metadata.num_rows
+        saida = args.saida or os.path.join("data", f"base_classificada.{args.formato}")
+    else:
+        lotes, total = lotes_log(args.lote), contar_registros()
+        saida = args.saida or os.path.join("data", "logs", f"export_log.{args.formato}")
+
+    inicio = time.perf_counter()
+    linhas = exportar(lotes, saida, progresso=lambda n: print(f"\r📤 {n:,} de {total:,} linhas", end="", flush=True))
+    print(f"\n✅ {linhas:,} linhas em {time.perf_counter() - inicio:.1f}s → {saida}")
+
+
+if __name__ == "__main__":
+    main()
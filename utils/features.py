@@ -0,0 +1,366 @@
+# ============================================
+# utils/features.py
+# ============================================
+# Armazém de features esparsas do SIGMA-Q.
+# Guarda em data/cache/features a matriz de contagens
+# (CSR, scipy .npz) de cada descrição distinta, por
+# impressão digital do analisador (tokenização e n-gramas).
+# Descrições novas só acrescentam linhas (e colunas para
+# termos novos), gravadas como um segmento pequeno; os
+# segmentos são consolidados de tempos em tempos e o
+# armazém tem tamanho máximo. O TF-IDF de qualquer vetorizador com o
+# mesmo analisador é derivado dessas contagens, então
+# retreinar, avaliar ou trocar de classificador não
+# re-tokeniza a base.
+# ============================================
+
+import os
+import json
+import time
+import hashlib
+import threading
+from numbers import Integral
+import numpy as np
+
+from utils.lazy import importar_tardio
+
+# scipy e sklearn só são importados ao montar features
+sparse = importar_tardio("scipy.sparse")
+texto_sklearn = importar_tardio("sklearn.feature_extraction.text")
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FEATURES_DIR = os.path.join(BASE_DIR, "data", "cache", "features")
+
+# Segmentos em disco (um por lote de textos novos); acima disso são
+# consolidados em um único segmento
+MAX_SEGMENTOS = 32
+
+# Textos distintos mantidos no armazém; na consolidação, os usados há
+# mais tempo saem (voltam a ser tokenizados se reaparecerem)
+MAX_TEXTOS = 1_000_000
+
+# Parâmetros do vetorizador que definem os tokens (e portanto as contagens)
+PARAMETROS_ANALISADOR = [
+    "input", "encoding", "decode_error", "strip_accents", "lowercase",
+    "preprocessor", "tokenizer", "analyzer", "stop_words", "token_pattern", "ngram_range",
+]
+
+
+def impressao_analisador(vetorizador) -> str:
+    """
+    Hash dos parâmetros de tokenização de um CountVectorizer/TfidfVectorizer.
+    Vetorizadores com vocabulário, max_features ou idf diferentes, mas com o
+    mesmo analisador, compartilham as mesmas contagens.
+    """
+    parametros = {p: repr(getattr(vetorizador, p, None)) for p in PARAMETROS_ANALISADOR}
+    bruto = json.dumps(parametros, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(bruto).hexdigest()[:16]
+
+
+def _contador(vetorizador):
+    # CountVectorizer com o mesmo analisador, sem cortes de vocabulário
+    parametros = {p: getattr(vetorizador, p) for p in PARAMETROS_ANALISADOR if hasattr(vetorizador, p)}
+    return texto_sklearn.CountVectorizer(**parametros, dtype=np.int64)
+
+
+# =========================
+# Armazém por analisador
+# =========================
+class ArmazemFeatures:
+    """
+    Matriz de contagens (uma linha por texto distinto, uma coluna por termo)
+    persistida em disco e compartilhada pelo processo.
+    Cada segmento em disco é autocontido (textos, termos e contagens
+    locais), então processos diferentes podem acrescentar segmentos ao
+    mesmo armazém sem coordenação.
+    """
+
+    def __init__(self, vetorizador, diretorio: str = FEATURES_DIR):
+        self.vetorizador = vetorizador
+        self.digital = impressao_analisador(vetorizador)
+        self.diretorio = os.path.join(diretorio, self.digital)
+        # Formato anterior (matriz única), lido como o primeiro segmento
+        self._legado = os.path.join(diretorio, f"{self.digital}.json")
+        self.lock = threading.Lock()
+        self.linhas = {}
+        self.termos = []
+        self._colunas = {}
+        self.matriz = None
+        self._uso = np.zeros(0, dtype=np.int64)
+        self._chamadas = 0
+        self._segmentos = set()
+
+    # -------------------------
+    # Persistência em segmentos
+    # -------------------------
+    @staticmethod
+    def _caminho_matriz(caminho_meta: str) -> str:
+        return os.path.splitext(caminho_meta)[0] + ".npz"
+
+    def _listar_segmentos(self) -> list:
+        try:
+            nomes = sorted(n for n in os.listdir(self.diretorio) if n.endswith(".json"))
+        except OSError:
+            nomes = []
+        segmentos = [os.path.join(self.diretorio, n) for n in nomes]
+        if os.path.exists(self._legado):
+            segmentos.insert(0, self._legado)
+        return segmentos
+
+    def _carregar_novos_segmentos(self):
+        # Outro processo (ex: o treinamento) pode ter acrescentado segmentos
+        for caminho in self._listar_segmentos():
+            if caminho in self._segmentos:
+                continue
+            try:
+                with open(caminho, encoding="utf-8") as f:
+                    meta = json.load(f)
+                matriz = sparse.load_npz(self._caminho_matriz(caminho)).tocsr()
+                if matriz.shape != (len(meta["textos"]), len(meta["termos"])):
+                    raise ValueError("dimensões não conferem com os metadados")
+            except FileNotFoundError:
+                # Consolidado por outro processo durante a leitura
+                continue
+            except Exception as e:
+                # Fica na lista para ser descartado na próxima consolidação
+                print(f"⚠️ Segmento inválido do armazém de features ignorado: {e}")
+                self._segmentos.add(caminho)
+                continue
+            self._incorporar(meta["textos"], meta["termos"], matriz)
+            self._segmentos.add(caminho)
+
+    def _gravar_segmento(self, textos: list, termos: list, matriz) -> bool:
+        os.makedirs(self.diretorio, exist_ok=True)
+        base = os.path.join(self.diretorio, f"{time.time_ns():020d}_{os.getpid()}")
+        try:
+            # Matriz antes dos metadados: o .json só aparece com o segmento completo
+            sparse.save_npz(base + ".tmp.npz", matriz, compressed=False)
+            os.replace(base + ".tmp.npz", base + ".npz")
+            with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+                json.dump({"textos": textos, "termos": termos}, f, ensure_ascii=False)
+            os.replace(base + ".json.tmp", base + ".json")
+        except Exception as e:
+            print(f"⚠️ Não foi possível gravar o armazém de features: {e}")
+            return False
+        self._segmentos.add(base + ".json")
+        return True
+
+    def _podar(self, limite: int):
+        # Mantém os `limite` textos usados mais recentemente (empate: os mais novos)
+        ordem = np.lexsort((np.arange(len(self._uso)), self._uso))
+        manter = np.sort(ordem[-limite:])
+        textos = list(self.linhas)
+        self.matriz = self.matriz[manter]
+        self._uso = self._uso[manter]
+        self.linhas = {textos[i]: n for n, i in enumerate(manter.tolist())}
+
+        # Termos que ficaram sem nenhuma ocorrência saem das colunas
+        usados = np.flatnonzero(np.diff(self.matriz.tocsc().indptr))
+        self.matriz = self.matriz[:, usados]
+        self.termos = [self.termos[j] for j in usados.tolist()]
+        self._colunas = {termo: j for j, termo in enumerate(self.termos)}
+        print(f"🧮 Armazém de features podado: {len(textos) - len(manter)} textos antigos removidos.")
+
+    def _consolidar(self):
+        """
+        Regrava o armazém como um único segmento (podado a MAX_TEXTOS) e
+        remove os segmentos já incorporados.
+        """
+        if len(self.linhas) > MAX_TEXTOS:
+            # Os textos da chamada atual nunca são podados
+            self._podar(max(MAX_TEXTOS, int((self._uso == self._chamadas).sum())))
+        antigos = self._segmentos
+        self._segmentos = set()
+        if not self._gravar_segmento(list(self.linhas), list(self.termos), self.matriz):
+            self._segmentos = antigos
+            return
+        for caminho in antigos:
+            # Metadados primeiro: sem o .json, o segmento deixa de ser listado
+            for arquivo in (caminho, self._caminho_matriz(caminho)):
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+
+    # -------------------------
+    # Contagens
+    # -------------------------
+    def _tokenizar(self, novos: list) -> tuple:
+        # Contagens locais: colunas = termos dos próprios textos
+        contagem = _contador(self.vetorizador)
+        try:
+            locais = contagem.fit_transform(novos).tocsr()
+        except ValueError:
+            # Nenhum token nos textos novos (ex: só pontuação)
+            return [], sparse.csr_matrix((len(novos), 0), dtype=np.int64)
+        return sorted(contagem.vocabulary_, key=contagem.vocabulary_.get), locais
+
+    def _incorporar(self, textos: list, termos: list, locais):
+        # Termos novos viram colunas no fim; as linhas antigas ficam com zero nelas
+        for termo in termos:
+            if termo not in self._colunas:
+                self._colunas[termo] = len(self.termos)
+                self.termos.append(termo)
+        mapa = np.fromiter((self._colunas[t] for t in termos), dtype=np.int64, count=len(termos))
+
+        # Textos já presentes (ex: gravados também por outro processo) ficam de fora
+        manter = np.fromiter((t not in self.linhas for t in textos), dtype=bool, count=len(textos))
+        if not manter.all():
+            locais = locais[np.flatnonzero(manter)]
+            textos = [t for t, m in zip(textos, manter) if m]
+        if not textos:
+            return
+
+        # Cópias: sort_indices reordena os arrays no lugar e `locais` ainda
+        # é gravado como segmento (com os índices locais na ordem original)
+        linhas_novas = sparse.csr_matrix(
+            (locais.data.copy(), mapa[locais.indices] if len(mapa) else locais.indices.copy(), locais.indptr.copy()),
+            shape=(len(textos), len(self.termos)),
+        )
+        linhas_novas.sort_indices()
+        if self.matriz is None:
+            self.matriz = linhas_novas
+        else:
+            self.matriz.resize((self.matriz.shape[0], len(self.termos)))
+            self.matriz = sparse.vstack([self.matriz, linhas_novas], format="csr")
+
+        for texto in textos:
+            self.linhas[texto] = len(self.linhas)
+        self._uso = np.concatenate([self._uso, np.zeros(len(textos), dtype=np.int64)])
+
+    def contagens(self, textos) -> tuple:
+        """
+        Retorna (matriz de contagens alinhada a `textos`, termos das colunas).
+        Só os textos ainda ausentes do armazém são tokenizados; eles são
+        gravados como um segmento novo (custo proporcional ao lote).
+        """
+        textos = [str(t) for t in textos]
+        with self.lock:
+            self._carregar_novos_segmentos()
+            novos = list(dict.fromkeys(t for t in textos if t not in self.linhas))
+            if novos:
+                termos, locais = self._tokenizar(novos)
+                self._incorporar(novos, termos, locais)
+                self._gravar_segmento(novos, termos, locais)
+            if self.matriz is None:
+                return sparse.csr_matrix((0, 0), dtype=np.int64), []
+
+            posicoes = np.fromiter((self.linhas[t] for t in textos), dtype=np.int64, count=len(textos))
+            self._chamadas += 1
+            self._uso[posicoes] = self._chamadas
+            resultado = self.matriz[posicoes], list(self.termos)
+
+            if len(self._segmentos) > MAX_SEGMENTOS or len(self.linhas) > MAX_TEXTOS:
+                self._consolidar()
+            return resultado
+
+
+# =========================
+# Armazém único por analisador
+# =========================
+_armazens: dict = {}
+_lock = threading.Lock()
+
+
+def obter_armazem(vetorizador, diretorio: str = FEATURES_DIR) -> ArmazemFeatures:
+    """
+    Retorna o armazém (compartilhado pelo processo) do analisador do vetorizador.
+    """
+    chave = (impressao_analisador(vetorizador), os.path.abspath(diretorio))
+    with _lock:
+        armazem = _armazens.get(chave)
+        if armazem is None:
+            armazem = _armazens[chave] = ArmazemFeatures(vetorizador, diretorio)
+        return armazem
+
+
+# =========================
+# Vetorizadores a partir das contagens
+# =========================
+def ajustar_vetorizador(vetorizador, contagens, termos: list):
+    """
+    Equivalente a `vetorizador.fit_transform(textos)` usando as contagens
+    do armazém: aplica min_df/max_df/max_features e o idf como o sklearn.
+    Retorna (vetorizador ajustado, matriz de features).
+    """
+    # Vocabulário do sklearn: termos presentes no conjunto, em ordem alfabética
+    X = contagens.tocsc()
+    presentes = np.flatnonzero(np.diff(X.indptr))
+    presentes = presentes[np.argsort(np.array(termos, dtype=object)[presentes])]
+    X = X[:, presentes].tocsr()
+    if vetorizador.binary:
+        X.data.fill(1)
+
+    # Cortes de frequência (mesma regra de CountVectorizer._limit_features)
+    n_docs = X.shape[0]
+    max_df, min_df = vetorizador.max_df, vetorizador.min_df
+    alto = max_df if isinstance(max_df, Integral) else max_df * n_docs
+    baixo = min_df if isinstance(min_df, Integral) else min_df * n_docs
+    if alto < baixo:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    frequencia_docs = np.bincount(X.indices, minlength=X.shape[1])
+    mascara = (frequencia_docs <= alto) & (frequencia_docs >= baixo)
+    limite = vetorizador.max_features
+    if limite is not None and mascara.sum() > limite:
+        frequencia_termos = np.asarray(X.sum(axis=0)).ravel()
+        escolhidos = (-frequencia_termos[mascara]).argsort()[:limite]
+        nova = np.zeros(len(mascara), dtype=bool)
+        nova[np.flatnonzero(mascara)[escolhidos]] = True
+        mascara = nova
+    if not mascara.any():
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    X = X[:, np.flatnonzero(mascara)].astype(vetorizador.dtype)
+    vocabulario = np.array(termos, dtype=object)[presentes[mascara]]
+    vetorizador.vocabulary_ = {termo: i for i, termo in enumerate(vocabulario)}
+    vetorizador.fixed_vocabulary_ = False
+
+    if isinstance(vetorizador, texto_sklearn.TfidfVectorizer):
+        tfidf = texto_sklearn.TfidfTransformer(
+            norm=vetorizador.norm, use_idf=vetorizador.use_idf,
+            smooth_idf=vetorizador.smooth_idf, sublinear_tf=vetorizador.sublinear_tf,
+        ).fit(X)
+        # Mesmo atributo interno que TfidfVectorizer.fit preenche
+        vetorizador._tfidf = tfidf
+        X = tfidf.transform(X, copy=False)
+    return vetorizador, X
+
+
+def transformar(vetorizador, contagens, termos: list):
+    """
+    Equivalente a `vetorizador.transform(textos)` para um vetorizador já
+    ajustado, usando as contagens do armazém.
+    """
+    colunas = {termo: j for j, termo in enumerate(termos)}
+    origem, destino = [], []
+    for termo, indice in vetorizador.vocabulary_.items():
+        if termo in colunas:
+            origem.append(colunas[termo])
+            destino.append(indice)
+
+    # Projeção termo do armazém -> coluna do vetorizador
+    projecao = sparse.csr_matrix(
+        (np.ones(len(origem), dtype=np.int64), (origem, destino)),
+        shape=(len(termos), len(vetorizador.vocabulary_)),
+    )
+    X = (contagens @ projecao).tocsr()
+    X.sort_indices()
+    if vetorizador.binary:
+        X.data.fill(1)
+    X = X.astype(vetorizador.dtype)
+
+    if isinstance(vetorizador, texto_sklearn.TfidfVectorizer):
+        X = vetorizador._tfidf.transform(X, copy=False)
+    return X
+
+
+def features_textos(vetorizador, textos):
+    """
+    Features de `textos` para um vetorizador ajustado, via armazém.
+    """
+    contagens, termos = obter_armazem(vetorizador).contagens(textos)
+    return transformar(vetorizador, contagens, termos)
@@ -0,0 +1,191 @@
+# ============================================
+# utils/inferencia.py
+# ============================================
+# Classificação deduplicada das descrições de falha.
+# Cada descrição distinta é prevista uma única vez e o
+# resultado é replicado para todas as linhas. As previsões
+# ficam em um cache persistente (SQLite) chaveado por
+# (versão do modelo, texto normalizado).
+# ============================================
+
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.text_normalizer import aplicar_unicos
+from utils.instrumentacao import instrumentado
+from utils.features import features_textos
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_PATH = os.path.join(BASE_DIR, "data", "cache", "predicoes.sqlite")
+
+# Quantas versões de modelo manter no cache persistente
+MAX_VERSOES = 3
+
+
+# =========================
+# Chave de texto
+# =========================
+def chave_texto(texto) -> str:
+    """
+    Normaliza a descrição para uso como chave de deduplicação.
+    Minúsculas e espaços colapsados não alteram os tokens do
+    TfidfVectorizer padrão (lowercase=True), logo a previsão
+    da chave é a mesma da descrição original.
+    """
+    return " ".join(str(texto).lower().split())
+
+
+def _usa_vocabulario(modelo) -> bool:
+    # Pipeline cujo 1º passo é um vetorizador de contagens (TF-IDF/Count)
+    return hasattr(modelo, "steps") and hasattr(modelo.steps[0][1], "vocabulary_")
+
+
+def _prever_com_armazem(modelo, textos: list) -> np.ndarray:
+    # Separa o vetorizador (1º passo do Pipeline) do classificador
+    return modelo[1:].predict(features_textos(modelo[0], textos))
+
+
+@instrumentado("predict")
+def prever_textos(modelo, vetorizador, textos: list, usar_armazem: bool = False) -> np.ndarray:
+    """
+    Executa o modelo sobre uma lista de textos. Todo modelo entregue pelo
+    model_manager (pacote, Pipeline ou cliente do serviço de inferência)
+    recebe texto bruto; `vetorizador` é mantido por compatibilidade.
+    Com `usar_armazem`, um Pipeline com vocabulário usa as features do
+    armazém (textos já tokenizados por qualquer modelo anterior não são
+    re-tokenizados). O pacote tem analisador próprio e não precisa dele.
+    """
+    if usar_armazem and _usa_vocabulario(modelo):
+        try:
+            return _prever_com_armazem(modelo, textos)
+        except Exception as e:
+            print(f"⚠️ Armazém de features indisponível ({e}); vetorizando diretamente.")
+    return modelo.predict(textos)
+
+
+# =========================
+# Cache persistente de previsões
+# =========================
+class CachePredicoes:
+    """
+    Cache (versão do modelo, texto) -> categoria em SQLite (modo WAL).
+    Mantém em memória apenas as entradas da versão mais recente consultada.
+    """
+
+    def __init__(self, caminho: str = CACHE_PATH):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._versao_memo = None
+        self._memo = {}
+
+    def _conectar(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        con = sqlite3.connect(self.caminho, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS predicoes ("
+            " versao TEXT NOT NULL, texto TEXT NOT NULL, categoria,"
+            " PRIMARY KEY (versao, texto))"
+        )
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS versoes (versao TEXT PRIMARY KEY, criado_em REAL)"
+        )
+        return con
+
+    def buscar(self, versao: str) -> dict:
+        """
+        Retorna o dicionário texto -> categoria da versão informada.
+        """
+        with self._lock:
+            if self._versao_memo == versao:
+                return self._memo
+
+            con = self._conectar()
+            try:
+                linhas = con.execute(
+                    "SELECT texto, categoria FROM predicoes WHERE versao = ?", (versao,)
+                ).fetchall()
+            finally:
+                con.close()
+
+            self._versao_memo = versao
+            self._memo = dict(linhas)
+            return self._memo
+
+    def gravar(self, versao: str, pares: list[tuple]):
+        """
+        Persiste novos pares (texto, categoria) para a versão informada
+        e descarta versões antigas além de MAX_VERSOES.
+        """
+        if not pares:
+            return
+
+        with self._lock:
+            con = self._conectar()
+            try:
+                with con:
+                    con.execute(
+                        "INSERT OR IGNORE INTO versoes (versao, criado_em) VALUES (?, ?)",
+                        (versao, time.time()),
+                    )
+                    con.executemany(
+                        "INSERT OR REPLACE INTO predicoes (versao, texto, categoria) VALUES (?, ?, ?)",
+                        [(versao, texto, categoria) for texto, categoria in pares],
+                    )
+                    antigas = con.execute(
+                        "SELECT versao FROM versoes ORDER BY criado_em DESC LIMIT -1 OFFSET ?",
+                        (MAX_VERSOES,),
+                    ).fetchall()
+                    for (antiga,) in antigas:
+                        con.execute("DELETE FROM predicoes WHERE versao = ?", (antiga,))
+                        con.execute("DELETE FROM versoes WHERE versao = ?", (antiga,))
+            finally:
+                con.close()
+
+            if self._versao_memo == versao:
+                self._memo.update(pares)
+
+
+# Instância única por processo (compartilhada entre reruns e sessões)
+_cache = CachePredicoes()
+
+
+# =========================
+# Classificação deduplicada
+# =========================
+def classificar_descricoes(
+    descricoes: pd.Series, modelo, vetorizador, versao_modelo: str | None = None, usar_armazem: bool = False
+) -> np.ndarray:
+    """
+    Classifica uma série de descrições prevendo apenas os textos distintos.
+
+    Com `versao_modelo` informado, usa o cache persistente: só os textos
+    nunca vistos por essa versão do modelo vão para o predict.
+    `usar_armazem` reaproveita as features persistidas (ver utils.features).
+    Retorna um array com uma categoria por linha, na ordem original.
+    """
+    chaves = aplicar_unicos(descricoes.astype(str), chave_texto)
+    codigos, unicos = pd.factorize(chaves)
+
+    conhecidos = _cache.buscar(versao_modelo) if versao_modelo else {}
+    faltantes = [texto for texto in unicos if texto not in conhecidos]
+
+    novos = {}
+    if faltantes:
+        previsoes = prever_textos(modelo, vetorizador, faltantes, usar_armazem=usar_armazem)
+        novos = dict(zip(faltantes, previsoes.tolist()))
+        if versao_modelo:
+            _cache.gravar(versao_modelo, list(novos.items()))
+
+    print(f"🧠 {len(unicos)} descrições distintas — {len(faltantes)} enviadas ao modelo.")
+
+    rotulos = np.empty(len(unicos), dtype=object)
+    rotulos[:] = [novos[t] if t in novos else conhecidos[t] for t in unicos]
+    return rotulos[codigos]
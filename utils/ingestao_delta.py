@@ -0,0 +1,251 @@
+# ============================================
+# utils/ingestao_delta.py
+# ============================================
+# Ingestão incremental (delta) da base oficial do SIGMA-Q.
+# Cada linha recebe uma impressão digital estável (hash das
+# colunas-chave); linhas já vistas reaproveitam o resultado
+# persistido e só as linhas novas ou alteradas passam por
+# normalizar_dataframe, preprocessar_dataframe e predição.
+# O custo de uma atualização diária cresce com o delta,
+# não com o histórico.
+# ============================================
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from utils.text_normalizer import normalizar_dataframe
+from utils.text_processor import preprocessar_dataframe
+from utils.inferencia import classificar_descricoes
+from utils.compactacao import compactar_dataframe, tipos_arrow_para_pandas
+from utils.instrumentacao import instrumentado
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ESTADO_PATH = os.path.join(BASE_DIR, "data", "cache", "base_classificada.parquet")
+
+# Hash da linha bruta (antes da normalização) guardado no snapshot da base
+COL_HASH_BRUTO = "HASH_BRUTO"
+
+# Hash da linha normalizada guardado na base classificada
+COL_HASH = "HASH_LINHA"
+
+# Colunas derivadas pelo pipeline (não entram no hash)
+COLUNAS_DERIVADAS = ["TEXTO_PROCESSADO", "CATEGORIA_PREDITA", COL_HASH, COL_HASH_BRUTO]
+
+# Colunas-chave do hash (None = todas as colunas da planilha)
+COLUNAS_CHAVE = None
+
+# Incrementar quando a normalização/lematização ou o hash mudar (invalida o estado)
+VERSAO_PIPELINE = 2
+
+
+# =========================
+# Impressão digital das linhas
+# =========================
+def _forma_canonica(serie: pd.Series) -> pd.Series:
+    # Mesmo valor, mesmo hash: a compactação escolhe o dtype conforme os
+    # dados (int8 → int16, float32 → float64, categórica → string Arrow)
+    if pd.api.types.is_bool_dtype(serie):
+        return serie
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(np.float64)
+    if serie.dtype != object:
+        return serie.astype(object)
+    return serie
+
+
+def hash_linhas(df: pd.DataFrame, colunas: list | None = COLUNAS_CHAVE) -> np.ndarray:
+    """
+    Retorna um hash uint64 por linha sobre as colunas-chave (em ordem
+    alfabética, para não depender da ordem das colunas na planilha).
+    O hash considera só os valores, não o dtype escolhido pela compactação.
+    """
+    colunas = sorted(c for c in (colunas or df.columns) if c in df.columns and c not in COLUNAS_DERIVADAS)
+    canonico = pd.DataFrame({c: _forma_canonica(df[c]) for c in colunas}, index=df.index)
+    return pd.util.hash_pandas_object(canonico, index=False).to_numpy()
+
+
+def _mesclar(hashes: np.ndarray, conhecidos: pd.DataFrame, novos: pd.DataFrame, novo: np.ndarray) -> pd.DataFrame:
+    # Remonta a base na ordem original: linhas conhecidas vêm do estado
+    # (indexado pelo hash) e as novas do processamento do delta
+    posicoes = np.arange(len(hashes))
+    velhos = conhecidos.reindex(hashes[~novo])
+    velhos.index = posicoes[~novo]
+    novos = novos.copy()
+    novos.index = posicoes[novo]
+    partes = [p for p in (velhos, novos) if len(p)]
+    if not partes:
+        return novos.reset_index(drop=True)
+    return pd.concat(partes).sort_index().reset_index(drop=True)
+
+
+# =========================
+# Normalização incremental
+# =========================
+def normalizar_delta(bruto: pd.DataFrame, anterior: pd.DataFrame | None) -> tuple[pd.DataFrame, int]:
+    """
+    Normaliza apenas as linhas de `bruto` (planilha lida, colunas já
+    padronizadas) cujo hash não aparece no snapshot `anterior`.
+    Retorna (df normalizado com a coluna HASH_BRUTO, linhas normalizadas).
+    """
+    hashes = hash_linhas(bruto)
+
+    colunas_iguais = anterior is not None and COL_HASH_BRUTO in anterior.columns and (
+        set(anterior.columns) - {COL_HASH_BRUTO} == set(bruto.columns)
+    )
+    if not colunas_iguais:
+        df = normalizar_dataframe(bruto)
+        df[COL_HASH_BRUTO] = hashes
+        return df, len(df)
+
+    conhecidos = anterior.drop_duplicates(COL_HASH_BRUTO).set_index(COL_HASH_BRUTO)[list(bruto.columns)]
+    novo = ~np.isin(hashes, conhecidos.index.to_numpy())
+    novos = normalizar_dataframe(bruto[novo].copy()) if novo.any() else bruto.iloc[0:0]
+
+    df = _mesclar(hashes, conhecidos, novos, novo)
+    df[COL_HASH_BRUTO] = hashes
+    return df, int(novo.sum())
+
+
+# =========================
+# Base classificada persistida
+# =========================
+def _caminho_meta(caminho: str) -> str:
+    return os.path.splitext(caminho)[0] + ".json"
+
+
+def _ler_meta(caminho: str) -> dict | None:
+    try:
+        with open(_caminho_meta(caminho), encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def carregar_estado(caminho: str = ESTADO_PATH) -> tuple[pd.DataFrame | None, dict | None]:
+    """
+    Retorna (base classificada persistida, metadados) ou (None, None).
+    """
+    meta = _ler_meta(caminho)
+    if pq is None or meta is None or meta.get("versao_pipeline") != VERSAO_PIPELINE or not os.path.exists(caminho):
+        return None, None
+    try:
+        return pq.read_table(caminho, memory_map=True).to_pandas(types_mapper=tipos_arrow_para_pandas), meta
+    except Exception as e:
+        print(f"⚠️ Base classificada inválida, será recriada: {e}")
+        return None, None
+
+
+def _salvar_estado(df: pd.DataFrame, meta: dict, caminho: str):
+    if pq is None:
+        return
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    try:
+        temporario = caminho + ".tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+        temporario = _caminho_meta(caminho) + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, _caminho_meta(caminho))
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar a base classificada: {e}")
+
+
+# =========================
+# Classificação incremental
+# =========================
+@instrumentado()
+def classificar_delta(
+    df: pd.DataFrame,
+    coluna_texto: str,
+    modelo,
+    vetorizador,
+    versao_modelo: str | None,
+    versao_dados: str | None = None,
+    caminho: str = ESTADO_PATH,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Acrescenta TEXTO_PROCESSADO e CATEGORIA_PREDITA a `df` (base já
+    normalizada) processando apenas as linhas ausentes da base
+    classificada persistida. Com um modelo novo, os textos processados
+    são reaproveitados e só a predição é refeita (o cache de predições
+    por texto evita repetir descrições já vistas).
+
+    Se `versao_dados` e `versao_modelo` coincidirem com o estado, a base
+    persistida é devolvida sem nem calcular hashes.
+    Retorna (df classificado, estatísticas do delta).
+    """
+    estado, meta = carregar_estado(caminho)
+    mesma_coluna = meta is not None and meta.get("coluna_texto") == coluna_texto
+
+    if (
+        estado is not None and mesma_coluna and versao_dados and versao_modelo
+        and meta.get("versao_dados") == versao_dados and meta.get("versao_modelo") == versao_modelo
+    ):
+        return estado, {"linhas": len(estado), "novas": 0, "removidas": 0, "reclassificadas": 0}
+
+    hashes = hash_linhas(df)
+    df = df.drop(columns=[c for c in COLUNAS_DERIVADAS if c in df.columns])
+
+    if estado is None or not mesma_coluna or COL_HASH not in estado.columns:
+        conhecidos = pd.DataFrame(columns=list(df.columns) + ["TEXTO_PROCESSADO", "CATEGORIA_PREDITA"])
+    else:
+        conhecidos = estado.drop_duplicates(COL_HASH).set_index(COL_HASH)
+
+    novo = ~np.isin(hashes, conhecidos.index.to_numpy())
+    removidas = int(len(conhecidos) - np.isin(conhecidos.index.to_numpy(), hashes).sum())
+
+    novos = df[novo].copy()
+    if len(novos):
+        novos = preprocessar_dataframe(novos, coluna_texto=coluna_texto)
+        novos["CATEGORIA_PREDITA"] = classificar_descricoes(
+            novos[coluna_texto].astype(str), modelo, vetorizador, versao_modelo=versao_modelo, usar_armazem=True
+        )
+
+    colunas = list(df.columns) + ["TEXTO_PROCESSADO", "CATEGORIA_PREDITA"]
+    conhecidos = conhecidos.reindex(columns=colunas)
+    resultado = _mesclar(hashes, conhecidos, novos[colunas] if len(novos) else novos.reindex(columns=colunas), novo)
+
+    # Modelo novo: reclassifica as linhas antigas (textos já processados)
+    reclassificadas = 0
+    if meta is not None and meta.get("versao_modelo") != versao_modelo and (~novo).any():
+        antigas = np.flatnonzero(~novo)
+        # O estado guarda a coluna como categórica; o modelo novo pode prever classes inéditas
+        resultado["CATEGORIA_PREDITA"] = resultado["CATEGORIA_PREDITA"].astype(object)
+        resultado.loc[antigas, "CATEGORIA_PREDITA"] = classificar_descricoes(
+            resultado.loc[antigas, coluna_texto].astype(str), modelo, vetorizador,
+            versao_modelo=versao_modelo, usar_armazem=True,
+        )
+        reclassificadas = len(antigas)
+
+    resultado[COL_HASH] = hashes
+    resultado = compactar_dataframe(resultado, ignorar=[COL_HASH])
+    estatisticas = {
+        "linhas": len(resultado), "novas": int(novo.sum()),
+        "removidas": removidas, "reclassificadas": reclassificadas,
+    }
+
+    if estatisticas["novas"] or removidas or reclassificadas or meta is None or meta.get("versao_dados") != versao_dados:
+        _salvar_estado(resultado, {
+            "versao_pipeline": VERSAO_PIPELINE,
+            "versao_dados": versao_dados,
+            "versao_modelo": versao_modelo,
+            "coluna_texto": coluna_texto,
+            **estatisticas,
+        }, caminho)
+
+    print(
+        f"🔁 Delta: {estatisticas['novas']} linhas novas/alteradas, {removidas} removidas, "
+        f"{reclassificadas} reclassificadas ({len(resultado)} no total)."
+    )
+    return resultado, estatisticas
@@ -0,0 +1,342 @@
+# ============================================
+# utils/ingestao_excel.py
+# ============================================
+# Leitura de planilhas xlsx em streaming, sem Streamlit.
+# As linhas vêm do openpyxl em modo read_only (sem a árvore
+# completa da planilha) e viram lotes Arrow de tamanho fixo;
+# os tipos (inteiro, decimal, data...) são deduzidos lote a
+# lote e aplicados no fim. Uma pasta de planilhas mensais é
+# convertida em paralelo (um processo por arquivo) e unida
+# em uma única base xlsx ou parquet, lote a lote: a memória
+# depende do tamanho do lote, não do total de linhas.
+#
+# Uso:
+#   python -m utils.ingestao_excel data/mensal
+#   python -m utils.ingestao_excel data/mensal --saida base.parquet --processos 4
+# ============================================
+
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.text_normalizer import normalizar_colunas
+from utils.exportacao import EscritorArquivo
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MENSAL_DIR = os.path.join(BASE_DIR, "data", "mensal")
+DESTINO_PADRAO = os.path.join(BASE_DIR, "data", "base_de_dados_unificada.xlsx")
+
+# Linhas por lote Arrow
+TAMANHO_LOTE = 50_000
+
+# Tipo Arrow final de cada tipo deduzido
+TIPOS_ARROW = {
+    "vazio": pa.string(),
+    "texto": pa.string(),
+    "inteiro": pa.int64(),
+    "decimal": pa.float64(),
+    "logico": pa.bool_(),
+    "data": pa.timestamp("ns"),
+}
+
+_LIMITE_INT64 = 2 ** 63
+
+
+# =========================
+# Tipos por coluna
+# =========================
+def _tipo_valores(valores: tuple) -> str:
+    # Tipo de uma coluna de um lote, pelos tipos Python que o openpyxl entregou
+    tipos = set(map(type, valores))
+    tipos.discard(type(None))
+    if not tipos:
+        return "vazio"
+    if tipos == {int}:
+        numeros = [v for v in valores if v is not None]
+        return "inteiro" if -_LIMITE_INT64 <= min(numeros) and max(numeros) < _LIMITE_INT64 else "texto"
+    if tipos <= {int, float}:
+        return "decimal"
+    if tipos == {bool}:
+        return "logico"
+    if tipos <= {datetime.datetime, datetime.date}:
+        return "data"
+    return "texto"
+
+
+def combinar_tipos(a: str, b: str) -> str:
+    """
+    Tipo comum de dois lotes (ou arquivos) da mesma coluna.
+    """
+    if a == b or b == "vazio":
+        return a
+    if a == "vazio":
+        return b
+    if {a, b} == {"inteiro", "decimal"}:
+        return "decimal"
+    return "texto"
+
+
+def _converter_coluna(coluna, tipo: str):
+    # Lotes guardam texto; o tipo final só é conhecido após o último lote
+    destino = TIPOS_ARROW[tipo]
+    if coluna.type == destino:
+        return coluna
+    return pc.cast(coluna, destino)
+
+
+# =========================
+# Leitura em lotes Arrow
+# =========================
+def _cabecalho(linha: tuple) -> list:
+    nomes, vistos = [], {}
+    for i, valor in enumerate(linha):
+        nome = str(valor).strip() if valor is not None else f"COLUNA_{i}"
+        # Nomes repetidos recebem sufixo, como no pd.read_excel
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _montar_lote(linhas: list, nomes: list, indices: list) -> tuple:
+    colunas = list(zip(*linhas))
+    arrays, tipos = [], {}
+    for nome, i in zip(nomes, indices):
+        valores = colunas[i]
+        tipos[nome] = _tipo_valores(valores)
+        arrays.append(pa.array([None if v is None else str(v) for v in valores], type=pa.string()))
+    return pa.RecordBatch.from_arrays(arrays, names=nomes), tipos
+
+
+def lotes_planilha(caminho: str, tamanho: int = TAMANHO_LOTE, aba=None, colunas: list | None = None):
+    """
+    Gera (lote Arrow, tipos) com até `tamanho` linhas da planilha. As
+    colunas do lote são texto; `tipos` diz o tipo deduzido de cada coluna
+    naquele lote (ver combinar_tipos). Linhas totalmente vazias são
+    ignoradas. `colunas` restringe a leitura (nomes ou posições).
+    Uma planilha sem linhas gera um único lote vazio com o cabeçalho.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        ws = wb[aba] if aba else wb.worksheets[0]
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = _cabecalho(next(linhas, ()))
+
+        indices = list(range(len(cabecalho)))
+        if colunas is not None:
+            posicoes = {nome: i for i, nome in enumerate(cabecalho)}
+            faltantes = [c for c in colunas if not isinstance(c, int) and c not in posicoes]
+            if faltantes:
+                raise ValueError(f"Colunas não encontradas na planilha: {faltantes}")
+            indices = [c if isinstance(c, int) else posicoes[c] for c in colunas]
+        nomes = [cabecalho[i] for i in indices]
+
+        largura = len(cabecalho)
+        bloco, gerou = [], False
+        for linha in linhas:
+            if all(v is None for v in linha):
+                continue
+            # Linhas do modo read_only podem vir mais curtas ou mais longas que o cabeçalho
+            if len(linha) != largura:
+                linha = (tuple(linha) + (None,) * largura)[:largura]
+            bloco.append(linha)
+            if len(bloco) >= tamanho:
+                yield _montar_lote(bloco, nomes, indices)
+                bloco, gerou = [], True
+        if bloco:
+            yield _montar_lote(bloco, nomes, indices)
+        elif not gerou:
+            vazio = pa.RecordBatch.from_arrays([pa.array([], type=pa.string()) for _ in nomes], names=nomes)
+            yield vazio, {nome: "vazio" for nome in nomes}
+    finally:
+        wb.close()
+
+
+def ler_planilha(caminho: str, usecols: list | None = None, aba=None, tamanho: int = TAMANHO_LOTE) -> pd.DataFrame:
+    """
+    Substituto do pd.read_excel para xlsx/xlsm: lê em streaming, guarda
+    os lotes como texto Arrow (compacto) e só converte para pandas no
+    fim, já com os tipos deduzidos. Outros formatos vão para o pd.read_excel.
+    """
+    if os.path.splitext(caminho)[1].lower() not in (".xlsx", ".xlsm"):
+        return pd.read_excel(caminho, usecols=usecols, sheet_name=aba or 0)
+
+    lotes, tipos = [], {}
+    for lote, tipos_lote in lotes_planilha(caminho, tamanho, aba, usecols):
+        lotes.append(lote)
+        for nome, tipo in tipos_lote.items():
+            tipos[nome] = combinar_tipos(tipos.get(nome, "vazio"), tipo)
+
+    tabela = pa.Table.from_batches(lotes)
+    tabela = pa.table(
+        [_converter_coluna(tabela.column(nome), tipos[nome]) for nome in tabela.column_names],
+        names=tabela.column_names,
+    )
+    return tabela.to_pandas()
+
+
+# =========================
+# Conversão de um arquivo (processo de trabalho)
+# =========================
+def _converter_arquivo(caminho: str, parte: str, tamanho: int, aba) -> tuple[list, dict, int]:
+    # xlsx -> parquet de texto; retorna (colunas, tipos, linhas)
+    escritor, tipos, linhas = None, {}, 0
+    try:
+        for lote, tipos_lote in lotes_planilha(caminho, tamanho, aba):
+            if escritor is None:
+                escritor = pq.ParquetWriter(parte, lote.schema)
+            escritor.write_batch(lote)
+            linhas += lote.num_rows
+            for nome, tipo in tipos_lote.items():
+                tipos[nome] = combinar_tipos(tipos.get(nome, "vazio"), tipo)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return list(tipos), tipos, linhas
+
+
+# =========================
+# Escrita da base unificada
+# =========================
+def listar_planilhas(origem: str, padrao: str = "*.xlsx") -> list:
+    """
+    Planilhas de `origem` (pasta) em ordem de nome, sem os arquivos de
+    trava do Excel (~$...).
+    """
+    arquivos = glob.glob(os.path.join(origem, padrao))
+    return sorted(a for a in arquivos if not os.path.basename(a).startswith("~$"))
+
+
+def unificar_planilhas(
+    origem,
+    destino: str = DESTINO_PADRAO,
+    padrao: str = "*.xlsx",
+    processos: int | None = None,
+    tamanho: int = TAMANHO_LOTE,
+    aba=None,
+    coluna_origem: str | None = None,
+) -> dict:
+    """
+    Une as planilhas de `origem` (pasta ou lista de arquivos) em `destino`
+    (.xlsx ou .parquet), na ordem dos nomes dos arquivos.
+    Cada arquivo é convertido para parquet por um processo; as colunas são
+    casadas pelo nome normalizado (ex: "Desc. Falha" e "DESC. FALHA") e as
+    ausentes em um arquivo ficam vazias. Com `coluna_origem`, o nome do
+    arquivo de cada linha é gravado nessa coluna.
+    Retorna um resumo (arquivos, linhas, colunas, segundos).
+    """
+    inicio = time.perf_counter()
+    arquivos = listar_planilhas(origem, padrao) if isinstance(origem, str) else sorted(origem)
+    arquivos = [a for a in arquivos if os.path.abspath(a) != os.path.abspath(destino)]
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma planilha encontrada em: {origem}")
+
+    processos = processos or min(len(arquivos), os.cpu_count() or 1)
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix=".unificacao_", dir=os.path.dirname(os.path.abspath(destino)))
+    partes = [os.path.join(temporario, f"{i:04d}.parquet") for i in range(len(arquivos))]
+
+    try:
+        # 1) Cada planilha vira um parquet de texto (em paralelo)
+        if processos <= 1:
+            convertidos = [_converter_arquivo(a, p, tamanho, aba) for a, p in zip(arquivos, partes)]
+        else:
+            with ProcessPoolExecutor(processos) as pool:
+                futuros = [pool.submit(_converter_arquivo, a, p, tamanho, aba) for a, p in zip(arquivos, partes)]
+                convertidos = [f.result() for f in futuros]
+        for arquivo, (_, _, linhas) in zip(arquivos, convertidos):
+            print(f"📄 {os.path.basename(arquivo)}: {linhas:,} linhas")
+
+        # 2) Colunas casadas pelo nome normalizado; vale o primeiro nome visto
+        nomes, tipos = {}, {}
+        for colunas, tipos_arquivo, _ in convertidos:
+            chaves = normalizar_colunas(pd.DataFrame(columns=colunas)).columns
+            for coluna, chave in zip(colunas, chaves):
+                nomes.setdefault(chave, coluna)
+                tipos[chave] = combinar_tipos(tipos.get(chave, "vazio"), tipos_arquivo[coluna])
+        campos = [pa.field(nomes[chave], TIPOS_ARROW[tipos[chave]]) for chave in nomes]
+        if coluna_origem:
+            campos.append(pa.field(coluna_origem, pa.string()))
+        schema = pa.schema(campos)
+
+        # 3) Partes relidas lote a lote, já com os tipos finais
+        escritor = EscritorArquivo(destino, schema)
+        total = 0
+        try:
+            for arquivo, parte, (colunas, _, linhas) in zip(arquivos, partes, convertidos):
+                if not linhas:
+                    continue
+                chaves = dict(zip(normalizar_colunas(pd.DataFrame(columns=colunas)).columns, colunas))
+                for lote in pq.ParquetFile(parte).iter_batches(batch_size=tamanho):
+                    arrays = []
+                    for chave in nomes:
+                        tipo = TIPOS_ARROW[tipos[chave]]
+                        if chave in chaves:
+                            arrays.append(_converter_coluna(lote.column(chaves[chave]), tipos[chave]))
+                        else:
+                            arrays.append(pa.nulls(lote.num_rows, type=tipo))
+                    if coluna_origem:
+                        arrays.append(pa.array([os.path.basename(arquivo)] * lote.num_rows, type=pa.string()))
+                    escritor.escrever(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                    total += lote.num_rows
+            escritor.fechar()
+        except BaseException:
+            escritor.descartar()
+            raise
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    return {
+        "arquivos": len(arquivos),
+        "linhas": total,
+        "colunas": len(schema),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Une as planilhas mensais do SIGMA-Q em uma única base")
+    parser.add_argument("origem", nargs="?", default=MENSAL_DIR, help="pasta com as planilhas mensais")
+    parser.add_argument("--saida", default=DESTINO_PADRAO, help="base unificada (.xlsx ou .parquet)")
+    parser.add_argument("--padrao", default="*.xlsx", help="padrão dos arquivos na pasta")
+    parser.add_argument("--processos", type=int, help="processos de conversão (padrão: um por núcleo)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por lote")
+    parser.add_argument("--aba", help="aba das planilhas (padrão: a primeira)")
+    parser.add_argument("--coluna-origem", help="grava o nome do arquivo de cada linha nesta coluna")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.origem):
+        parser.error(f"pasta não encontrada: {args.origem}")
+
+    resumo = unificar_planilhas(
+        args.origem, args.saida, padrao=args.padrao, processos=args.processos,
+        tamanho=args.lote, aba=args.aba, coluna_origem=args.coluna_origem,
+    )
+    print(
+        f"✅ {resumo['linhas']:,} linhas de {resumo['arquivos']} arquivos "
+        f"em {resumo['segundos']:.1f}s → {args.saida}"
+    )
+
+
+if __name__ == "__main__":
+    main()
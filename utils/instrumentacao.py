@@ -0,0 +1,280 @@
+# ============================================
+# utils/instrumentacao.py
+# ============================================
+# Medição de tempo por etapa do SIGMA-Q.
+# Um gerenciador de contexto (etapa) e um decorador
+# (instrumentado) registram duração, linhas e variação
+# de memória de cada etapa da carga do dashboard.
+# Ao fim de cada execução as medições vão para um log
+# JSON rotativo e para um arquivo de métricas no formato
+# texto do Prometheus, ambos em data/logs.
+# ============================================
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from datetime import datetime
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOGS_DIR = os.path.join(BASE_DIR, "data", "logs")
+DESEMPENHO_PATH = os.path.join(LOGS_DIR, "desempenho.jsonl")
+METRICAS_PATH = os.path.join(LOGS_DIR, "metricas_sigmaq.prom")
+
+# Rotação do log JSON (tamanho máximo por arquivo e cópias mantidas)
+TAMANHO_MAX_LOG = 5 * 1024 * 1024
+BACKUPS_LOG = 5
+
+# Página de memória (para ler o RSS em /proc/self/statm)
+try:
+    _TAMANHO_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _TAMANHO_PAGINA = None
+
+
+def _memoria_bytes() -> int | None:
+    # RSS atual do processo (Linux); None quando indisponível
+    if _TAMANHO_PAGINA is None:
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _TAMANHO_PAGINA
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _contar_linhas(args: tuple, resultado) -> int | None:
+    # Linhas do primeiro objeto tabular encontrado: resultado, 1º item do
+    # resultado (funções que retornam tuplas) ou 1º argumento
+    candidatos = [resultado]
+    if isinstance(resultado, tuple) and resultado:
+        candidatos.append(resultado[0])
+    if args:
+        candidatos.append(args[0])
+    for obj in candidatos:
+        forma = getattr(obj, "shape", None)
+        if forma:
+            return int(forma[0])
+        if isinstance(obj, list):
+            return len(obj)
+    return None
+
+
+# =========================
+# Estado: execução atual (por thread) e totais (por processo)
+# =========================
+# Cada sessão do Streamlit roda o script em sua própria thread
+_local = threading.local()
+
+
+class _Totais:
+    """
+    Acumula as medições de todas as execuções do processo
+    (base do arquivo de métricas do Prometheus).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_etapa = {}
+
+    def acumular(self, medicao: dict):
+        with self.lock:
+            total = self.por_etapa.setdefault(medicao["etapa"], {
+                "execucoes": 0, "segundos": 0.0, "linhas": 0, "erros": 0,
+                "ultima_duracao": 0.0, "ultima_memoria_delta": 0,
+            })
+            total["execucoes"] += 1
+            total["segundos"] += medicao["segundos"]
+            total["linhas"] += medicao["linhas"] or 0
+            total["erros"] += 1 if medicao.get("erro") else 0
+            total["ultima_duracao"] = medicao["segundos"]
+            total["ultima_memoria_delta"] = int((medicao["memoria_delta_mb"] or 0) * 1e6)
+
+    def copia(self) -> dict:
+        with self.lock:
+            return {nome: dict(valores) for nome, valores in self.por_etapa.items()}
+
+
+_totais = _Totais()
+
+
+# =========================
+# API de medição
+# =========================
+@contextmanager
+def etapa(nome: str, linhas: int | None = None):
+    """
+    Mede o bloco como uma etapa. O dicionário entregue pode ser atualizado
+    dentro do bloco (ex: medicao["linhas"] = len(df)).
+    Etapas aninhadas ficam registradas com o nível correspondente.
+    """
+    nivel = getattr(_local, "nivel", 0)
+    medicao = {"etapa": nome, "nivel": nivel, "linhas": linhas}
+    memoria_inicio = _memoria_bytes()
+    _local.nivel = nivel + 1
+    inicio = time.perf_counter()
+    inicio_execucao = getattr(_local, "inicio", None)
+    if inicio_execucao is not None:
+        medicao["inicio_s"] = round(inicio - inicio_execucao, 6)
+    try:
+        yield medicao
+    finally:
+        medicao["segundos"] = round(time.perf_counter() - inicio, 6)
+        _local.nivel = nivel
+        memoria_fim = _memoria_bytes()
+        medicao["memoria_delta_mb"] = (
+            round((memoria_fim - memoria_inicio) / 1e6, 3) if None not in (memoria_inicio, memoria_fim) else None
+        )
+        erro = sys.exc_info()[0]
+        if erro is not None:
+            medicao["erro"] = erro.__name__
+
+        medicoes = getattr(_local, "medicoes", None)
+        if medicoes is not None:
+            medicoes.append(medicao)
+        _totais.acumular(medicao)
+
+
+def instrumentado(nome: str | None = None, linhas=_contar_linhas):
+    """
+    Decorador: mede cada chamada da função como uma etapa.
+    `linhas(args, resultado)` calcula as linhas processadas (None desativa).
+    """
+    def decorador(funcao):
+        nome_etapa = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with etapa(nome_etapa) as medicao:
+                resultado = funcao(*args, **kwargs)
+                if linhas is not None:
+                    medicao["linhas"] = linhas(args, resultado)
+                return resultado
+
+        return envolvida
+
+    return decorador
+
+
+# =========================
+# Execuções (uma carga do dashboard)
+# =========================
+def iniciar_execucao():
+    """
+    Começa a coletar as medições desta thread (uma execução do script).
+    """
+    _local.medicoes = []
+    _local.nivel = 0
+    _local.inicio = time.perf_counter()
+
+
+def medicoes_execucao() -> list[dict]:
+    """
+    Medições da execução atual, na ordem em que as etapas terminaram.
+    """
+    return list(getattr(_local, "medicoes", None) or [])
+
+
+def finalizar_execucao(contexto: dict | None = None) -> list[dict]:
+    """
+    Encerra a execução atual: grava as medições no log JSON rotativo e
+    atualiza o arquivo de métricas. Retorna as medições em ordem de início
+    (etapas externas antes das internas), prontas para exibição.
+    """
+    medicoes = _ordem_de_inicio(medicoes_execucao())
+    inicio = getattr(_local, "inicio", None)
+    _local.medicoes, _local.inicio = None, None
+
+    total = round(time.perf_counter() - inicio, 6) if inicio is not None else None
+    registro = {
+        "momento": datetime.now().isoformat(timespec="seconds"),
+        "pid": os.getpid(),
+        "total_segundos": total,
+        **(contexto or {}),
+        "etapas": medicoes,
+    }
+    try:
+        _log_desempenho().info(json.dumps(registro, ensure_ascii=False, default=str))
+        exportar_metricas()
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar as métricas de desempenho: {e}")
+
+    return medicoes
+
+
+def _ordem_de_inicio(medicoes: list[dict]) -> list[dict]:
+    # As etapas terminam de dentro para fora; para exibir, as externas vêm
+    # antes das internas
+    return sorted(medicoes, key=lambda m: (m.get("inicio_s", 0.0), m["nivel"]))
+
+
+# =========================
+# Saídas: log JSON e Prometheus
+# =========================
+_lock_log = threading.Lock()
+
+
+def _log_desempenho() -> logging.Logger:
+    logger = logging.getLogger("sigmaq.desempenho")
+    with _lock_log:
+        if not logger.handlers:
+            os.makedirs(LOGS_DIR, exist_ok=True)
+            handler = RotatingFileHandler(
+                DESEMPENHO_PATH, maxBytes=TAMANHO_MAX_LOG, backupCount=BACKUPS_LOG, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _rotulo(nome: str) -> str:
+    return nome.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def metricas_prometheus() -> str:
+    """
+    Totais do processo no formato texto do Prometheus.
+    """
+    totais = _totais.copia()
+    series = [
+        ("sigmaq_etapa_duracao_segundos", "summary", "Tempo gasto por etapa do SIGMA-Q.", None),
+        ("sigmaq_etapa_linhas_total", "counter", "Linhas processadas por etapa.", "linhas"),
+        ("sigmaq_etapa_erros_total", "counter", "Execuções da etapa que terminaram com erro.", "erros"),
+        ("sigmaq_etapa_ultima_duracao_segundos", "gauge", "Duração da última execução da etapa.", "ultima_duracao"),
+        ("sigmaq_etapa_ultima_memoria_delta_bytes", "gauge", "Variação de memória (RSS) na última execução.", "ultima_memoria_delta"),
+    ]
+
+    linhas = []
+    for metrica, tipo, ajuda, campo in series:
+        linhas.append(f"# HELP {metrica} {ajuda}")
+        linhas.append(f"# TYPE {metrica} {tipo}")
+        for nome, valores in sorted(totais.items()):
+            rotulo = f'{{etapa="{_rotulo(nome)}"}}'
+            if campo is None:
+                linhas.append(f"{metrica}_sum{rotulo} {valores['segundos']:.6f}")
+                linhas.append(f"{metrica}_count{rotulo} {valores['execucoes']}")
+            else:
+                linhas.append(f"{metrica}{rotulo} {valores[campo]}")
+    return "\n".join(linhas) + "\n"
+
+
+def exportar_metricas(caminho: str | None = None):
+    """
+    Grava as métricas de forma atômica (o coletor nunca lê um arquivo pela metade).
+    """
+    caminho = caminho or METRICAS_PATH
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(metricas_prometheus())
+    os.replace(temporario, caminho)
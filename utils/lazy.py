@@ -0,0 +1,64 @@
+# ============================================
+# utils/lazy.py
+# ============================================
+# Importação tardia de bibliotecas pesadas (spaCy,
+# matplotlib, altair, sklearn...). O módulo só é
+# importado no primeiro acesso a um atributo, então o
+# app/main.py pinta a primeira tela sem pagar por
+# bibliotecas que aquela execução não usa.
+# ============================================
+
+import sys
+import importlib
+import importlib.util
+import threading
+
+
+class ModuloTardio:
+    """
+    Representa um módulo ainda não importado.
+    O primeiro acesso a um atributo importa o módulo de verdade
+    (uma única vez por processo) e repassa o atributo.
+    """
+
+    def __init__(self, nome: str):
+        self._nome = nome
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __dir__(self):
+        return dir(self._carregar())
+
+    def __repr__(self):
+        estado = "carregado" if self._modulo is not None else "não carregado"
+        return f"<módulo tardio {self._nome!r} ({estado})>"
+
+
+def importar_tardio(nome: str) -> ModuloTardio:
+    """
+    Retorna o módulo se ele já estiver importado; caso contrário, um
+    ModuloTardio que importa `nome` no primeiro uso.
+    """
+    if nome in sys.modules:
+        return sys.modules[nome]
+    return ModuloTardio(nome)
+
+
+def disponivel(nome: str) -> bool:
+    """
+    Verifica se um pacote opcional está instalado sem importá-lo.
+    """
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
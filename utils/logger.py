@@ -1,22 +1,131 @@
 # utils/logger.py
 import os
+import glob
+import shutil
 import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
+import pyarrow.parquet as pq
 
-# Caminho padrão do log
+from utils.instrumentacao import instrumentado
+
+# Caminho do log antigo (planilha única) — mantido para migração e exportação
 LOG_PATH = os.path.join("data", "logs", "log_classificacoes.xlsx")
 
+# Diretório do log particionado por dia (um arquivo Parquet por lote)
+LOG_DIR = os.path.join("data", "logs", "classificacoes")
+
 # Tempo máximo de retenção (em dias)
 RETENCAO_DIAS = 30
 
+# Coluna com o hash de cada linha registrada (deduplicação)
+COL_HASH = "HASH_LINHA"
+
+
+# =========================
+# Partições
+# =========================
+def _dir_particao(dia) -> str:
+    return os.path.join(LOG_DIR, f"dia={dia:%Y-%m-%d}")
+
+
+def _listar_particoes() -> list[tuple[datetime, str]]:
+    """
+    Retorna [(dia, diretório)] das partições existentes, em ordem cronológica.
+    """
+    particoes = []
+    for caminho in glob.glob(os.path.join(LOG_DIR, "dia=*")):
+        try:
+            dia = datetime.strptime(os.path.basename(caminho)[4:], "%Y-%m-%d")
+        except ValueError:
+            continue
+        particoes.append((dia, caminho))
+    return sorted(particoes)
+
+
+def _arquivos_log() -> list[str]:
+    arquivos = []
+    for _, caminho in _listar_particoes():
+        arquivos.extend(sorted(glob.glob(os.path.join(caminho, "*.parquet"))))
+    return arquivos
+
+
+def _hashes_existentes(dir_particao: str) -> set:
+    hashes = set()
+    for arquivo in glob.glob(os.path.join(dir_particao, "*.parquet")):
+        try:
+            hashes.update(pq.read_table(arquivo, columns=[COL_HASH]).column(0).to_pylist())
+        except Exception:
+            continue
+    return hashes
+
+
+def _gravar_lote(df: pd.DataFrame, dia):
+    """
+    Grava o lote como um novo arquivo da partição do dia (append-only).
+    """
+    destino_dir = _dir_particao(dia)
+    os.makedirs(destino_dir, exist_ok=True)
+    nome = f"lote_{datetime.now():%H%M%S%f}_{os.getpid()}.parquet"
+    destino = os.path.join(destino_dir, nome)
+    df.to_parquet(destino + ".tmp", index=False)
+    os.replace(destino + ".tmp", destino)
+
+
+def _hash_linhas(df: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(df.astype(str), index=False)
+
+
+def _migrar_log_legado():
+    """
+    Converte o log antigo em xlsx para partições diárias (uma única vez).
+    """
+    if not os.path.exists(LOG_PATH) or _listar_particoes():
+        return
+
+    try:
+        df_antigo = pd.read_excel(LOG_PATH)
+        df_antigo["DATA_LOG"] = pd.to_datetime(df_antigo["DATA_LOG"], errors="coerce")
+        df_antigo = df_antigo.dropna(subset=["DATA_LOG"])
+        df_antigo[COL_HASH] = _hash_linhas(df_antigo.drop(columns=[COL_HASH], errors="ignore"))
+        for dia, grupo in df_antigo.groupby(df_antigo["DATA_LOG"].dt.normalize()):
+            _gravar_lote(grupo, dia)
+        os.replace(LOG_PATH, LOG_PATH.replace(".xlsx", "_migrado.xlsx"))
+        print(f"📦 Log antigo migrado para {LOG_DIR} ({len(df_antigo)} registros).")
+    except Exception as e:
+        print(f"⚠️ Falha ao migrar log antigo: {e}")
+
 
+# =========================
+# Retenção
+# =========================
+def aplicar_retencao() -> int:
+    """
+    Remove as partições inteiras mais antigas que RETENCAO_DIAS.
+    Retorna a quantidade de registros removidos.
+    """
+    limite = (datetime.now() - timedelta(days=RETENCAO_DIAS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    removidos = 0
+    for dia, caminho in _listar_particoes():
+        if dia >= limite:
+            break
+        for arquivo in glob.glob(os.path.join(caminho, "*.parquet")):
+            try:
+                removidos += pq.ParquetFile(arquivo).metadata.num_rows
+            except Exception:
+                pass
+        shutil.rmtree(caminho, ignore_errors=True)
+    return removidos
+
+
+@instrumentado()
 def registrar_classificacoes(df: pd.DataFrame):
     """
     Registra automaticamente as classificações realizadas pela IA SIGMA-Q.
-    - Cria o log se não existir
+    - Grava cada lote como um novo arquivo na partição do dia
     - Adiciona data/hora de cada classificação
-    - Remove registros antigos automaticamente (> RETENCAO_DIAS)
+    - Ignora linhas já registradas (hash da linha)
+    - Remove partições antigas automaticamente (> RETENCAO_DIAS)
     """
 
     # Verificação básica
@@ -43,49 +152,109 @@ def registrar_classificacoes(df: pd.DataFrame):
         st.warning("⚠️ Nenhuma coluna de descrição de falha encontrada para registrar log.")
         return
 
-    # Garante que o diretório exista
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+    _migrar_log_legado()
 
     # Prepara DataFrame de log com timestamp
+    agora = datetime.now()
     df_log = df.copy()
-    df_log["DATA_LOG"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    df_log["DATA_LOG"] = agora.strftime("%Y-%m-%d %H:%M:%S")
 
-    # Carrega log existente, se houver
-    if os.path.exists(LOG_PATH):
-        try:
-            df_existente = pd.read_excel(LOG_PATH)
-            df_concat = pd.concat([df_existente, df_log], ignore_index=True)
-        except Exception:
-            df_concat = df_log
-    else:
-        df_concat = df_log
+    # Remove duplicados (descrição + categoria + data) via hash da linha
+    df_log[COL_HASH] = _hash_linhas(df_log[[col_falha, "CATEGORIA_PREDITA", "DATA_LOG"]])
+    df_log = df_log.drop_duplicates(subset=[COL_HASH], keep="last")
+    df_log = df_log[~df_log[COL_HASH].isin(_hashes_existentes(_dir_particao(agora)))]
+    df_log["DATA_LOG"] = pd.to_datetime(df_log["DATA_LOG"])
 
-    # Remove duplicados (descrição + categoria + data)
-    df_concat.drop_duplicates(
-        subset=[col_falha, "CATEGORIA_PREDITA", "DATA_LOG"],
-        keep="last",
-        inplace=True,
-    )
+    if not df_log.empty:
+        _gravar_lote(df_log, agora)
 
     # --------------------------
     # 🧹 AUTO-LIMPEZA DO HISTÓRICO
     # --------------------------
     try:
-        df_concat["DATA_LOG"] = pd.to_datetime(df_concat["DATA_LOG"], errors="coerce")
-        limite = datetime.now() - timedelta(days=RETENCAO_DIAS)
-        antes = len(df_concat)
-        df_concat = df_concat[df_concat["DATA_LOG"] >= limite]
-        removidos = antes - len(df_concat)
-
+        removidos = aplicar_retencao()
         if removidos > 0:
             st.info(f"🧹 {removidos} registros antigos removidos (>{RETENCAO_DIAS} dias).")
 
     except Exception as e:
         st.warning(f"⚠️ Falha ao limpar registros antigos: {e}")
 
-    # Salva o log atualizado
-    df_concat.to_excel(LOG_PATH, index=False)
-
     # Feedback visual
     st.toast("📘 Log de classificações atualizado com sucesso.")
-    st.info(f"💾 {len(df_concat)} registros mantidos após limpeza automática.")
+    st.info(f"💾 {contar_registros()} registros mantidos após limpeza automática.")
+
+
+# =========================
+# Consulta e exportação
+# =========================
+def log_disponivel() -> bool:
+    """
+    Indica se existe algum registro de log (particionado ou legado).
+    """
+    return bool(_arquivos_log()) or os.path.exists(LOG_PATH)
+
+
+def contar_registros() -> int:
+    """
+    Conta os registros do log lendo apenas os metadados dos arquivos.
+    """
+    _migrar_log_legado()
+    total = 0
+    for arquivo in _arquivos_log():
+        try:
+            total += pq.ParquetFile(arquivo).metadata.num_rows
+        except Exception:
+            continue
+    return total
+
+
+def carregar_log(colunas: list | None = None) -> pd.DataFrame:
+    """
+    Lê todas as partições do log em um único DataFrame.
+    """
+    _migrar_log_legado()
+    partes = []
+    for arquivo in _arquivos_log():
+        try:
+            partes.append(pd.read_parquet(arquivo, columns=colunas))
+        except Exception as e:
+            print(f"⚠️ Arquivo de log ignorado ({arquivo}): {e}")
+
+    if not partes:
+        return pd.DataFrame(columns=colunas or ["DATA_LOG", "CATEGORIA_PREDITA"])
+
+    return pd.concat(partes, ignore_index=True)
+
+
+def lotes_log(tamanho: int = 50_000):
+    """
+    Lê o log partição a partição em lotes Arrow (sem a coluna de hash),
+    sem carregar o histórico inteiro na memória.
+    """
+    _migrar_log_legado()
+    for arquivo in _arquivos_log():
+        try:
+            arquivo_pq = pq.ParquetFile(arquivo)
+            colunas = [c for c in arquivo_pq.schema_arrow.names if c != COL_HASH]
+            yield from arquivo_pq.iter_batches(batch_size=tamanho, columns=colunas)
+        except Exception as e:
+            print(f"⚠️ Arquivo de log ignorado ({arquivo}): {e}")
+
+
+def exportar_log_xlsx(destino: str) -> int:
+    """
+    Exporta o log completo para uma planilha xlsx (sob demanda), lote a
+    lote (ver utils.exportacao). Retorna a quantidade de registros exportados;
+    lança ValueError se o log estiver vazio.
+    """
+    from utils.exportacao import exportar
+    return exportar(lotes_log(), destino)
+
+
+def limpar_log():
+    """
+    Remove todo o histórico de classificações.
+    """
+    shutil.rmtree(LOG_DIR, ignore_errors=True)
+    if os.path.exists(LOG_PATH):
+        os.remove(LOG_PATH)
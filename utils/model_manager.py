@@ -3,33 +3,154 @@
 # ============================================
 # Gerencia o carregamento e salvamento do modelo
 # e do vetorizador TF-IDF para o SIGMA-Q.
+# Os artefatos são carregados uma única vez por
+# processo e recarregados apenas quando os arquivos
+# em disco mudam (nova impressão digital).
+# O pacote único (utils.pacote_modelo) tem prioridade;
+# os .pkl de versões antigas continuam sendo lidos.
 # ============================================
 
 import os
-import joblib
+import hashlib
+import threading
 import streamlit as st
 
+from utils.lazy import importar_tardio
+from utils.instrumentacao import instrumentado
+from utils.pacote_modelo import ler_cabecalho
+from utils.registro_modelos import carregar_registrado
+
+# joblib só é importado ao carregar/salvar artefatos
+joblib = importar_tardio("joblib")
+
 # Caminhos padrão
+PACOTE_PATH = "model/modelo_classificacao.sigmaq"
 MODELO_PATH = "model/modelo_classificacao.pkl"
 VETORIZADOR_PATH = "model/vectorizer.pkl"
 
+# Arrays numpy grandes são mapeados em memória (páginas compartilhadas
+# entre processos que abrem o mesmo arquivo)
+MMAP_MODE = "r"
+
+
+# =========================
+# Cache de modelos por processo
+# =========================
+class _ModelosCarregados:
+    """
+    Guarda (modelo, vetorizador) carregados, a versão deles e a impressão
+    digital dos arquivos de origem. Compartilhado por todas as sessões do
+    Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.impressao = None
+        self.modelo = None
+        self.vetorizador = None
+        self.versao = None
+
+
+_modelos = _ModelosCarregados()
+
+
+def _impressao_arquivos() -> tuple | None:
+    """
+    Impressão digital (caminho, mtime, tamanho) dos artefatos em disco:
+    o pacote, se existir; senão o .pkl e o vetorizador avulso (modelos
+    antigos).
+    """
+    if os.path.exists(PACOTE_PATH):
+        caminhos = (PACOTE_PATH,)
+    elif os.path.exists(MODELO_PATH):
+        caminhos = (MODELO_PATH, VETORIZADOR_PATH)
+    else:
+        return None
+
+    partes = []
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            info = os.stat(caminho)
+            partes.append((os.path.abspath(caminho), info.st_mtime_ns, info.st_size))
+    return tuple(partes)
+
+
+def modelo_disponivel() -> bool:
+    """
+    True se houver modelo em disco (pacote ou .pkl), sem usar Streamlit.
+    """
+    return _impressao_arquivos() is not None
+
+
+def obter_modelos() -> tuple:
+    """
+    Retorna (modelo, vetorizador) do cache do processo, recarregando do
+    disco apenas se a impressão digital dos arquivos mudou.
+    Não usa Streamlit; lança FileNotFoundError se não houver modelo.
+    """
+    modelo, vetorizador, _ = obter_modelos_versionados()
+    return modelo, vetorizador
+
+
+def obter_modelos_versionados() -> tuple:
+    """
+    Como obter_modelos, mas retorna (modelo, vetorizador, versão) lidos
+    juntos: uma troca de modelo entre as chamadas não associa previsões
+    de um modelo à versão de outro (ex: no cache de previsões).
+    """
+    impressao = _impressao_arquivos()
+    if impressao is None:
+        raise FileNotFoundError(f"Modelo não encontrado em {PACOTE_PATH} nem em {MODELO_PATH}")
+
+    with _modelos.lock:
+        if _modelos.impressao == impressao:
+            return _modelos.modelo, _modelos.vetorizador, _modelos.versao
+
+        if impressao[0][0] == os.path.abspath(PACOTE_PATH):
+            # Pacote: recebe texto bruto, vetorizador embutido. Se a versão
+            # já estiver pré-carregada pelo registro, só o ponteiro muda
+            modelo, vetorizador = carregar_registrado(PACOTE_PATH), None
+            versao = modelo.versao
+        else:
+            modelo, vetorizador = _carregar_pkl()
+            versao = _versao_impressao(impressao)
+
+        _modelos.impressao = impressao
+        _modelos.modelo, _modelos.vetorizador, _modelos.versao = modelo, vetorizador, versao
+        print(f"🧠 Modelos (re)carregados do disco — versão {versao}")
+        return modelo, vetorizador, versao
+
+
+def _carregar_pkl() -> tuple:
+    # Formato antigo. O modelo devolvido sempre recebe texto bruto: um
+    # classificador avulso é combinado com o vetorizador em um Pipeline
+    modelo = joblib.load(MODELO_PATH, mmap_mode=MMAP_MODE)
+    if hasattr(modelo, "named_steps") and "tfidf" in modelo.named_steps:
+        return modelo, modelo.named_steps["tfidf"]
+    if not os.path.exists(VETORIZADOR_PATH):
+        raise FileNotFoundError(f"Vetorizador não encontrado em {VETORIZADOR_PATH}")
+
+    from sklearn.pipeline import Pipeline
+    vetorizador = joblib.load(VETORIZADOR_PATH, mmap_mode=MMAP_MODE)
+    return Pipeline([("tfidf", vetorizador), ("clf", modelo)]), vetorizador
+
+
+@instrumentado(linhas=None)
 def carregar_modelos():
     """
-    Carrega o modelo de classificação e o vetorizador TF-IDF do disco.
+    Carrega o modelo de classificação e o vetorizador TF-IDF.
     Retorna (modelo, vetorizador).
     """
     try:
-        if not os.path.exists(MODELO_PATH):
-            st.sidebar.error(f"❌ Modelo não encontrado em {MODELO_PATH}")
-            return None, None
-
-        if not os.path.exists(VETORIZADOR_PATH):
-            st.sidebar.error(f"❌ Vetorizador não encontrado em {VETORIZADOR_PATH}")
+        if _impressao_arquivos() is None:
+            st.sidebar.error(f"❌ Modelo não encontrado em {PACOTE_PATH}")
             return None, None
 
-        modelo = joblib.load(MODELO_PATH)
-        vetorizador = joblib.load(VETORIZADOR_PATH)
-        st.sidebar.success("✅ Modelo e vetorizador carregados com sucesso!")
+        modelo, vetorizador = obter_modelos()
+        if hasattr(modelo, "cabecalho"):
+            st.sidebar.success(f"✅ Modelo carregado (pacote {modelo.versao}, criado em {modelo.cabecalho['criado_em']})")
+        else:
+            st.sidebar.success("✅ Modelo e vetorizador carregados com sucesso!")
         return modelo, vetorizador
 
     except Exception as e:
@@ -39,12 +160,16 @@ def carregar_modelos():
 
 def salvar_modelos(modelo, vetorizador):
     """
-    Salva o modelo e o vetorizador atualizados no disco.
+    Salva o modelo e o vetorizador atualizados no disco (um único
+    artefato, ver model_trainer.salvar_artefatos).
     """
     try:
-        os.makedirs("model", exist_ok=True)
-        joblib.dump(modelo, MODELO_PATH)
-        joblib.dump(vetorizador, VETORIZADOR_PATH)
+        from sklearn.pipeline import Pipeline
+        from utils.model_trainer import salvar_artefatos
+
+        if not hasattr(modelo, "steps"):
+            modelo = Pipeline([("tfidf", vetorizador), ("clf", modelo)])
+        salvar_artefatos(modelo)
         st.success("💾 Modelos salvos com sucesso!")
     except Exception as e:
         st.error(f"❌ Erro ao salvar modelos: {e}")
@@ -52,15 +177,44 @@ def salvar_modelos(modelo, vetorizador):
 
 def verificar_modelos():
     """
-    Verifica se os arquivos de modelo e vetorizador estão disponíveis.
-    Retorna True se ambos existirem.
+    Verifica se o modelo está disponível. O vetorizador avulso não é
+    obrigatório quando o modelo é um Pipeline com TF-IDF embutido.
+    Retorna True se o modelo existir.
     """
-    modelo_existe = os.path.exists(MODELO_PATH)
-    vetor_existe = os.path.exists(VETORIZADOR_PATH)
-
-    if modelo_existe and vetor_existe:
+    if _impressao_arquivos() is not None:
         st.sidebar.info("🧠 Modelos prontos para uso.")
         return True
     else:
         st.sidebar.warning("⚠️ Modelos ausentes ou incompletos.")
         return False
+
+
+def versao_modelos() -> str | None:
+    """
+    Retorna um identificador curto da versão dos modelos em disco: a
+    versão gravada no pacote (hash do conteúdo) ou, no formato antigo,
+    um hash de mtime e tamanho dos arquivos. Muda a cada novo treinamento.
+    """
+    impressao = _impressao_arquivos()
+    if impressao is None:
+        return None
+    if impressao[0][0] == os.path.abspath(PACOTE_PATH):
+        return _versao_pacote(impressao)
+    return _versao_impressao(impressao)
+
+
+def _versao_impressao(impressao: tuple) -> str:
+    # Formato antigo: hash de caminho, mtime e tamanho dos arquivos
+    partes = [f"{caminho}:{mtime}:{tamanho}" for caminho, mtime, tamanho in impressao]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+_versoes_pacote: dict = {}
+
+
+def _versao_pacote(impressao: tuple) -> str:
+    # Só relê o cabeçalho quando o arquivo muda
+    versao = _versoes_pacote.get(impressao)
+    if versao is None:
+        versao = _versoes_pacote[impressao] = ler_cabecalho(PACOTE_PATH)["versao"]
+    return versao
@@ -1,22 +1,184 @@
 # utils/model_trainer.py
+import numpy as np
 import pandas as pd
 import joblib
 import os
+import tempfile
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 import streamlit as st
 
+from utils.text_normalizer import normalizar_colunas
+from utils.features import obter_armazem, ajustar_vetorizador, transformar
+from utils.ingestao_excel import ler_planilha
+from utils.cache_base import hash_conteudo
+from utils.pacote_modelo import empacotavel
+from utils import registro_modelos
+
 # Caminho oficial da base do SIGMA-Q
 BASE_PATH = os.path.join("data", "base_de_dados_unificada.xlsx")
+# Pacote único do modelo (ver utils.pacote_modelo); o .pkl só é usado
+# para modelos que não cabem no pacote (ex: treino incremental)
+PACOTE_PATH = os.path.join("model", "modelo_classificacao.sigmaq")
 MODEL_PATH = os.path.join("model", "modelo_classificacao.pkl")
+# Vetorizador avulso de versões antigas (o Pipeline já inclui o TF-IDF)
 VECTORIZER_PATH = os.path.join("model", "vectorizer.pkl")
 
 
+def _sem_progresso(fracao: float, mensagem: str):
+    pass
+
+
+# =========================
+# Núcleo do treinamento (sem Streamlit)
+# =========================
+def carregar_dados_treino(progresso=_sem_progresso) -> tuple[pd.Series, pd.Series]:
+    """
+    Lê a base oficial e retorna (textos, categorias) válidos para treino,
+    na ordem original das linhas.
+    Lança FileNotFoundError/ValueError em caso de base inválida.
+    """
+    if not os.path.exists(BASE_PATH):
+        raise FileNotFoundError(f"Arquivo não encontrado: {BASE_PATH}")
+
+    # Carregar a planilha oficial
+    progresso(0.05, "📥 Lendo base oficial...")
+    df = normalizar_colunas(ler_planilha(BASE_PATH))
+
+    # Detecta a coluna de texto
+    progresso(0.30, "🧹 Preparando dados de treino...")
+    texto_col = None
+    for c in ["DESC_FALHA", "DESC._FALHA", "DESCRICAO_DA_FALHA", "DESCRICAO"]:
+        if c in df.columns:
+            texto_col = c
+            break
+
+    if not texto_col:
+        raise ValueError("Nenhuma coluna de texto (descrição de falha) encontrada na base.")
+
+    # Detecta a coluna de rótulo
+    if "CATEGORIA" not in df.columns:
+        raise ValueError("Coluna 'CATEGORIA' não encontrada na base.")
+
+    # Remove linhas inválidas
+    df = df.dropna(subset=[texto_col, "CATEGORIA"])
+    df = df[df[texto_col].astype(str).str.strip() != ""]
+    return df[texto_col], df["CATEGORIA"]
+
+
+def novo_vetorizador() -> TfidfVectorizer:
+    """
+    Vetorizador TF-IDF padrão do SIGMA-Q (ainda não ajustado).
+    """
+    return TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
+
+
+def preparar_features(progresso=_sem_progresso) -> tuple:
+    """
+    Lê a base oficial, divide treino/teste e monta as matrizes TF-IDF a
+    partir do armazém de features (só descrições novas são tokenizadas).
+    Retorna (vetorizador ajustado no treino, X_train, X_test, y_train, y_test).
+    """
+    textos, rotulos = carregar_dados_treino(progresso)
+
+    # Divisão treino/teste (mesmas posições de train_test_split sobre os textos)
+    pos_train, pos_test = train_test_split(
+        np.arange(len(textos)), test_size=0.2, random_state=42
+    )
+
+    progresso(0.35, "🧮 Montando matriz de features...")
+    vetorizador = novo_vetorizador()
+    contagens, termos = obter_armazem(vetorizador).contagens(textos.astype(str))
+    vetorizador, X_train = ajustar_vetorizador(vetorizador, contagens[pos_train], termos)
+    X_test = transformar(vetorizador, contagens[pos_test], termos)
+    return vetorizador, X_train, X_test, rotulos.iloc[pos_train], rotulos.iloc[pos_test]
+
+
+def treinar_pipeline(progresso=_sem_progresso, classificador=None) -> tuple[Pipeline, float]:
+    """
+    Lê a base oficial, treina o pipeline TF-IDF + classificador
+    (LogisticRegression por padrão) e retorna (pipeline, acurácia no
+    conjunto de teste).
+    `progresso(fracao, mensagem)` é chamado a cada etapa.
+    Lança FileNotFoundError/ValueError em caso de base inválida.
+    """
+    vetorizador, X_train, X_test, y_train, y_test = preparar_features(progresso)
+    if classificador is None:
+        classificador = LogisticRegression(max_iter=1000, solver="lbfgs", multi_class="auto")
+
+    # Treinamento (sobre a matriz pronta; o texto não é re-vetorizado)
+    progresso(0.40, f"🧠 Treinando modelo ({X_train.shape[0]} exemplos)...")
+    classificador.fit(X_train, y_train)
+
+    # Avaliação rápida
+    progresso(0.85, "📏 Avaliando modelo...")
+    score = classificador.score(X_test, y_test)
+
+    # Pipeline de vetor + modelo (classifica texto bruto na inferência)
+    pipeline = Pipeline([("tfidf", vetorizador), ("clf", classificador)])
+    return pipeline, score
+
+
+def impressao_dados_treino() -> dict:
+    """
+    Impressão digital da base oficial usada no treinamento.
+    """
+    if not os.path.exists(BASE_PATH):
+        return {}
+    return {"base": os.path.basename(BASE_PATH), "sha256": hash_conteudo(BASE_PATH)}
+
+
+def _remover(*caminhos):
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def salvar_artefatos(pipeline: Pipeline, metricas: dict | None = None, ativar: bool = True, origem: str = "treino"):
+    """
+    Grava o modelo em model/ com troca atômica (os.replace): quem estiver
+    usando o arquivo antigo continua com a versão anterior.
+    Pipelines TF-IDF + classificador linear viram um pacote do registro
+    de modelos (com `metricas` e a impressão digital da base no
+    cabeçalho); com `ativar` ele passa a ser o ativo (PACOTE_PATH), senão
+    fica como candidato. Os demais são gravados com joblib em MODEL_PATH
+    (sempre ativos). O artefato do outro formato e o vetorizador avulso de
+    versões antigas são removidos, então só existe um modelo ativo em disco.
+    """
+    os.makedirs("model", exist_ok=True)
+    motivo = empacotavel(pipeline)
+    if motivo is None:
+        versao = registro_modelos.registrar(
+            pipeline, metricas=metricas, dados=impressao_dados_treino(), ativar=ativar, origem=origem,
+        )
+        print(f"📦 Modelo registrado como pacote (versão {versao}{', ativo' if ativar else ', candidato'}).")
+        return
+    if not ativar:
+        print(f"⚠️ Modelo não registrado como candidato ({motivo}).")
+        return
+
+    print(f"💾 Modelo salvo com joblib ({motivo}).")
+    fd, temporario = tempfile.mkstemp(dir="model", suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(pipeline, temporario)
+        os.replace(temporario, MODEL_PATH)
+    finally:
+        _remover(temporario)
+    _remover(PACOTE_PATH, VECTORIZER_PATH)
+    registro_modelos.desativar()
+
+
+# =========================
+# Treinamento interativo (Streamlit)
+# =========================
 def treinar_modelo():
     """
     Treina o modelo de IA SIGMA-Q com base na planilha Quality Control.
+    Executa no próprio script do Streamlit; para treinar sem bloquear o
+    dashboard use utils.retrain.iniciar_treinamento.
     """
     if not os.path.exists(BASE_PATH):
         st.error(f"❌ Arquivo não encontrado: {BASE_PATH}")
@@ -25,63 +187,19 @@ def treinar_modelo():
     st.info("🚀 Iniciando treinamento do modelo SIGMA-Q...")
 
     try:
-        # Carregar a planilha oficial
-        df = pd.read_excel(BASE_PATH)
-        df.columns = (
-            df.columns.str.strip()
-            .str.upper()
-            .str.normalize("NFKD")
-            .str.encode("ascii", errors="ignore")
-            .str.decode("ascii")
-            .str.replace(" ", "_")
-        )
-
-        # Detecta a coluna de texto
-        texto_col = None
-        for c in ["DESC_FALHA", "DESC._FALHA", "DESCRICAO_DA_FALHA", "DESCRICAO"]:
-            if c in df.columns:
-                texto_col = c
-                break
-
-        if not texto_col:
-            st.error("⚠️ Nenhuma coluna de texto (descrição de falha) encontrada na base.")
-            return None, None
-
-        # Detecta a coluna de rótulo
-        if "CATEGORIA" not in df.columns:
-            st.error("⚠️ Coluna 'CATEGORIA' não encontrada na base.")
-            return None, None
-
-        # Remove linhas inválidas
-        df = df.dropna(subset=[texto_col, "CATEGORIA"])
-        df = df[df[texto_col].astype(str).str.strip() != ""]
-
-        # Divisão treino/teste
-        X_train, X_test, y_train, y_test = train_test_split(
-            df[texto_col], df["CATEGORIA"], test_size=0.2, random_state=42
-        )
-
-        # Cria pipeline de vetor + modelo
-        pipeline = Pipeline([
-            ("tfidf", TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
-            ("clf", LogisticRegression(max_iter=1000, solver="lbfgs", multi_class="auto")),
-        ])
-
-        # Treinamento
-        pipeline.fit(X_train, y_train)
-
-        # Avaliação rápida
-        score = pipeline.score(X_test, y_test)
+        pipeline, score = treinar_pipeline()
         st.success(f"✅ Treinamento concluído — acurácia: {score*100:.2f}%")
 
-        # Salvar modelo e vetor
-        os.makedirs("model", exist_ok=True)
-        joblib.dump(pipeline, MODEL_PATH)
-        joblib.dump(pipeline.named_steps["tfidf"], VECTORIZER_PATH)
+        # Salvar modelo (Pipeline com o vetorizador embutido)
+        salvar_artefatos(pipeline, metricas={"acuracia": round(score, 4)})
 
-        st.toast("💾 Modelo e vetorizador salvos com sucesso!")
+        st.toast("💾 Modelo salvo com sucesso!")
         return pipeline.named_steps["clf"], pipeline.named_steps["tfidf"]
 
+    except ValueError as e:
+        st.error(f"⚠️ {e}")
+        return None, None
+
     except Exception as e:
         st.error(f"❌ Erro durante o treinamento: {e}")
         return None, None
@@ -0,0 +1,214 @@
+# ============================================
+# utils/observador_base.py
+# ============================================
+# Observador da base oficial do SIGMA-Q.
+# Uma thread em segundo plano recebe os eventos do sistema
+# de arquivos (inotify via watchdog; polling de mtime como
+# fallback), espera a rajada de gravações do Excel terminar
+# (debounce) e só então publica uma nova versão dos dados —
+# uma única vez por alteração real de conteúdo.
+# ============================================
+
+import os
+import time
+import threading
+
+from utils.cache_base import hash_conteudo
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Silêncio exigido (s) depois do último evento antes de ler o arquivo
+DEBOUNCE_SEGUNDOS = 2.0
+
+# Intervalo do fallback por polling (s)
+INTERVALO_POLLING = 2.0
+
+
+class _Eventos(FileSystemEventHandler):
+    # Encaminha ao observador só os eventos que envolvem o arquivo da base
+    def __init__(self, observador):
+        self.observador = observador
+
+    def on_any_event(self, event):
+        caminhos = {getattr(event, "src_path", None), getattr(event, "dest_path", None)}
+        if self.observador.caminho in {os.path.abspath(c) for c in caminhos if c}:
+            self.observador.sinalizar()
+
+
+class ObservadorBase:
+    """
+    Observa um arquivo e publica versões novas do seu conteúdo.
+
+    `versao` é um contador que só aumenta quando o hash do conteúdo muda
+    (um "touch" ou um salvamento idêntico não gera versão nova).
+    Callbacks inscritos com `inscrever` recebem (versao, hash) na thread
+    do observador.
+    """
+
+    def __init__(self, caminho: str, debounce: float = DEBOUNCE_SEGUNDOS, intervalo: float = INTERVALO_POLLING):
+        self.caminho = os.path.abspath(caminho)
+        self.debounce = debounce
+        self.intervalo = intervalo
+        self.versao = 0
+        self.hash = None
+        self.modo = None
+        self._callbacks = []
+        self._ultimo_evento = None
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._observer = None
+        self._threads = []
+
+    # -------------------------
+    # Ciclo de vida
+    # -------------------------
+    def iniciar(self) -> "ObservadorBase":
+        if self._threads:
+            return self
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.schedule(_Eventos(self), os.path.dirname(self.caminho), recursive=False)
+                self._observer.start()
+                self.modo = "eventos"
+            except Exception as e:
+                print(f"⚠️ Observador por eventos indisponível ({e}); usando polling.")
+                self._observer = None
+
+        if self._observer is None:
+            self.modo = "polling"
+            self._threads.append(threading.Thread(target=self._loop_polling, name="sigmaq-polling-base", daemon=True))
+
+        self._threads.append(threading.Thread(target=self._loop_debounce, name="sigmaq-observador-base", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def inscrever(self, callback):
+        """
+        Registra `callback(versao, hash)` para cada nova versão publicada.
+        """
+        self._callbacks.append(callback)
+
+    # -------------------------
+    # Eventos e debounce
+    # -------------------------
+    def sinalizar(self):
+        # Cada evento reinicia a contagem do debounce
+        with self._condicao:
+            self._ultimo_evento = time.monotonic()
+            self._condicao.notify_all()
+
+    def _assinatura(self):
+        try:
+            info = os.stat(self.caminho)
+            return info.st_mtime_ns, info.st_size
+        except OSError:
+            return None
+
+    def _loop_polling(self):
+        ultima = self._assinatura()
+        while not self._parar.wait(self.intervalo):
+            atual = self._assinatura()
+            if atual != ultima:
+                ultima = atual
+                self.sinalizar()
+
+    def _loop_debounce(self):
+        # Versão inicial (hash calculado fora da thread do Streamlit)
+        if os.path.exists(self.caminho):
+            try:
+                self.hash = hash_conteudo(self.caminho)
+            except OSError:
+                pass
+
+        while not self._parar.is_set():
+            with self._condicao:
+                while self._ultimo_evento is None and not self._parar.is_set():
+                    self._condicao.wait()
+                if self._parar.is_set():
+                    return
+                restante = self._ultimo_evento + self.debounce - time.monotonic()
+                if restante > 0:
+                    self._condicao.wait(restante)
+                    continue
+                self._ultimo_evento = None
+
+            self._publicar_se_mudou()
+
+    def _publicar_se_mudou(self):
+        # Arquivo ainda sendo gravado (ou ausente durante o rename): espera novo evento
+        antes = self._assinatura()
+        if antes is None:
+            return
+        time.sleep(min(0.5, self.debounce))
+        if self._assinatura() != antes:
+            self.sinalizar()
+            return
+
+        try:
+            novo_hash = hash_conteudo(self.caminho)
+        except OSError:
+            self.sinalizar()
+            return
+        if novo_hash == self.hash:
+            return
+
+        with self._condicao:
+            self.hash = novo_hash
+            self.versao += 1
+            versao = self.versao
+            self._condicao.notify_all()
+
+        print(f"📂 Nova versão da base detectada (v{versao}).")
+        for callback in list(self._callbacks):
+            try:
+                callback(versao, novo_hash)
+            except Exception as e:
+                print(f"⚠️ Erro ao notificar nova versão da base: {e}")
+
+    def aguardar_versao(self, versao_atual: int, timeout: float | None = None) -> int:
+        """
+        Bloqueia até existir uma versão maior que `versao_atual` (ou o timeout).
+        Retorna a versão corrente.
+        """
+        with self._condicao:
+            self._condicao.wait_for(lambda: self.versao > versao_atual or self._parar.is_set(), timeout)
+            return self.versao
+
+
+# =========================
+# Observador único por processo
+# =========================
+_observadores: dict = {}
+_lock = threading.Lock()
+
+
+def obter_observador(caminho: str) -> ObservadorBase:
+    """
+    Retorna o observador (já iniciado) do arquivo, compartilhado por todas
+    as sessões do Streamlit no processo.
+    """
+    chave = os.path.abspath(caminho)
+    with _lock:
+        observador = _observadores.get(chave)
+        if observador is None:
+            observador = _observadores[chave] = ObservadorBase(chave).iniciar()
+        return observador
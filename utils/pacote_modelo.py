@@ -0,0 +1,426 @@
+# ============================================
+# utils/pacote_modelo.py
+# ============================================
+# Pacote único e versionado do modelo do SIGMA-Q.
+# Um arquivo guarda o vocabulário, o idf e os coeficientes
+# do classificador linear como arrays numpy alinhados, mais
+# um cabeçalho JSON com classes, impressão digital dos dados
+# de treino, métricas, data de criação e sha256 do conteúdo.
+# A carga mapeia o arquivo em memória (sem cópia) e a
+# predição usa só numpy: nem joblib nem sklearn precisam ser
+# importados para classificar texto.
+#
+# Formato:
+#   MAGICO (8 bytes) | tamanho do cabeçalho (uint64 LE) |
+#   cabeçalho JSON | arrays (cada um alinhado em 64 bytes)
+#
+# Uso:
+#   python -m utils.pacote_modelo info
+#   python -m utils.pacote_modelo converter   (pkl atual -> pacote)
+# ============================================
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import unicodedata
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# =========================
+# Formato
+# =========================
+MAGICO = b"SIGMAQPK"
+FORMATO = 1
+ALINHAMENTO = 64
+
+# Textos por lote na predição (limita a matriz intermediária termos x classes)
+LOTE_PREDICAO = 10_000
+
+
+def _alinhar(posicao: int) -> int:
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def _json_canonico(cabecalho: dict) -> bytes:
+    return json.dumps(cabecalho, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _resumo(cabecalho: dict, dados) -> str:
+    # sha256 do cabeçalho (sem os campos derivados do próprio hash) + arrays
+    sem_hash = {k: v for k, v in cabecalho.items() if k not in ("sha256", "versao")}
+    h = hashlib.sha256(_json_canonico(sem_hash))
+    h.update(dados)
+    return h.hexdigest()
+
+
+# =========================
+# Extração do Pipeline (sklearn)
+# =========================
+def _extrair_vetorizador(vetorizador) -> tuple[dict, dict]:
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+    if not isinstance(vetorizador, CountVectorizer) or not hasattr(vetorizador, "vocabulary_"):
+        raise ValueError(f"vetorizador sem vocabulário ({type(vetorizador).__name__})")
+    if vetorizador.analyzer != "word" or vetorizador.tokenizer is not None or vetorizador.preprocessor is not None:
+        raise ValueError("vetorizador com analisador personalizado")
+    if vetorizador.input != "content":
+        raise ValueError("vetorizador com entrada diferente de texto")
+
+    tfidf = isinstance(vetorizador, TfidfVectorizer)
+    parametros = {
+        "classe": type(vetorizador).__name__,
+        "lowercase": bool(vetorizador.lowercase),
+        "strip_accents": vetorizador.strip_accents,
+        "token_pattern": vetorizador.token_pattern,
+        "ngram_range": list(vetorizador.ngram_range),
+        "stop_words": sorted(vetorizador.get_stop_words()) if vetorizador.get_stop_words() else None,
+        "binary": bool(vetorizador.binary),
+        "norm": vetorizador.norm if tfidf else None,
+        "use_idf": bool(vetorizador.use_idf) if tfidf else False,
+        "smooth_idf": bool(vetorizador.smooth_idf) if tfidf else False,
+        "sublinear_tf": bool(vetorizador.sublinear_tf) if tfidf else False,
+    }
+    if parametros["strip_accents"] not in (None, "ascii", "unicode"):
+        raise ValueError("strip_accents personalizado")
+
+    termos = sorted(vetorizador.vocabulary_, key=vetorizador.vocabulary_.get)
+    codificados = [t.encode("utf-8") for t in termos]
+    arrays = {
+        "vocabulario": np.frombuffer(b"".join(codificados), dtype=np.uint8),
+        "vocabulario_fim": np.cumsum([len(c) for c in codificados], dtype=np.int64),
+    }
+    if parametros["use_idf"]:
+        arrays["idf"] = np.asarray(vetorizador.idf_, dtype=np.float64)
+    return parametros, arrays
+
+
+def _extrair_classificador(classificador, n_termos: int) -> tuple[dict, dict]:
+    from sklearn.naive_bayes import ComplementNB, MultinomialNB
+
+    classes = np.asarray(classificador.classes_)
+    if isinstance(classificador, (ComplementNB, MultinomialNB)):
+        # Log-verossimilhança conjunta = X @ feature_log_prob_.T (+ prior)
+        coef = classificador.feature_log_prob_
+        usa_prior = isinstance(classificador, MultinomialNB) or len(classes) == 1
+        intercepto = classificador.class_log_prior_ if usa_prior else np.zeros(len(classes))
+        decisao = "argmax"
+    elif hasattr(classificador, "coef_") and hasattr(classificador, "intercept_"):
+        coef = classificador.coef_
+        intercepto = np.atleast_1d(classificador.intercept_)
+        decisao = "limiar" if np.ndim(coef) == 1 or coef.shape[0] == 1 else "argmax"
+    else:
+        raise ValueError(f"classificador não linear ({type(classificador).__name__})")
+
+    coef = np.atleast_2d(np.asarray(coef.toarray() if hasattr(coef, "toarray") else coef, dtype=np.float64))
+    if coef.shape[1] != n_termos:
+        raise ValueError("coeficientes não conferem com o vocabulário")
+    parametros = {"classe": type(classificador).__name__, "decisao": decisao}
+    # Transposto (termos x classes): a predição lê uma linha por termo presente
+    arrays = {"coef": np.ascontiguousarray(coef.T), "intercepto": np.asarray(intercepto, dtype=np.float64)}
+    return parametros, (classes.tolist(), arrays)
+
+
+def empacotavel(pipeline) -> str | None:
+    """
+    None se o Pipeline pode virar pacote; caso contrário, o motivo.
+    """
+    try:
+        _extrair(pipeline)
+        return None
+    except ValueError as e:
+        return str(e)
+
+
+def _extrair(pipeline) -> tuple:
+    passos = getattr(pipeline, "steps", None)
+    if not passos or len(passos) != 2:
+        raise ValueError("modelo não é um Pipeline vetorizador + classificador")
+    vetorizador, classificador = passos[0][1], passos[1][1]
+    param_vet, arrays = _extrair_vetorizador(vetorizador)
+    param_clf, (classes, arrays_clf) = _extrair_classificador(classificador, len(vetorizador.vocabulary_))
+    return param_vet, param_clf, classes, {**arrays, **arrays_clf}
+
+
+# =========================
+# Escrita
+# =========================
+def empacotar(pipeline, caminho: str, metricas: dict | None = None, dados: dict | None = None) -> str:
+    """
+    Grava `pipeline` (TF-IDF/Count + classificador linear) como pacote em
+    `caminho` (troca atômica com os.replace). `metricas` e `dados`
+    (impressão digital da base de treino) vão para o cabeçalho.
+    Lança ValueError se o Pipeline não couber no formato.
+    Retorna a versão do pacote (prefixo do sha256).
+    """
+    param_vet, param_clf, classes, arrays = _extrair(pipeline)
+
+    descricao, posicao = {}, 0
+    for nome, array in arrays.items():
+        descricao[nome] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": posicao}
+        posicao = _alinhar(posicao + array.nbytes)
+    dados_bin = bytearray(posicao)
+    for nome, array in arrays.items():
+        inicio = descricao[nome]["offset"]
+        dados_bin[inicio:inicio + array.nbytes] = np.ascontiguousarray(array).tobytes()
+
+    cabecalho = {
+        "formato": FORMATO,
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "classes": classes,
+        "vetorizador": param_vet,
+        "classificador": param_clf,
+        "treino": {"dados": dados or {}, "metricas": metricas or {}},
+        "arrays": descricao,
+    }
+    cabecalho["sha256"] = _resumo(cabecalho, dados_bin)
+    cabecalho["versao"] = cabecalho["sha256"][:16]
+    bruto = _json_canonico(cabecalho)
+
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGICO)
+            f.write(len(bruto).to_bytes(8, "little"))
+            f.write(bruto)
+            f.write(b"\0" * (_alinhar(16 + len(bruto)) - 16 - len(bruto)))
+            f.write(dados_bin)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return cabecalho["versao"]
+
+
+# =========================
+# Leitura
+# =========================
+def _abrir(caminho: str) -> tuple[np.memmap, dict, int]:
+    mapa = np.memmap(caminho, dtype=np.uint8, mode="r")
+    if mapa.size < 16 or bytes(mapa[:8]) != MAGICO:
+        raise ValueError(f"Arquivo não é um pacote de modelo do SIGMA-Q: {caminho}")
+    tamanho = int.from_bytes(bytes(mapa[8:16]), "little")
+    cabecalho = json.loads(bytes(mapa[16:16 + tamanho]).decode("utf-8"))
+    if cabecalho.get("formato") != FORMATO:
+        raise ValueError(f"Formato de pacote não suportado: {cabecalho.get('formato')}")
+    return mapa, cabecalho, _alinhar(16 + tamanho)
+
+
+def ler_cabecalho(caminho: str) -> dict:
+    """
+    Metadados do pacote (classes, treino, métricas, versão), sem os arrays.
+    """
+    with open(caminho, "rb") as f:
+        inicio = f.read(16)
+        if len(inicio) < 16 or inicio[:8] != MAGICO:
+            raise ValueError(f"Arquivo não é um pacote de modelo do SIGMA-Q: {caminho}")
+        return json.loads(f.read(int.from_bytes(inicio[8:], "little")).decode("utf-8"))
+
+
+def carregar_pacote(caminho: str, verificar: bool = True) -> "ModeloEmpacotado":
+    """
+    Mapeia o pacote em memória e confere o sha256 (com `verificar`).
+    Os arrays apontam direto para as páginas do arquivo (sem cópia).
+    Lança ValueError se o arquivo estiver corrompido.
+    """
+    mapa, cabecalho, inicio = _abrir(caminho)
+    if verificar and _resumo(cabecalho, memoryview(mapa[inicio:])) != cabecalho["sha256"]:
+        raise ValueError(f"Pacote de modelo corrompido (sha256 não confere): {caminho}")
+
+    arrays = {}
+    for nome, info in cabecalho["arrays"].items():
+        arrays[nome] = np.ndarray(
+            tuple(info["shape"]), dtype=np.dtype(info["dtype"]), buffer=mapa, offset=inicio + info["offset"]
+        )
+    return ModeloEmpacotado(cabecalho, arrays, caminho)
+
+
+# =========================
+# Modelo carregado
+# =========================
+def _sem_acentos_ascii(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ASCII", "ignore").decode("ASCII")
+
+
+def _sem_acentos_unicode(texto: str) -> str:
+    try:
+        texto.encode("ASCII", errors="strict")
+        return texto
+    except UnicodeEncodeError:
+        return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+class ModeloEmpacotado:
+    """
+    Modelo lido de um pacote. `predict(textos)` recebe texto bruto, como o
+    Pipeline do sklearn, e reproduz a tokenização e o TF-IDF do vetorizador
+    original (mesmas previsões).
+    """
+
+    def __init__(self, cabecalho: dict, arrays: dict, caminho: str | None = None):
+        self.cabecalho = cabecalho
+        self.caminho = caminho
+        self.versao = cabecalho["versao"]
+        self.classes_ = np.array(cabecalho["classes"], dtype=object)
+        self._arrays = arrays
+
+        parametros = cabecalho["vetorizador"]
+        self._parametros = parametros
+        self._padrao = re.compile(parametros["token_pattern"])
+        self._acentos = {"ascii": _sem_acentos_ascii, "unicode": _sem_acentos_unicode}.get(parametros["strip_accents"])
+        self._stop_words = frozenset(parametros["stop_words"] or ())
+        self._ngramas = tuple(parametros["ngram_range"])
+
+        # Vocabulário: bytes UTF-8 concatenados + posições finais
+        bruto = arrays["vocabulario"].tobytes()
+        fins = arrays["vocabulario_fim"].tolist()
+        self._vocabulario = {bruto[a:b].decode("utf-8"): j for j, (a, b) in enumerate(zip([0] + fins[:-1], fins))}
+
+    @property
+    def metadados(self) -> dict:
+        return {k: v for k, v in self.cabecalho.items() if k != "arrays"}
+
+    # -------------------------
+    # Analisador (mesmas regras do CountVectorizer com analyzer="word")
+    # -------------------------
+    def _termos(self, texto: str) -> list:
+        if self._parametros["lowercase"]:
+            texto = texto.lower()
+        if self._acentos is not None:
+            texto = self._acentos(texto)
+        tokens = self._padrao.findall(texto)
+        if self._stop_words:
+            tokens = [t for t in tokens if t not in self._stop_words]
+
+        minimo, maximo = self._ngramas
+        if maximo == 1:
+            return tokens
+        termos = list(tokens) if minimo == 1 else []
+        for n in range(max(minimo, 2), min(maximo, len(tokens)) + 1):
+            termos.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return termos
+
+    def _features(self, textos: list) -> tuple:
+        # Matriz esparsa em coordenadas (linha, coluna, valor), ordenada por linha
+        vocabulario = self._vocabulario
+        linhas, colunas = [], []
+        for i, texto in enumerate(textos):
+            indices = [vocabulario[t] for t in self._termos(str(texto)) if t in vocabulario]
+            linhas.extend([i] * len(indices))
+            colunas.extend(indices)
+
+        n_termos = len(vocabulario)
+        chaves, contagens = np.unique(
+            np.asarray(linhas, dtype=np.int64) * n_termos + np.asarray(colunas, dtype=np.int64), return_counts=True
+        )
+        linhas, colunas = np.divmod(chaves, n_termos)
+        valores = np.ones(len(chaves)) if self._parametros["binary"] else contagens.astype(np.float64)
+
+        if self._parametros["sublinear_tf"]:
+            valores = np.log(valores) + 1
+        if self._parametros["use_idf"]:
+            valores = valores * self._arrays["idf"][colunas]
+        norma = self._parametros["norm"]
+        if norma in ("l1", "l2") and len(valores):
+            pesos = np.abs(valores) if norma == "l1" else valores ** 2
+            totais = np.bincount(linhas, weights=pesos, minlength=len(textos))
+            valores = valores / (totais if norma == "l1" else np.sqrt(totais))[linhas]
+        return linhas, colunas, valores
+
+    # -------------------------
+    # Predição
+    # -------------------------
+    def decision_function(self, textos) -> np.ndarray:
+        textos = list(textos)
+        coef, intercepto = self._arrays["coef"], self._arrays["intercepto"]
+        saida = np.empty((len(textos), coef.shape[1]))
+        for inicio in range(0, len(textos), LOTE_PREDICAO):
+            lote = textos[inicio:inicio + LOTE_PREDICAO]
+            linhas, colunas, valores = self._features(lote)
+            pontos = np.zeros((len(lote), coef.shape[1]))
+            if len(linhas):
+                cortes = np.flatnonzero(np.diff(linhas, prepend=-1))
+                pontos[linhas[cortes]] = np.add.reduceat(valores[:, None] * coef[colunas], cortes, axis=0)
+            saida[inicio:inicio + len(lote)] = pontos + intercepto
+        return saida[:, 0] if self.cabecalho["classificador"]["decisao"] == "limiar" else saida
+
+    def predict(self, textos) -> np.ndarray:
+        pontos = self.decision_function(textos)
+        if self.cabecalho["classificador"]["decisao"] == "limiar":
+            return self.classes_[(pontos > 0).astype(int)]
+        return self.classes_[np.argmax(pontos, axis=1)]
+
+    def vetorizador_sklearn(self):
+        """
+        TfidfVectorizer/CountVectorizer já ajustado equivalente ao do pacote
+        (importa o sklearn; usado pelo índice de similaridade).
+        """
+        from sklearn.feature_extraction import text as texto_sklearn
+
+        p = self._parametros
+        comuns = dict(
+            lowercase=p["lowercase"], strip_accents=p["strip_accents"], token_pattern=p["token_pattern"],
+            ngram_range=tuple(p["ngram_range"]), stop_words=p["stop_words"], binary=p["binary"],
+        )
+        if p["classe"] != "TfidfVectorizer":
+            vetorizador = texto_sklearn.CountVectorizer(**comuns)
+        else:
+            vetorizador = texto_sklearn.TfidfVectorizer(
+                **comuns, norm=p["norm"], use_idf=p["use_idf"], smooth_idf=p["smooth_idf"], sublinear_tf=p["sublinear_tf"],
+            )
+            tfidf = texto_sklearn.TfidfTransformer(
+                norm=p["norm"], use_idf=p["use_idf"], smooth_idf=p["smooth_idf"], sublinear_tf=p["sublinear_tf"],
+            )
+            if p["use_idf"]:
+                tfidf.idf_ = np.array(self._arrays["idf"])
+            tfidf.n_features_in_ = len(self._vocabulario)
+            vetorizador._tfidf = tfidf
+        vetorizador.vocabulary_ = dict(self._vocabulario)
+        vetorizador.fixed_vocabulary_ = False
+        return vetorizador
+
+
+# =========================
+# Linha de comando
+# =========================
+def main(argv=None):
+    from utils.model_trainer import PACOTE_PATH, MODEL_PATH, VECTORIZER_PATH
+
+    parser = argparse.ArgumentParser(description="Pacote do modelo do SIGMA-Q")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    info = sub.add_parser("info", help="mostra os metadados do pacote")
+    info.add_argument("pacote", nargs="?", default=PACOTE_PATH)
+    conv = sub.add_parser("converter", help="converte o modelo .pkl atual em pacote")
+    conv.add_argument("--modelo", default=MODEL_PATH)
+    conv.add_argument("--vetorizador", default=VECTORIZER_PATH)
+    args = parser.parse_args(argv)
+
+    if args.comando == "info":
+        if not os.path.exists(args.pacote):
+            parser.error(f"pacote não encontrado: {args.pacote}")
+        print(json.dumps({k: v for k, v in ler_cabecalho(args.pacote).items() if k != "arrays"}, indent=2, ensure_ascii=False))
+        return
+
+    import joblib
+    from sklearn.pipeline import Pipeline
+    from utils.model_trainer import salvar_artefatos
+
+    modelo = joblib.load(args.modelo)
+    if not hasattr(modelo, "steps"):
+        modelo = Pipeline([("tfidf", joblib.load(args.vetorizador)), ("clf", modelo)])
+    motivo = empacotavel(modelo)
+    if motivo:
+        parser.error(f"modelo não pode ser empacotado: {motivo}")
+    salvar_artefatos(modelo)
+    print(f"✅ Pacote gravado em {PACOTE_PATH} (versão {ler_cabecalho(PACOTE_PATH)['versao']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+# ============================================
+# utils/registro_modelos.py
+# ============================================
+# Registro dos últimos pacotes de modelo do SIGMA-Q.
+# Cada treinamento grava o pacote em model/registro com
+# as métricas de avaliação; registro.json marca qual está
+# ativo e guarda o histórico de ativos. O pacote ativo é
+# exposto em model/modelo_classificacao.sigmaq (link para
+# o arquivo do registro), então o resto do sistema não
+# muda. O ativo, o candidato e o anterior ficam carregados
+# na memória do processo: promover ou reverter troca só o
+# ponteiro. O candidato é avaliado em sombra (thread) sobre
+# a base atual, comparado com as previsões do ativo.
+#
+# Uso:
+#   python -m utils.registro_modelos listar
+#   python -m utils.registro_modelos promover [versao]
+#   python -m utils.registro_modelos reverter
+# ============================================
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.pacote_modelo import empacotar, carregar_pacote, ler_cabecalho
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+REGISTRO_DIR = os.path.join("model", "registro")
+INDICE_PATH = os.path.join(REGISTRO_DIR, "registro.json")
+# Resultados da avaliação em sombra, por versão do candidato
+SOMBRA_PATH = os.path.join(REGISTRO_DIR, "sombra.json")
+# Pacote ativo (mesmo caminho lido pelo model_manager)
+ATIVO_PATH = os.path.join("model", "modelo_classificacao.sigmaq")
+# Artefatos do formato antigo, removidos ao ativar um pacote
+LEGADOS = [os.path.join("model", "modelo_classificacao.pkl"), os.path.join("model", "vectorizer.pkl")]
+
+# Quantos pacotes manter no registro (o ativo e o anterior nunca são removidos)
+MAX_MODELOS = 5
+
+
+# =========================
+# Índice (registro.json)
+# =========================
+def _caminho(versao: str) -> str:
+    return os.path.join(REGISTRO_DIR, f"{versao}.sigmaq")
+
+
+def _ler_json(caminho: str, padrao: dict) -> dict:
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return padrao
+
+
+def _gravar_json(caminho: str, dados: dict):
+    os.makedirs(REGISTRO_DIR, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=REGISTRO_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _ler_indice() -> dict:
+    return _ler_json(INDICE_PATH, {"ativo": None, "historico": [], "modelos": []})
+
+
+def _gravar_indice(indice: dict):
+    _gravar_json(INDICE_PATH, indice)
+
+
+def _entrada(indice: dict, versao: str) -> dict | None:
+    return next((m for m in indice["modelos"] if m["versao"] == versao), None)
+
+
+def _candidato(indice: dict) -> str | None:
+    # Pacote mais recente que não é o ativo
+    return next((m["versao"] for m in indice["modelos"] if m["versao"] != indice["ativo"]), None)
+
+
+def _anterior(indice: dict) -> str | None:
+    # Último ativo antes do atual (alvo do "reverter")
+    return next((v for v in reversed(indice["historico"]) if v != indice["ativo"] and _entrada(indice, v)), None)
+
+
+def _importar_ativo_existente(indice: dict):
+    # Pacote ativo gravado antes do registro existir entra como primeira versão
+    if indice["modelos"] or not os.path.exists(ATIVO_PATH):
+        return
+    cabecalho = ler_cabecalho(ATIVO_PATH)
+    os.makedirs(REGISTRO_DIR, exist_ok=True)
+    shutil.copy2(ATIVO_PATH, _caminho(cabecalho["versao"]))
+    indice["modelos"].append({
+        "versao": cabecalho["versao"], "criado_em": cabecalho["criado_em"], "origem": "existente",
+        "metricas": cabecalho["treino"]["metricas"], "registrado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    indice["ativo"] = cabecalho["versao"]
+
+
+def _apontar(versao: str):
+    # Ativo = link para o arquivo do registro (cópia se o link não for possível)
+    os.makedirs(os.path.dirname(ATIVO_PATH), exist_ok=True)
+    temporario = ATIVO_PATH + ".tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    try:
+        os.link(_caminho(versao), temporario)
+    except OSError:
+        shutil.copy2(_caminho(versao), temporario)
+    os.replace(temporario, ATIVO_PATH)
+    for legado in LEGADOS:
+        if os.path.exists(legado):
+            os.remove(legado)
+
+
+def _podar(indice: dict):
+    protegidos = {indice["ativo"], _anterior(indice)}
+    excedentes = [m for m in indice["modelos"][MAX_MODELOS:] if m["versao"] not in protegidos]
+    for modelo in excedentes:
+        indice["modelos"].remove(modelo)
+        if os.path.exists(_caminho(modelo["versao"])):
+            os.remove(_caminho(modelo["versao"]))
+    versoes = {m["versao"] for m in indice["modelos"]}
+    indice["historico"] = [v for v in indice["historico"] if v in versoes]
+
+
+# =========================
+# Modelos carregados no processo
+# =========================
+class _Registro:
+    """
+    Pacotes carregados (ativo, candidato e anterior) e a última avaliação
+    em sombra. Compartilhado por todas as sessões do Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Serializa leitura-alteração-gravação do registro.json no processo
+        self.lock_indice = threading.RLock()
+        self.carregados = {}
+        self.pre_carga = None
+        self.sombra = None
+        self.thread_sombra = None
+
+
+_registro = _Registro()
+
+
+def _pre_carregar():
+    indice = _ler_indice()
+    manter = {v for v in (indice["ativo"], _candidato(indice), _anterior(indice)) if v}
+    for versao in manter:
+        if versao not in _registro.carregados and os.path.exists(_caminho(versao)):
+            try:
+                modelo = carregar_pacote(_caminho(versao))
+            except Exception as e:
+                print(f"⚠️ Pacote {versao} do registro inválido: {e}")
+                continue
+            with _registro.lock:
+                _registro.carregados[versao] = modelo
+    with _registro.lock:
+        for versao in set(_registro.carregados) - manter:
+            del _registro.carregados[versao]
+
+
+def pre_carregar(esperar: bool = False):
+    """
+    Carrega em segundo plano o ativo, o candidato e o anterior (os que
+    ainda não estão na memória) e descarta os demais.
+    """
+    with _registro.lock:
+        if _registro.pre_carga is None or not _registro.pre_carga.is_alive():
+            _registro.pre_carga = threading.Thread(target=_pre_carregar, name="sigmaq-registro", daemon=True)
+            _registro.pre_carga.start()
+        thread = _registro.pre_carga
+    if esperar:
+        thread.join()
+
+
+def carregar_registrado(caminho: str = ATIVO_PATH):
+    """
+    Pacote em `caminho`: se a versão já estiver carregada (pré-carga do
+    registro), só o ponteiro é devolvido; senão o pacote é mapeado.
+    """
+    versao = ler_cabecalho(caminho)["versao"]
+    with _registro.lock:
+        modelo = _registro.carregados.get(versao)
+    if modelo is None:
+        modelo = carregar_pacote(caminho)
+        with _registro.lock:
+            _registro.carregados[versao] = modelo
+    if os.path.exists(INDICE_PATH):
+        pre_carregar()
+    return modelo
+
+
+# =========================
+# Registro, promoção e reversão
+# =========================
+def registrar(
+    pipeline, metricas: dict | None = None, dados: dict | None = None, ativar: bool = True, origem: str = "treino",
+) -> str:
+    """
+    Grava `pipeline` como pacote no registro (com `metricas` e a impressão
+    digital `dados` da base de treino). Com `ativar`, ele passa a ser o
+    modelo ativo; senão fica como candidato. Lança ValueError se o
+    Pipeline não couber no pacote. Retorna a versão.
+    """
+    os.makedirs(REGISTRO_DIR, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=REGISTRO_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        versao = empacotar(pipeline, temporario, metricas=metricas, dados=dados)
+        os.replace(temporario, _caminho(versao))
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    with _registro.lock_indice:
+        indice = _ler_indice()
+        _importar_ativo_existente(indice)
+        indice["modelos"] = [m for m in indice["modelos"] if m["versao"] != versao]
+        indice["modelos"].insert(0, {
+            "versao": versao, "criado_em": ler_cabecalho(_caminho(versao))["criado_em"], "origem": origem,
+            "metricas": metricas or {}, "registrado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        if ativar:
+            _ativar(indice, versao)
+        _podar(indice)
+        _gravar_indice(indice)
+    return versao
+
+
+def _ativar(indice: dict, versao: str):
+    if indice["ativo"] and indice["ativo"] != versao:
+        indice["historico"].append(indice["ativo"])
+    indice["ativo"] = versao
+    _apontar(versao)
+
+
+def desativar():
+    """
+    Marca que não há pacote ativo (o modelo ativo foi gravado em .pkl).
+    """
+    with _registro.lock_indice:
+        indice = _ler_indice()
+        if indice["ativo"]:
+            indice["historico"].append(indice["ativo"])
+            indice["ativo"] = None
+            _gravar_indice(indice)
+
+
+def promover(versao: str | None = None) -> str:
+    """
+    Torna `versao` (padrão: o candidato) o modelo ativo. Se ela já estiver
+    carregada, o model_manager só troca o ponteiro. Retorna a versão ativa.
+    """
+    with _registro.lock_indice:
+        indice = _ler_indice()
+        versao = versao or _candidato(indice)
+        if not versao or not _entrada(indice, versao):
+            raise ValueError(f"Versão não encontrada no registro: {versao}")
+        if versao != indice["ativo"]:
+            _ativar(indice, versao)
+            _gravar_indice(indice)
+            print(f"⬆️ Modelo {versao} ativado.")
+    pre_carregar()
+    return versao
+
+
+def reverter() -> str:
+    """
+    Volta para o modelo ativo anterior. Retorna a versão ativa.
+    """
+    with _registro.lock_indice:
+        indice = _ler_indice()
+        anterior = _anterior(indice)
+        if anterior is None:
+            raise ValueError("Não há modelo anterior no registro.")
+        # O histórico volta ao ponto em que o anterior estava ativo
+        posicao = len(indice["historico"]) - 1 - indice["historico"][::-1].index(anterior)
+        indice["historico"] = indice["historico"][:posicao]
+        indice["ativo"] = anterior
+        _apontar(anterior)
+        _gravar_indice(indice)
+    print(f"↩️ Modelo revertido para {anterior}.")
+    pre_carregar()
+    return anterior
+
+
+def situacao() -> dict:
+    """
+    Versões ativa, candidata e anterior, mais as entradas do registro.
+    """
+    indice = _ler_indice()
+    sombras = _ler_json(SOMBRA_PATH, {})
+    return {
+        "ativo": indice["ativo"], "candidato": _candidato(indice), "anterior": _anterior(indice),
+        "modelos": [{**m, "sombra": sombras.get(m["versao"])} for m in indice["modelos"]],
+    }
+
+
+def listar() -> pd.DataFrame:
+    """
+    Uma linha por pacote do registro, com métricas, situação e o resultado
+    da avaliação em sombra (quando houver).
+    """
+    estado = situacao()
+    papeis = {estado["anterior"]: "anterior", estado["candidato"]: "candidato", estado["ativo"]: "ativo"}
+    linhas = []
+    for modelo in estado["modelos"]:
+        sombra = modelo.get("sombra") or {}
+        linhas.append({
+            "VERSAO": modelo["versao"], "SITUACAO": papeis.get(modelo["versao"], ""),
+            "CRIADO_EM": modelo["criado_em"], "ORIGEM": modelo["origem"],
+            **{k.upper(): v for k, v in modelo["metricas"].items()},
+            "CONCORDANCIA_SOMBRA": sombra.get("concordancia"),
+        })
+    return pd.DataFrame(linhas)
+
+
+# =========================
+# Avaliação em sombra
+# =========================
+def _avaliar_sombra(chave: tuple, textos: np.ndarray, previsoes: np.ndarray, rotulos: np.ndarray | None):
+    candidato, ativo, versao_dados = chave
+    inicio = time.perf_counter()
+    try:
+        with _registro.lock:
+            modelo = _registro.carregados.get(candidato)
+        modelo = modelo or carregar_pacote(_caminho(candidato))
+
+        # Cada descrição distinta é prevista uma vez
+        codigos, unicos = pd.factorize(textos)
+        sombra = np.asarray(modelo.predict(unicos.astype(str)), dtype=object)[codigos]
+        resultado = {
+            "candidato": candidato, "ativo": ativo, "versao_dados": versao_dados,
+            "linhas": int(len(textos)), "distintos": int(len(unicos)),
+            "concordancia": round(float((sombra.astype(str) == previsoes.astype(str)).mean()), 4) if len(textos) else None,
+        }
+        if rotulos is not None and len(textos):
+            resultado["acuracia_ativo"] = round(float((previsoes.astype(str) == rotulos.astype(str)).mean()), 4)
+            resultado["acuracia_candidato"] = round(float((sombra.astype(str) == rotulos.astype(str)).mean()), 4)
+    except Exception as e:
+        resultado = {"candidato": candidato, "ativo": ativo, "versao_dados": versao_dados, "erro": str(e)}
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+
+    with _registro.lock:
+        _registro.sombra = resultado
+    # Fica gravado por versão do candidato (visível também pela linha de comando)
+    if "erro" not in resultado:
+        with _registro.lock_indice:
+            versoes = {m["versao"] for m in _ler_indice()["modelos"]}
+            sombras = {v: r for v, r in _ler_json(SOMBRA_PATH, {}).items() if v in versoes}
+            sombras[candidato] = resultado
+            _gravar_json(SOMBRA_PATH, sombras)
+    print(f"🌓 Avaliação em sombra do candidato {candidato}: {resultado}")
+
+
+def iniciar_sombra(textos: pd.Series, previsoes: pd.Series, rotulos: pd.Series | None = None, versao_dados: str | None = None) -> bool:
+    """
+    Avalia o candidato sobre `textos` em uma thread, comparando com as
+    `previsoes` do ativo (e com `rotulos`, se informados). Cada
+    (candidato, ativo, versão dos dados) é avaliado uma única vez.
+    Retorna True se uma avaliação foi iniciada.
+    """
+    indice = _ler_indice()
+    candidato = _candidato(indice)
+    if candidato is None or indice["ativo"] is None:
+        return False
+    chave = (candidato, indice["ativo"], versao_dados)
+
+    with _registro.lock:
+        if _registro.thread_sombra is not None and _registro.thread_sombra.is_alive():
+            return False
+        anterior = _registro.sombra
+        if anterior is not None and (anterior["candidato"], anterior["ativo"], anterior["versao_dados"]) == chave:
+            return False
+        _registro.sombra = {"candidato": candidato, "ativo": indice["ativo"], "versao_dados": versao_dados, "em_andamento": True}
+        _registro.thread_sombra = threading.Thread(
+            target=_avaliar_sombra, name="sigmaq-sombra", daemon=True,
+            args=(
+                chave, textos.astype(str).to_numpy(dtype=object), previsoes.to_numpy(dtype=object),
+                None if rotulos is None else rotulos.to_numpy(dtype=object),
+            ),
+        )
+        _registro.thread_sombra.start()
+    return True
+
+
+def resultado_sombra() -> dict | None:
+    """
+    Última avaliação em sombra deste processo ({"em_andamento": True}
+    enquanto a thread roda).
+    """
+    with _registro.lock:
+        return None if _registro.sombra is None else dict(_registro.sombra)
+
+
+# =========================
+# Linha de comando
+# =========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registro de modelos do SIGMA-Q")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("listar", help="lista os pacotes do registro")
+    prom = sub.add_parser("promover", help="ativa uma versão (padrão: o candidato)")
+    prom.add_argument("versao", nargs="?")
+    sub.add_parser("reverter", help="volta para o modelo ativo anterior")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "promover":
+            promover(args.versao)
+        elif args.comando == "reverter":
+            reverter()
+    except ValueError as e:
+        parser.error(str(e))
+
+    tabela = listar()
+    print(tabela.to_string(index=False) if len(tabela) else "📭 Registro vazio.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# ============================================
+# utils/retrain.py
+# ============================================
+# Treinamento do modelo SIGMA-Q em segundo plano.
+# O ajuste roda em um processo Python separado; o progresso é
+# publicado em model/treino_status.json e os artefatos
+# só substituem os atuais (troca atômica) ao final.
+# Enquanto isso o dashboard segue usando o modelo anterior.
+# ============================================
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Arquivo de status compartilhado entre o processo de treino e o dashboard
+STATUS_PATH = os.path.join("model", "treino_status.json")
+
+# Estados possíveis do job
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+# Tipos de job: treino padrão ou seleção de modelo (busca de hiperparâmetros)
+MODO_TREINO = "treino"
+MODO_SELECAO = "selecao"
+
+# O processo de treino regrava o status a cada INTERVALO_BATIMENTO
+# segundos; sem atualização por LIMITE_BATIMENTO segundos, um job de
+# outro processo é considerado interrompido
+INTERVALO_BATIMENTO = 5
+LIMITE_BATIMENTO = 30
+
+_lock = threading.Lock()
+_processo = None
+
+# Último status gravado pelo processo de treino (regravado pelo batimento)
+_lock_status = threading.Lock()
+_ultimo_status = {}
+
+
+# =========================
+# Status do job
+# =========================
+def _escrever_status(campos: dict):
+    os.makedirs(os.path.dirname(STATUS_PATH), exist_ok=True)
+    campos["atualizado_em"] = time.time()
+    temporario = STATUS_PATH + f".{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(campos, f, ensure_ascii=False)
+    os.replace(temporario, STATUS_PATH)
+
+
+def _gravar_status(**campos):
+    with _lock_status:
+        _ultimo_status.clear()
+        _ultimo_status.update(campos)
+        _escrever_status(campos)
+
+
+def _ler_status() -> dict | None:
+    try:
+        with open(STATUS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _bater(job_id: str, parar: threading.Event):
+    # Thread do processo de treino: mantém `atualizado_em` recente enquanto
+    # o job está em andamento (inclusive antes do primeiro progresso)
+    while not parar.wait(INTERVALO_BATIMENTO):
+        with _lock_status:
+            if not _ultimo_status:
+                status = _ler_status() or {}
+                if status.get("job_id") == job_id:
+                    _ultimo_status.update(status)
+            if _ultimo_status.get("estado") == EM_ANDAMENTO:
+                _escrever_status(dict(_ultimo_status))
+
+
+def _job_ativo(status: dict) -> bool:
+    # Filho deste processo: poll() — sem sinais (no Windows os.kill
+    # encerraria o próprio treino)
+    if _processo is not None and status.get("pid") == _processo.pid:
+        return _processo.poll() is None
+    # Job iniciado por outro processo: batimento recente no arquivo de status
+    return time.time() - status.get("atualizado_em", 0) <= LIMITE_BATIMENTO
+
+
+def status_treinamento() -> dict | None:
+    """
+    Retorna o último status do treinamento em segundo plano (ou None).
+    Um job marcado em andamento cujo processo terminou (ou parou de
+    atualizar o status) é reportado como erro.
+    """
+    status = _ler_status()
+    if status is None:
+        return None
+
+    if status.get("estado") == EM_ANDAMENTO and not _job_ativo(status):
+        status["estado"] = ERRO
+        status["mensagem"] = "❌ O processo de treinamento foi interrompido."
+    return status
+
+
+def treinamento_em_andamento() -> bool:
+    status = status_treinamento()
+    return bool(status) and status.get("estado") == EM_ANDAMENTO
+
+
+# =========================
+# Processo de treinamento
+# =========================
+def _executar_selecao(job_id: str, reportar):
+    from utils.selecao_modelo import selecionar_modelo
+
+    resumo = selecionar_modelo(progresso=reportar)["resumo"]
+    if resumo["promovido"]:
+        mensagem = f"✅ Novo modelo promovido: {resumo['melhor_candidato']} (F1 macro {resumo['f1_macro_teste']:.4f})"
+    else:
+        mensagem = f"ℹ️ Modelo atual mantido — o melhor candidato não o superou (F1 macro {resumo['f1_macro_teste']:.4f})"
+    _gravar_status(
+        job_id=job_id, pid=os.getpid(), estado=CONCLUIDO, progresso=1.0,
+        acuracia=resumo["acuracia_teste"], mensagem=mensagem,
+    )
+
+
+def _executar_treino(job_id: str, modo: str = MODO_TREINO):
+    """
+    Ponto de entrada do processo filho.
+    """
+    pid = os.getpid()
+    parar = threading.Event()
+    threading.Thread(target=_bater, args=(job_id, parar), name="sigmaq-treino-batimento", daemon=True).start()
+
+    from utils.model_trainer import treinar_pipeline, salvar_artefatos
+
+    def reportar(fracao: float, mensagem: str):
+        _gravar_status(job_id=job_id, pid=pid, estado=EM_ANDAMENTO, progresso=fracao, mensagem=mensagem)
+
+    try:
+        if modo == MODO_SELECAO:
+            _executar_selecao(job_id, reportar)
+            return
+
+        pipeline, score = treinar_pipeline(progresso=reportar)
+        reportar(0.95, "💾 Salvando artefatos...")
+        salvar_artefatos(pipeline, metricas={"acuracia": round(score, 4)})
+        _gravar_status(
+            job_id=job_id, pid=pid, estado=CONCLUIDO, progresso=1.0, acuracia=score,
+            mensagem=f"✅ Treinamento concluído — acurácia: {score*100:.2f}%",
+        )
+    except Exception as e:
+        _gravar_status(job_id=job_id, pid=pid, estado=ERRO, progresso=1.0, mensagem=f"❌ Erro durante o treinamento: {e}")
+    finally:
+        parar.set()
+
+
+def iniciar_treinamento(modo: str = MODO_TREINO) -> str | None:
+    """
+    Dispara o treinamento (ou a seleção de modelo, com modo=MODO_SELECAO)
+    em um processo separado.
+    Retorna o identificador do job, ou None se já houver um em andamento.
+    """
+    global _processo
+    with _lock:
+        if (_processo is not None and _processo.poll() is None) or treinamento_em_andamento():
+            return None
+
+        # Processo Python independente: não herda o estado do Streamlit
+        job_id = time.strftime("%Y%m%d_%H%M%S")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [BASE_DIR, env.get("PYTHONPATH")]))
+        _processo = subprocess.Popen([sys.executable, "-m", "utils.retrain", job_id, modo], env=env)
+
+        # O filho pode já ter publicado o próprio progresso
+        status = status_treinamento() or {}
+        if status.get("job_id") != job_id:
+            mensagem = "🔬 Iniciando seleção de modelo..." if modo == MODO_SELECAO else "🚀 Iniciando treinamento do modelo SIGMA-Q..."
+            _gravar_status(job_id=job_id, pid=_processo.pid, estado=EM_ANDAMENTO, progresso=0.0, mensagem=mensagem)
+        return job_id
+
+
+if __name__ == "__main__":
+    _executar_treino(sys.argv[1], *sys.argv[2:3])
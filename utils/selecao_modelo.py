@@ -0,0 +1,284 @@
+# ============================================
+# utils/selecao_modelo.py
+# ============================================
+# Seleção de modelo do SIGMA-Q.
+# Busca em grade (ou por successive halving) sobre os
+# parâmetros do TF-IDF e do classificador, com validação
+# cruzada estratificada em todos os núcleos (joblib) e
+# cache do passo de vetorização entre candidatos (memory
+# do Pipeline). Gera um relatório com métricas por classe
+# e latência de ajuste/predição de cada candidato e
+# promove o vencedor quando ele supera o modelo atual.
+#
+# Uso:
+#   python -m utils.selecao_modelo
+#   python -m utils.selecao_modelo --modo grade --n-jobs 4 --sem-promover
+# ============================================
+
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# sklearn/joblib são importados só ao executar a seleção: o dashboard
+# importa este módulo apenas para ler o último relatório
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_PIPELINE_DIR = os.path.join(BASE_DIR, "data", "cache", "pipeline")
+RELATORIOS_DIR = os.path.join(BASE_DIR, "data", "logs", "selecao")
+
+# Métrica usada para escolher e promover (classes desbalanceadas)
+METRICA = "f1_macro"
+
+# O vencedor só substitui o modelo atual se o superar por esta margem
+MARGEM_PROMOCAO = 0.002
+
+N_FOLDS = 5
+
+# Tamanho máximo do cache de vetorização entre execuções
+LIMITE_CACHE_PIPELINE = "1G"
+
+
+def _sem_progresso(fracao: float, mensagem: str):
+    pass
+
+
+def grade_padrao() -> list[dict]:
+    """
+    Candidatos padrão: TF-IDF (tamanho do vocabulário, n-gramas, tf
+    sublinear) x classificadores lineares.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import LinearSVC
+    from sklearn.naive_bayes import ComplementNB
+
+    tfidf = {
+        "tfidf__max_features": [5000, 20000],
+        "tfidf__ngram_range": [(1, 1), (1, 2)],
+        "tfidf__sublinear_tf": [False, True],
+    }
+    return [
+        {**tfidf, "clf": [LogisticRegression(max_iter=1000)], "clf__C": [1.0, 10.0]},
+        {**tfidf, "clf": [LinearSVC()], "clf__C": [0.5, 1.0]},
+        {**tfidf, "clf": [ComplementNB()], "clf__alpha": [0.1, 0.5]},
+    ]
+
+
+def _descrever(parametros: dict) -> str:
+    partes = []
+    for nome, valor in parametros.items():
+        if nome == "clf":
+            valor = type(valor).__name__
+        partes.append(f"{nome.replace('tfidf__', '').replace('clf__', '')}={valor}")
+    return ", ".join(partes)
+
+
+# =========================
+# Relatório
+# =========================
+def _tabela_candidatos(busca, n_treino: int, n_folds: int) -> pd.DataFrame:
+    resultados = pd.DataFrame(busca.cv_results_)
+    colunas_score = [c for c in resultados.columns if c.startswith("mean_test_") or c.startswith("std_test_")]
+    # Tamanho do fold de validação; no halving, cada iteração usa n_resources amostras
+    amostras = resultados["n_resources"] if "n_resources" in resultados.columns else n_treino
+    n_validacao = np.maximum(np.asarray(amostras) // n_folds, 1)
+    tabela = pd.DataFrame({
+        "CANDIDATO": [_descrever(p) for p in resultados["params"]],
+        "AJUSTE_S": resultados["mean_fit_time"].round(3),
+        # score_time inclui o transform do TF-IDF sobre o fold de validação (s -> ms por 1000 textos)
+        "PREDICAO_MS_POR_1000": (resultados["mean_score_time"] / n_validacao * 1000 * 1000).round(3),
+    })
+    for coluna in colunas_score:
+        tabela[coluna.upper()] = resultados[coluna].round(4)
+    for coluna in ["iter", "n_resources"]:
+        if coluna in resultados.columns:
+            tabela[coluna.upper()] = resultados[coluna]
+    ranking = [c for c in resultados.columns if c.startswith("rank_test_")]
+    tabela["RANK"] = resultados[f"rank_test_{METRICA}" if f"rank_test_{METRICA}" in resultados else ranking[0]]
+    return tabela.sort_values(["RANK", "AJUSTE_S"]).reset_index(drop=True)
+
+
+def _tabela_por_classe(y_true, y_pred, y_pred_atual=None) -> pd.DataFrame:
+    from sklearn.metrics import classification_report
+
+    relatorio = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+    linhas = [
+        {"CLASSE": classe, "PRECISAO": m["precision"], "RECALL": m["recall"], "F1": m["f1-score"], "SUPORTE": int(m["support"])}
+        for classe, m in relatorio.items() if isinstance(m, dict) and classe not in ("macro avg", "weighted avg")
+    ]
+    tabela = pd.DataFrame(linhas)
+    if y_pred_atual is not None:
+        atual = classification_report(y_true, y_pred_atual, output_dict=True, zero_division=0)
+        tabela["F1_ATUAL"] = [atual.get(c, {}).get("f1-score", np.nan) for c in tabela["CLASSE"]]
+    return tabela.round(4)
+
+
+def _salvar_relatorio(resumo: dict, candidatos: pd.DataFrame, por_classe: pd.DataFrame) -> str:
+    destino = os.path.join(RELATORIOS_DIR, resumo["id"])
+    os.makedirs(destino, exist_ok=True)
+    candidatos.to_csv(os.path.join(destino, "candidatos.csv"), index=False)
+    por_classe.to_csv(os.path.join(destino, "por_classe.csv"), index=False)
+    with open(os.path.join(destino, "resumo.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2, default=str)
+    return destino
+
+
+def ultimo_relatorio() -> dict | None:
+    """
+    Retorna o resumo e as tabelas da seleção mais recente (ou None).
+    """
+    resumos = sorted(glob.glob(os.path.join(RELATORIOS_DIR, "*", "resumo.json")))
+    if not resumos:
+        return None
+    destino = os.path.dirname(resumos[-1])
+    try:
+        with open(resumos[-1], encoding="utf-8") as f:
+            resumo = json.load(f)
+        return {
+            "resumo": resumo,
+            "candidatos": pd.read_csv(os.path.join(destino, "candidatos.csv")),
+            "por_classe": pd.read_csv(os.path.join(destino, "por_classe.csv")),
+        }
+    except Exception:
+        return None
+
+
+# =========================
+# Seleção
+# =========================
+def selecionar_modelo(
+    modo: str = "halving",
+    grade: list[dict] | None = None,
+    n_jobs: int = -1,
+    promover: bool = True,
+    progresso=_sem_progresso,
+) -> dict:
+    """
+    Executa a busca (`modo` = "grade" ou "halving") sobre o conjunto de
+    treino (mesma divisão 80/20 do treinamento padrão), avalia o vencedor
+    e o modelo atual no conjunto de teste e promove o vencedor se ele
+    superar o atual em METRICA.
+    Retorna {"resumo", "candidatos", "por_classe"}.
+    """
+    import joblib
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingGridSearchCV)
+    from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold, train_test_split
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.metrics import f1_score
+    from utils.model_trainer import carregar_dados_treino, novo_vetorizador, salvar_artefatos
+    from utils.model_manager import obter_modelos
+
+    textos, rotulos = carregar_dados_treino(progresso)
+    X_train, X_test, y_train, y_test = train_test_split(
+        textos.astype(str), rotulos.astype(str), test_size=0.2, random_state=42
+    )
+
+    # Vetorização em cache entre candidatos com os mesmos parâmetros de TF-IDF
+    memoria = joblib.Memory(CACHE_PIPELINE_DIR, verbose=0)
+    pipeline = Pipeline(
+        [("tfidf", novo_vetorizador()), ("clf", LogisticRegression(max_iter=1000))],
+        memory=memoria,
+    )
+
+    # Folds estratificados (limitados pela classe menos frequente)
+    n_folds = int(max(2, min(N_FOLDS, y_train.value_counts().min())))
+    cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    grade = grade or grade_padrao()
+
+    if modo == "halving":
+        busca = HalvingGridSearchCV(
+            pipeline, grade, scoring=METRICA, cv=cv, n_jobs=n_jobs, factor=3, random_state=42,
+        )
+    elif modo == "grade":
+        busca = GridSearchCV(
+            pipeline, grade, scoring={METRICA: METRICA, "accuracy": "accuracy"},
+            refit=METRICA, cv=cv, n_jobs=n_jobs,
+        )
+    else:
+        raise ValueError(f"Modo de busca desconhecido: {modo}")
+
+    progresso(0.35, f"🔬 Buscando hiperparâmetros ({modo}, {n_folds} folds, n_jobs={n_jobs})...")
+    inicio = time.perf_counter()
+    busca.fit(X_train, y_train)
+    duracao = time.perf_counter() - inicio
+    memoria.reduce_size(bytes_limit=LIMITE_CACHE_PIPELINE)
+    candidatos = _tabela_candidatos(busca, len(X_train), n_folds)
+
+    # Vencedor x modelo atual no conjunto de teste
+    progresso(0.85, "📏 Avaliando vencedor e modelo atual...")
+    melhor = busca.best_estimator_
+    melhor.set_params(memory=None)
+    inicio = time.perf_counter()
+    y_pred = melhor.predict(X_test)
+    latencia_ms = (time.perf_counter() - inicio) / max(len(X_test), 1) * 1000 * 1000
+
+    atual, y_pred_atual, f1_atual = None, None, None
+    try:
+        atual, _ = obter_modelos()
+        y_pred_atual = np.asarray(atual.predict(X_test)).astype(str)
+        f1_atual = f1_score(y_test, y_pred_atual, average="macro", zero_division=0)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Não foi possível avaliar o modelo atual: {e}")
+
+    f1_melhor = f1_score(y_test, y_pred, average="macro", zero_division=0)
+    promovido = promover and (f1_atual is None or f1_melhor > f1_atual + MARGEM_PROMOCAO)
+    # O vencedor entra no registro; sem superar o atual, fica como candidato
+    if promover:
+        progresso(0.95, "💾 Promovendo o vencedor..." if promovido else "💾 Registrando o vencedor como candidato...")
+        salvar_artefatos(melhor, metricas={METRICA: round(float(f1_melhor), 4)}, ativar=promovido, origem="selecao")
+
+    resumo = {
+        "id": time.strftime("%Y%m%d_%H%M%S"),
+        "modo": modo,
+        "candidatos": int(len(candidatos)),
+        "folds": n_folds,
+        "exemplos_treino": int(len(X_train)),
+        "exemplos_teste": int(len(X_test)),
+        "duracao_busca_s": round(duracao, 2),
+        "melhor_candidato": _descrever(busca.best_params_),
+        f"{METRICA}_validacao": round(float(busca.best_score_), 4),
+        f"{METRICA}_teste": round(float(f1_melhor), 4),
+        f"{METRICA}_teste_atual": None if f1_atual is None else round(float(f1_atual), 4),
+        "acuracia_teste": round(float((y_pred == np.asarray(y_test)).mean()), 4),
+        "predicao_ms_por_1000": round(latencia_ms, 3),
+        "promovido": bool(promovido),
+    }
+    por_classe = _tabela_por_classe(y_test, y_pred, y_pred_atual)
+    destino = _salvar_relatorio(resumo, candidatos, por_classe)
+    print(f"📄 Relatório da seleção de modelo salvo em {destino}")
+    return {"resumo": resumo, "candidatos": candidatos, "por_classe": por_classe}
+
+
+# =========================
+# Linha de comando
+# =========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seleção de modelo do SIGMA-Q (busca de hiperparâmetros).")
+    parser.add_argument("--modo", choices=["halving", "grade"], default="halving")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Processos da busca (-1 = todos os núcleos)")
+    parser.add_argument("--sem-promover", action="store_true", help="Só gera o relatório, sem trocar o modelo")
+    args = parser.parse_args(argv)
+
+    relatorio = selecionar_modelo(
+        modo=args.modo, n_jobs=args.n_jobs, promover=not args.sem_promover,
+        progresso=lambda fracao, mensagem: print(mensagem),
+    )
+    print(relatorio["candidatos"].head(10).to_string(index=False))
+    print(relatorio["por_classe"].to_string(index=False))
+    print(json.dumps(relatorio["resumo"], ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# ============================================
+# utils/servico_dados.py
+# ============================================
+# Serviço de dados compartilhado do SIGMA-Q.
+# A base normalizada e classificada é montada uma única
+# vez por processo para cada (versão dos dados, versão do
+# modelo) e publicada como tabela Arrow imutável — arquivo
+# IPC em data/cache/compartilhado lido via memory-map.
+# Cada sessão do Streamlit recebe uma visão somente
+# leitura da mesma tabela, sem copiar os dados. Quando o
+# observador publica uma nova versão da base, a
+# reconstrução roda uma vez, em segundo plano, e as
+# sessões continuam com a versão anterior até a troca.
+# ============================================
+
+import os
+import glob
+import hashlib
+import threading
+import pandas as pd
+
+from utils.atualizador import ler_base, versao_base, DEFAULT_PATH
+from utils.text_normalizer import detectar_coluna_texto
+from utils.ingestao_delta import classificar_delta
+from utils.observador_base import obter_observador
+from utils.compactacao import tipos_arrow_para_pandas
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# =========================
+# Caminhos e parâmetros
+# =========================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+COMPARTILHADO_DIR = os.path.join(BASE_DIR, "data", "cache", "compartilhado")
+
+# Arquivos IPC mantidos em disco: o publicado e o anterior (ainda
+# mapeado por sessões que não recarregaram)
+MAX_ARQUIVOS = 2
+
+
+def _chave_colunas(usecols: list | None) -> tuple | None:
+    return tuple(sorted(map(str, usecols))) if usecols else None
+
+
+# =========================
+# Versão publicada
+# =========================
+class ConjuntoDados:
+    """
+    Uma versão publicada da base: tabela Arrow imutável e metadados.
+    `df` entrega a cada sessão uma visão rasa do mesmo DataFrame — os
+    buffers vêm do memory-map e não são copiados (nem graváveis).
+    """
+
+    def __init__(
+        self, tabela, quadro: pd.DataFrame, versao: int, caminho_base: str, chave_colunas: tuple | None,
+        versao_observador: int, versao_dados: str | None, versao_modelo: str | None,
+        col_texto: str | None, delta: dict | None, arquivo: str | None,
+    ):
+        self.tabela = tabela
+        self._quadro = quadro
+        self.versao = versao
+        self.caminho_base = caminho_base
+        self.chave_colunas = chave_colunas
+        self.versao_observador = versao_observador
+        self.versao_dados = versao_dados
+        self.versao_modelo = versao_modelo
+        self.col_texto = col_texto
+        self.delta = delta
+        self.arquivo = arquivo
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Colunas e índice próprios por sessão; dados compartilhados
+        return self._quadro.copy(deep=False)
+
+    @property
+    def classificado(self) -> bool:
+        return "CATEGORIA_PREDITA" in self._quadro.columns
+
+    def __len__(self) -> int:
+        return len(self._quadro)
+
+
+# =========================
+# Serviço único por processo
+# =========================
+class _ServicoDados:
+    """
+    Versão publicada e parâmetros da última montagem. Compartilhado por
+    todas as sessões do Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lock_construcao = threading.Lock()
+        self.atual = None
+        self.versao = 0
+        self.parametros = None
+        self.thread = None
+        self.pendente = False
+        self.inscritos = set()
+
+
+_servico = _ServicoDados()
+
+
+def _publicar_arrow(df: pd.DataFrame, nome: str) -> tuple:
+    """
+    Grava `df` como arquivo IPC e o reabre via memory-map.
+    Retorna (tabela, DataFrame sobre os buffers mapeados, arquivo).
+    Sem pyarrow, o próprio DataFrame é compartilhado.
+    """
+    if pa is None:
+        return None, df, None
+
+    os.makedirs(COMPARTILHADO_DIR, exist_ok=True)
+    destino = os.path.join(COMPARTILHADO_DIR, nome + ".arrow")
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    try:
+        os.replace(temporario, destino)
+    except OSError:
+        # Mesmo nome = mesmo conteúdo; no Windows o arquivo pode estar mapeado
+        os.remove(temporario)
+
+    tabela = pa.ipc.open_file(pa.memory_map(destino, "r")).read_all()
+    quadro = tabela.to_pandas(types_mapper=tipos_arrow_para_pandas, split_blocks=True)
+    _podar(destino)
+    return tabela, quadro, destino
+
+
+def _podar(manter: str):
+    arquivos = sorted(glob.glob(os.path.join(COMPARTILHADO_DIR, "*.arrow")), key=os.path.getmtime, reverse=True)
+    for antigo in [a for a in arquivos if a != manter][MAX_ARQUIVOS - 1:]:
+        try:
+            os.remove(antigo)
+        except OSError:
+            pass
+
+
+def _construir(caminho: str, usecols: list | None, modelo, vetorizador, versao_modelo: str | None) -> ConjuntoDados:
+    # Versão do observador lida antes da base: uma alteração durante a
+    # montagem deixa este conjunto desatualizado e gera nova reconstrução
+    versao_observador = obter_observador(caminho).versao
+
+    df, _ = ler_base(caminho, usecols=usecols)
+    versao_dados = versao_base(caminho, usecols=usecols)
+    col_texto = detectar_coluna_texto(df)
+
+    delta = None
+    if modelo is not None and col_texto:
+        df, delta = classificar_delta(
+            df, col_texto, modelo, vetorizador, versao_modelo=versao_modelo, versao_dados=versao_dados,
+        )
+    else:
+        versao_modelo = None
+
+    colunas = hashlib.sha1(repr((col_texto, _chave_colunas(usecols))).encode("utf-8")).hexdigest()[:8]
+    nome = f"{versao_dados}_{versao_modelo or 'sem_modelo'}_{colunas}"
+    tabela, quadro, arquivo = _publicar_arrow(df, nome)
+
+    with _servico.lock:
+        _servico.versao += 1
+        conjunto = ConjuntoDados(
+            tabela, quadro, _servico.versao, caminho, _chave_colunas(usecols), versao_observador,
+            versao_dados, versao_modelo, col_texto, delta, arquivo,
+        )
+        _servico.atual = conjunto
+
+    print(
+        f"🗃️ Base compartilhada v{conjunto.versao} publicada ({len(conjunto)} linhas, "
+        f"dados {versao_dados}, modelo {versao_modelo or '—'})."
+    )
+    return conjunto
+
+
+def _valido(conjunto: ConjuntoDados | None, caminho: str, usecols: list | None, versao_modelo: str | None, versao_observador: int) -> bool:
+    return (
+        conjunto is not None
+        and conjunto.caminho_base == caminho
+        and conjunto.chave_colunas == _chave_colunas(usecols)
+        and conjunto.versao_observador == versao_observador
+        and (versao_modelo is None or conjunto.versao_modelo == versao_modelo)
+    )
+
+
+# =========================
+# Reconstrução em segundo plano
+# =========================
+def _reconstruir():
+    # Eventos que chegam durante a montagem são agrupados em uma nova rodada
+    while True:
+        with _servico.lock:
+            if not _servico.pendente:
+                _servico.thread = None
+                return
+            _servico.pendente = False
+            parametros = _servico.parametros
+        try:
+            with _servico.lock_construcao:
+                # Uma sessão pode ter montado esta versão enquanto a thread esperava
+                versao_observador = obter_observador(parametros["caminho"]).versao
+                if not _valido(_servico.atual, parametros["caminho"], parametros["usecols"], parametros["versao_modelo"], versao_observador):
+                    _construir(**parametros)
+        except Exception as e:
+            print(f"⚠️ Erro ao reconstruir a base compartilhada: {e}")
+
+
+def _ao_mudar_base(versao: int, hash_conteudo: str):
+    """
+    Callback do observador: agenda a reconstrução com os parâmetros da
+    última montagem (mesmo modelo e colunas).
+    """
+    with _servico.lock:
+        if _servico.parametros is None:
+            return
+        _servico.pendente = True
+        if _servico.thread is None:
+            _servico.thread = threading.Thread(target=_reconstruir, name="sigmaq-servico-dados", daemon=True)
+            _servico.thread.start()
+
+
+def _em_reconstrucao() -> bool:
+    with _servico.lock:
+        return _servico.thread is not None
+
+
+# =========================
+# API
+# =========================
+def obter_conjunto(
+    usecols: list | None = None, modelo=None, vetorizador=None,
+    versao_modelo: str | None = None, caminho: str | None = None,
+) -> ConjuntoDados:
+    """
+    Retorna a versão publicada da base para os dados atuais.
+
+    Sem `modelo`, qualquer versão publicada dos dados atuais serve
+    (classificada ou não). Com `modelo`, a versão devolvida tem as
+    predições de `versao_modelo`. Só uma montagem roda por vez: sessões
+    que chegam durante ela esperam e recebem o mesmo conjunto. Enquanto
+    o observador reconstrói a base em segundo plano, a versão anterior
+    continua sendo servida. Lança FileNotFoundError sem a planilha.
+    """
+    caminho = os.path.abspath(caminho or DEFAULT_PATH)
+    observador = obter_observador(caminho)
+
+    with _servico.lock:
+        if caminho not in _servico.inscritos:
+            observador.inscrever(_ao_mudar_base)
+            _servico.inscritos.add(caminho)
+
+        # Montagens sem modelo (e as do observador) reaproveitam o último modelo usado
+        mesmos_dados = _servico.parametros is not None and _servico.parametros["caminho"] == caminho
+        if modelo is None and mesmos_dados:
+            parametros = {**_servico.parametros, "usecols": usecols}
+        else:
+            parametros = {
+                "caminho": caminho, "usecols": usecols, "modelo": modelo,
+                "vetorizador": vetorizador, "versao_modelo": versao_modelo,
+            }
+        atual = _servico.atual
+
+    if _valido(atual, caminho, usecols, versao_modelo, observador.versao):
+        return atual
+    if atual is not None and _em_reconstrucao() and _valido(atual, caminho, usecols, versao_modelo, atual.versao_observador):
+        return atual
+
+    with _servico.lock_construcao:
+        atual = _servico.atual
+        if _valido(atual, caminho, usecols, versao_modelo, observador.versao):
+            return atual
+        conjunto = _construir(**parametros)
+        with _servico.lock:
+            _servico.parametros = parametros
+        return conjunto
+
+
+def versao_publicada() -> int:
+    """
+    Contador das versões publicadas no processo (muda a cada reconstrução).
+    """
+    with _servico.lock:
+        return _servico.versao
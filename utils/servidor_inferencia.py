@@ -0,0 +1,355 @@
+# ============================================
+# utils/servidor_inferencia.py
+# ============================================
+# Serviço local de inferência do SIGMA-Q.
+# Um único processo mantém os artefatos do model_manager
+# e atende o dashboard e a classificação em lote por HTTP
+# (TCP local ou socket Unix). Requisições concorrentes são
+# agrupadas em micro-lotes (janela máxima de latência) e
+# cada descrição distinta do lote é prevista uma única vez.
+#
+# Uso:
+#   python -m utils.servidor_inferencia --endereco 127.0.0.1:8765
+#   python -m utils.servidor_inferencia --endereco unix:/tmp/sigmaq.sock
+#
+# Endpoints:
+#   GET  /saude                          -> {"status", "versao_modelo"}
+#   POST /classificar       {"texto"}    -> {"categoria", "versao_modelo"}
+#   POST /classificar_lote  {"textos"}   -> {"categorias", "versao_modelo"}
+# ============================================
+
+import os
+import sys
+import json
+import socket
+import asyncio
+import argparse
+import threading
+import http.client
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.model_manager import obter_modelos, obter_modelos_versionados, versao_modelos
+from utils.inferencia import chave_texto, prever_textos
+
+# Endereço padrão (sobrescrito pela variável de ambiente SIGMAQ_INFERENCIA)
+ENDERECO_PADRAO = "127.0.0.1:8765"
+
+# Janela máxima (s) que uma requisição espera por companhia no micro-lote
+JANELA_LOTE = 0.010
+
+# Textos máximos por micro-lote
+MAX_LOTE = 4096
+
+# Tamanho máximo do corpo de uma requisição (bytes)
+MAX_CORPO = 64 * 1024 * 1024
+
+
+def _separar_endereco(endereco: str) -> tuple:
+    # "unix:/caminho" -> ("unix", caminho); "host:porta" -> ("tcp", (host, porta))
+    if endereco.startswith("unix:"):
+        return "unix", endereco[len("unix:"):]
+    host, _, porta = endereco.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(porta))
+
+
+# =========================
+# Micro-lotes
+# =========================
+class MicroLote:
+    """
+    Fila de pedidos (lista de textos + future). Um laço único junta os
+    pedidos que chegam dentro de `janela` segundos (até `max_lote` textos),
+    prevê as descrições distintas em uma thread e distribui as respostas.
+    """
+
+    def __init__(self, janela: float = JANELA_LOTE, max_lote: int = MAX_LOTE):
+        self.janela = janela
+        self.max_lote = max_lote
+        self.fila: asyncio.Queue = asyncio.Queue()
+        self.lotes = 0
+        self.textos = 0
+
+    async def prever(self, textos: list) -> tuple[list, str]:
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((textos, futuro))
+        return await futuro
+
+    async def executar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self.fila.get()]
+            total = len(pedidos[0][0])
+            limite = loop.time() + self.janela
+            while total < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = await asyncio.wait_for(self.fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                pedidos.append(pedido)
+                total += len(pedido[0])
+
+            try:
+                respostas = await loop.run_in_executor(None, self._prever_pedidos, [p[0] for p in pedidos])
+                for (_, futuro), resposta in zip(pedidos, respostas):
+                    if not futuro.done():
+                        futuro.set_result(resposta)
+            except Exception as e:
+                for _, futuro in pedidos:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+    def _prever_pedidos(self, lista_textos: list) -> list:
+        # Roda fora do event loop: dedup do lote inteiro + um único predict.
+        # Modelo e versão vêm da mesma leitura (troca de modelo no meio do lote)
+        modelo, vetorizador, versao = obter_modelos_versionados()
+        chaves = [[chave_texto(t) for t in textos] for textos in lista_textos]
+        unicos = list(dict.fromkeys(c for lista in chaves for c in lista))
+        previsoes = prever_textos(modelo, vetorizador, unicos) if unicos else np.array([])
+        mapa = dict(zip(unicos, np.asarray(previsoes).tolist()))
+        self.lotes += 1
+        self.textos += sum(len(lista) for lista in chaves)
+        return [([mapa[c] for c in lista], versao) for lista in chaves]
+
+
+# =========================
+# Servidor HTTP mínimo (keep-alive)
+# =========================
+class ServidorInferencia:
+    """
+    Servidor HTTP/1.1 assíncrono sem dependências externas.
+    Mantém as conexões abertas entre requisições (keep-alive).
+    """
+
+    def __init__(self, endereco: str = ENDERECO_PADRAO, janela: float = JANELA_LOTE, max_lote: int = MAX_LOTE):
+        self.endereco = endereco
+        self.janela = janela
+        self.max_lote = max_lote
+        self.lote = None
+
+    async def _responder(self, escritor, status: int, corpo: dict, manter: bool):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        motivo = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+        cabecalho = (
+            f"HTTP/1.1 {status} {motivo.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(dados)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+        )
+        escritor.write(cabecalho.encode("latin-1") + dados)
+        await escritor.drain()
+
+    async def _atender(self, metodo: str, rota: str, corpo: bytes) -> tuple[int, dict]:
+        if metodo == "GET" and rota == "/saude":
+            return 200, {
+                "status": "ok", "versao_modelo": versao_modelos(),
+                "lotes": self.lote.lotes, "textos": self.lote.textos,
+            }
+
+        if metodo != "POST" or rota not in ("/classificar", "/classificar_lote"):
+            return 404, {"erro": f"rota inexistente: {metodo} {rota}"}
+
+        try:
+            pedido = json.loads(corpo or b"{}")
+        except ValueError:
+            return 400, {"erro": "JSON inválido"}
+
+        if rota == "/classificar":
+            if "texto" not in pedido:
+                return 400, {"erro": "campo 'texto' ausente"}
+            categorias, versao = await self.lote.prever([str(pedido["texto"])])
+            return 200, {"categoria": categorias[0], "versao_modelo": versao}
+
+        textos = pedido.get("textos")
+        if not isinstance(textos, list):
+            return 400, {"erro": "campo 'textos' deve ser uma lista"}
+        categorias, versao = await self.lote.prever([str(t) for t in textos])
+        return 200, {"categorias": categorias, "versao_modelo": versao}
+
+    async def _conexao(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, rota, versao_http = linha.decode("latin-1").split()
+                except ValueError:
+                    await self._responder(escritor, 400, {"erro": "requisição inválida"}, False)
+                    break
+
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                manter = cabecalhos.get("connection", "").lower() != "close" and versao_http == "HTTP/1.1"
+                tamanho = int(cabecalhos.get("content-length", 0) or 0)
+                if tamanho > MAX_CORPO:
+                    await self._responder(escritor, 413, {"erro": "corpo muito grande"}, False)
+                    break
+                corpo = await leitor.readexactly(tamanho) if tamanho else b""
+
+                try:
+                    status, resposta = await self._atender(metodo, rota.split("?")[0], corpo)
+                except FileNotFoundError as e:
+                    status, resposta = 500, {"erro": str(e)}
+                except Exception as e:
+                    status, resposta = 500, {"erro": f"{type(e).__name__}: {e}"}
+
+                await self._responder(escritor, status, resposta, manter)
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self, pronto: threading.Event | None = None):
+        self.lote = MicroLote(self.janela, self.max_lote)
+        tarefa_lote = asyncio.create_task(self.lote.executar())
+
+        tipo, alvo = _separar_endereco(self.endereco)
+        if tipo == "unix":
+            if os.path.exists(alvo):
+                os.remove(alvo)
+            servidor = await asyncio.start_unix_server(self._conexao, path=alvo)
+        else:
+            servidor = await asyncio.start_server(self._conexao, host=alvo[0], port=alvo[1])
+
+        # Carrega os artefatos antes de aceitar a primeira requisição
+        await asyncio.get_running_loop().run_in_executor(None, obter_modelos)
+        print(f"🚀 Serviço de inferência em {self.endereco} (versão {versao_modelos()})")
+        if pronto is not None:
+            pronto.set()
+
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            tarefa_lote.cancel()
+
+
+# =========================
+# Cliente (conexão reutilizada)
+# =========================
+class _ConexaoUnix(http.client.HTTPConnection):
+    def __init__(self, caminho: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.caminho = caminho
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.caminho)
+
+
+class ClienteInferencia:
+    """
+    Cliente do serviço de inferência. Mantém uma conexão HTTP persistente
+    por thread. Expõe `predict(textos)`, então pode ser passado como
+    "modelo" para inferencia.classificar_descricoes.
+    """
+
+    def __init__(self, endereco: str | None = None, timeout: float = 60.0):
+        self.endereco = endereco or os.environ.get("SIGMAQ_INFERENCIA", ENDERECO_PADRAO)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conexao(self) -> http.client.HTTPConnection:
+        con = getattr(self._local, "conexao", None)
+        if con is None:
+            tipo, alvo = _separar_endereco(self.endereco)
+            if tipo == "unix":
+                con = _ConexaoUnix(alvo, self.timeout)
+            else:
+                con = http.client.HTTPConnection(alvo[0], alvo[1], timeout=self.timeout)
+            self._local.conexao = con
+        return con
+
+    def _requisitar(self, metodo: str, rota: str, corpo: dict | None = None) -> dict:
+        dados = json.dumps(corpo).encode("utf-8") if corpo is not None else None
+        cabecalhos = {"Content-Type": "application/json"} if dados is not None else {}
+        for tentativa in range(2):
+            con = self._conexao()
+            try:
+                con.request(metodo, rota, body=dados, headers=cabecalhos)
+                resposta = con.getresponse()
+                conteudo = json.loads(resposta.read() or b"{}")
+                if resposta.status != 200:
+                    raise RuntimeError(f"Serviço de inferência respondeu {resposta.status}: {conteudo.get('erro')}")
+                return conteudo
+            except (http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+                # Conexão antiga fechada pelo servidor: reabre uma vez
+                con.close()
+                self._local.conexao = None
+                if tentativa:
+                    raise
+
+    def saude(self) -> dict:
+        return self._requisitar("GET", "/saude")
+
+    def disponivel(self) -> bool:
+        try:
+            return self.saude().get("status") == "ok"
+        except Exception:
+            return False
+
+    def versao_modelo(self) -> str | None:
+        return self.saude().get("versao_modelo")
+
+    def classificar(self, texto: str):
+        return self._requisitar("POST", "/classificar", {"texto": texto})["categoria"]
+
+    def classificar_lote(self, textos: list) -> list:
+        return self._requisitar("POST", "/classificar_lote", {"textos": [str(t) for t in textos]})["categorias"]
+
+    def predict(self, textos) -> np.ndarray:
+        return np.array(self.classificar_lote(list(textos)), dtype=object)
+
+    def fechar(self):
+        con = getattr(self._local, "conexao", None)
+        if con is not None:
+            con.close()
+            self._local.conexao = None
+
+
+def obter_cliente(endereco: str | None = None) -> ClienteInferencia | None:
+    """
+    Retorna um cliente se o serviço estiver configurado (SIGMAQ_INFERENCIA
+    ou `endereco`) e respondendo; caso contrário None (inferência local).
+    """
+    endereco = endereco or os.environ.get("SIGMAQ_INFERENCIA")
+    if not endereco:
+        return None
+    cliente = ClienteInferencia(endereco, timeout=5.0)
+    if not cliente.disponivel():
+        return None
+    cliente.fechar()
+    cliente.timeout = 60.0
+    return cliente
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de inferência do SIGMA-Q")
+    parser.add_argument("--endereco", default=os.environ.get("SIGMAQ_INFERENCIA", ENDERECO_PADRAO),
+                        help="host:porta ou unix:/caminho/do/socket")
+    parser.add_argument("--janela-ms", type=float, default=JANELA_LOTE * 1000, help="latência máxima do micro-lote")
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE, help="textos por micro-lote")
+    args = parser.parse_args(argv)
+
+    servidor = ServidorInferencia(args.endereco, janela=args.janela_ms / 1000, max_lote=args.max_lote)
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        print("👋 Serviço de inferência encerrado.")
+
+
+if __name__ == "__main__":
+    main()
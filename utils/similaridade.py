@@ -0,0 +1,267 @@
+# ============================================
+# utils/similaridade.py
+# ============================================
+# Busca de defeitos similares no histórico do SIGMA-Q.
+# Cada combinação distinta (descrição, CATEGORIA, MOTIVO,
+# MODELO) vira uma linha de um índice TF-IDF (vetorizador
+# do modelo em uso, features do armazém). A consulta usa
+# similaridade de cosseno exata ou, em bases grandes,
+# LSH por projeções aleatórias com reordenação exata dos
+# candidatos. Linhas novas são acrescentadas ao índice
+# sem reconstruí-lo.
+# ============================================
+
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.lazy import importar_tardio
+from utils.features import features_textos, obter_armazem, ajustar_vetorizador
+from utils.text_normalizer import normalizar_texto, aplicar_unicos
+
+sparse = importar_tardio("scipy.sparse")
+preprocessamento = importar_tardio("sklearn.preprocessing")
+
+# =========================
+# Parâmetros
+# =========================
+# Colunas exibidas junto de cada vizinho (as ausentes na base são ignoradas)
+COLUNAS_INFO = ["CATEGORIA", "MOTIVO", "MODELO", "CATEGORIA_PREDITA"]
+
+# Acima deste número de linhas no índice, o modo "auto" usa LSH
+LIMITE_EXATO = 50_000
+
+# LSH por projeções aleatórias (SimHash): tabelas x bits por tabela
+N_TABELAS = 16
+BITS_POR_TABELA = 10
+SEMENTE = 42
+
+
+def _normalizar_descricoes(descricoes: pd.Series) -> pd.Series:
+    # Índice e consulta passam pela mesma normalização (acentos, erros de digitação)
+    return aplicar_unicos(descricoes.astype(str), normalizar_texto)
+
+
+def agrupar_defeitos(df: pd.DataFrame, col_texto: str, colunas_info: list | None = None) -> pd.DataFrame:
+    """
+    Uma linha por (descrição, colunas de informação) com o número de
+    OCORRENCIAS na base.
+    """
+    colunas = [col_texto] + [c for c in (colunas_info or COLUNAS_INFO) if c in df.columns and c != col_texto]
+    grupos = df[colunas].astype(str).value_counts(sort=False).reset_index(name="OCORRENCIAS")
+    return grupos.rename(columns={col_texto: "DESCRICAO"})
+
+
+# =========================
+# Índice
+# =========================
+class IndiceSimilaridade:
+    """
+    Índice de cosseno sobre as linhas de `agrupar_defeitos`.
+    `adicionar` acrescenta grupos novos (e atualiza as ocorrências dos já
+    indexados); `buscar` retorna os k vizinhos mais próximos.
+    """
+
+    def __init__(self, vetorizador, n_tabelas: int = N_TABELAS, bits: int = BITS_POR_TABELA, semente: int = SEMENTE):
+        self.vetorizador = vetorizador
+        self.n_tabelas = n_tabelas
+        self.bits = bits
+        self.semente = semente
+        self.lock = threading.Lock()
+        self.grupos = None
+        self.matriz = None
+        self._posicoes = {}
+        self._planos = None
+        self._baldes = [dict() for _ in range(n_tabelas)]
+
+    def __len__(self) -> int:
+        return 0 if self.grupos is None else len(self.grupos)
+
+    @staticmethod
+    def _chaves(grupos: pd.DataFrame) -> list:
+        return list(grupos.drop(columns="OCORRENCIAS").itertuples(index=False, name=None))
+
+    def removidos(self, grupos: pd.DataFrame) -> int:
+        """
+        Quantos grupos indexados não existem mais em `grupos`.
+        """
+        with self.lock:
+            return len(self) - sum(chave in self._posicoes for chave in self._chaves(grupos))
+
+    # -------------------------
+    # Construção incremental
+    # -------------------------
+    def _codigos(self, X) -> np.ndarray:
+        # Assinatura de `bits` sinais de projeção por tabela -> inteiro
+        if self._planos is None:
+            gerador = np.random.default_rng(self.semente)
+            self._planos = gerador.standard_normal((X.shape[1], self.n_tabelas * self.bits)).astype(np.float32)
+        sinais = np.asarray(X @ self._planos) > 0
+        pesos = 1 << np.arange(self.bits, dtype=np.int64)
+        return sinais.reshape(X.shape[0], self.n_tabelas, self.bits) @ pesos
+
+    def _indexar_baldes(self, codigos: np.ndarray, inicio: int):
+        for tabela in range(self.n_tabelas):
+            coluna = codigos[:, tabela]
+            ordem = np.argsort(coluna, kind="stable")
+            valores, cortes = np.unique(coluna[ordem], return_index=True)
+            baldes = self._baldes[tabela]
+            for valor, ids in zip(valores.tolist(), np.split(ordem + inicio, cortes[1:])):
+                existente = baldes.get(valor)
+                baldes[valor] = ids if existente is None else np.concatenate([existente, ids])
+
+    def adicionar(self, grupos: pd.DataFrame) -> int:
+        """
+        Acrescenta os grupos ainda não indexados. Retorna quantos entraram.
+        """
+        chaves = self._chaves(grupos)
+        with self.lock:
+            novo = np.array([chave not in self._posicoes for chave in chaves], dtype=bool)
+
+            # Ocorrências dos grupos já indexados podem ter mudado
+            if self.grupos is not None and (~novo).any():
+                posicoes = [self._posicoes[chave] for chave, n in zip(chaves, novo) if not n]
+                self.grupos.loc[posicoes, "OCORRENCIAS"] = grupos.loc[~novo, "OCORRENCIAS"].to_numpy()
+
+            if not novo.any():
+                return 0
+
+            novos = grupos[novo].reset_index(drop=True)
+            X = preprocessamento.normalize(features_textos(self.vetorizador, _normalizar_descricoes(novos["DESCRICAO"])).astype(np.float32))
+            inicio = len(self)
+
+            self.matriz = X if self.matriz is None else sparse.vstack([self.matriz, X], format="csr")
+            self.grupos = novos if self.grupos is None else pd.concat([self.grupos, novos], ignore_index=True)
+            for i, chave in enumerate(c for c, n in zip(chaves, novo) if n):
+                self._posicoes[chave] = inicio + i
+            self._indexar_baldes(self._codigos(X), inicio)
+            return len(novos)
+
+    # -------------------------
+    # Consulta
+    # -------------------------
+    def _vetor_consulta(self, texto: str):
+        q = self.vetorizador.transform([normalizar_texto(texto)]).astype(np.float32)
+        return preprocessamento.normalize(q)
+
+    def _candidatos(self, q) -> np.ndarray:
+        codigos = self._codigos(q)[0]
+        partes = [self._baldes[t].get(int(codigos[t])) for t in range(self.n_tabelas)]
+        partes = [p for p in partes if p is not None]
+        return np.unique(np.concatenate(partes)) if partes else np.array([], dtype=np.int64)
+
+    def buscar(self, texto: str, k: int = 10, modo: str = "auto") -> pd.DataFrame:
+        """
+        Os `k` grupos mais similares a `texto` (SIMILARIDADE = cosseno).
+        `modo`: "exato", "lsh" ou "auto" (LSH acima de LIMITE_EXATO linhas;
+        se o LSH achar menos de k candidatos, a busca exata é usada).
+        """
+        with self.lock:
+            if not len(self):
+                return pd.DataFrame(columns=["SIMILARIDADE", "DESCRICAO", "OCORRENCIAS"])
+
+            q = self._vetor_consulta(texto)
+            if modo == "auto":
+                modo = "lsh" if len(self) > LIMITE_EXATO else "exato"
+
+            ids = None
+            if modo == "lsh":
+                ids = self._candidatos(q)
+                if len(ids) < k:
+                    ids = None
+
+            matriz = self.matriz if ids is None else self.matriz[ids]
+            scores = np.asarray((matriz @ q.T).todense()).ravel()
+            k = min(k, len(scores))
+            melhores = np.argpartition(-scores, k - 1)[:k]
+            melhores = melhores[np.argsort(-scores[melhores], kind="stable")]
+            melhores = melhores[scores[melhores] > 0]
+            linhas = melhores if ids is None else ids[melhores]
+
+            resultado = self.grupos.iloc[linhas].reset_index(drop=True)
+            resultado.insert(0, "SIMILARIDADE", scores[melhores].round(4))
+            return resultado
+
+
+# =========================
+# Índice único por processo
+# =========================
+def vetorizador_do_modelo(modelo=None, vetorizador=None):
+    """
+    Vetorizador TF-IDF do modelo em uso (1º passo do Pipeline, do pacote
+    ou avulso). Sem modelo local (ex: inferência via serviço), retorna None.
+    """
+    if hasattr(modelo, "steps") and hasattr(modelo.steps[0][1], "vocabulary_"):
+        return modelo.steps[0][1]
+    if hasattr(modelo, "vetorizador_sklearn"):
+        return modelo.vetorizador_sklearn()
+    if hasattr(vetorizador, "vocabulary_"):
+        return vetorizador
+    return None
+
+
+def _vetorizador_padrao(descricoes: pd.Series):
+    # TF-IDF padrão do treinamento, ajustado sobre a base via armazém de features
+    from utils.model_trainer import novo_vetorizador
+    vetorizador = novo_vetorizador()
+    contagens, termos = obter_armazem(vetorizador).contagens(_normalizar_descricoes(descricoes))
+    return ajustar_vetorizador(vetorizador, contagens, termos)[0]
+
+
+class _IndiceAtual:
+    """
+    Índice da última base/modelo consultados. Compartilhado por todas as
+    sessões do Streamlit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chave = None
+        self.indice = None
+
+
+_atual = _IndiceAtual()
+
+
+def obter_indice(
+    df: pd.DataFrame, col_texto: str, modelo=None, vetorizador=None,
+    versao_modelo: str | None = None, versao_dados: str | None = None,
+) -> IndiceSimilaridade:
+    """
+    Retorna o índice da base `df`. Com as mesmas versões de dados e modelo,
+    o índice em memória é devolvido direto; com dados novos, só os grupos
+    novos são indexados; modelo novo (ou grupos removidos) reconstrói.
+    """
+    with _atual.lock:
+        indice = _atual.indice
+        if indice is not None and versao_dados and _atual.chave == (versao_dados, versao_modelo, col_texto):
+            return indice
+
+        grupos = agrupar_defeitos(df, col_texto)
+        reconstruir = (
+            indice is None or _atual.chave is None or _atual.chave[1:] != (versao_modelo, col_texto)
+            or list(indice.grupos.columns) != list(grupos.columns)
+            or indice.removidos(grupos) > 0
+        )
+        if reconstruir:
+            vetor = vetorizador_do_modelo(modelo, vetorizador) or _vetorizador_padrao(grupos["DESCRICAO"])
+            indice = IndiceSimilaridade(vetor)
+
+        adicionados = indice.adicionar(grupos)
+        _atual.indice, _atual.chave = indice, (versao_dados, versao_modelo, col_texto)
+
+    if adicionados:
+        print(f"🔎 Índice de similaridade: {adicionados} grupos indexados ({len(indice)} no total).")
+    return indice
+
+
+def buscar_similares(texto: str, k: int = 10, modo: str = "auto", indice: IndiceSimilaridade | None = None) -> pd.DataFrame:
+    """
+    API Python: os k defeitos históricos mais similares a `texto`, com
+    CATEGORIA, MOTIVO e MODELO. Usa `indice` ou o último índice construído
+    por obter_indice.
+    """
+    indice = indice if indice is not None else _atual.indice
+    if indice is None:
+        raise RuntimeError("Índice de similaridade ainda não construído (use obter_indice).")
+    return indice.buscar(texto, k=k, modo=modo)
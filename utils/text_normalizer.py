@@ -1,7 +1,51 @@
 import re
 import unicodedata
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
+from utils.instrumentacao import instrumentado
+
+
+# =========================
+# 📚 VOCABULÁRIO DE CORREÇÕES
+# =========================
+# Corrige erros de digitação comuns (vocabulário técnico SIGMA-Q)
+SUBSTITUICOES = {
+    # termos técnicos frequentes
+    "qeimado": "queimado",
+    "qseimado": "queimado",
+    "queimdo": "queimado",
+    "qeimdo": "queimado",
+    "queimmado": "queimado",
+    "blutooth": "bluetooth",
+    "bluetooh": "bluetooth",
+    "bluetoth": "bluetooth",
+    "tweter": "tweeter",
+    "tweteer": "tweeter",
+    "sem som": "sem áudio",
+    "audio": "áudio",
+    "autonaticamente": "automaticamente",
+    "defeito": "defeito",
+    "reincidencia": "reincidência",
+    "vibracao": "vibração",
+    "mancha escura": "mancha",
+}
+
+# Todas as correções compiladas em um único padrão (uma passada por texto).
+# As chaves mais longas vêm primeiro para que a alternância escolha o termo
+# completo; nenhuma correção gera texto que case com outra chave, então o
+# resultado é idêntico a aplicar um re.sub por entrada.
+_PADRAO_SUBSTITUICOES = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(SUBSTITUICOES, key=len, reverse=True)) + r")\b"
+)
+_PADRAO_DUPLICADAS = re.compile(r'\b(\w+)( \1\b)+')
+_PADRAO_PONTUACAO_FINAL = re.compile(r'[;.,]+$')
+_PADRAO_ESPACOS = re.compile(r'\s+')
+
+# Tamanho máximo do memo de textos normalizados (sobrevive aos reruns)
+TAMANHO_MEMO = 200_000
+
 
 # =========================
 # 🔧 FUNÇÃO PRINCIPAL DE LIMPEZA
@@ -15,6 +59,11 @@ def normalizar_texto(texto: str) -> str:
     if not isinstance(texto, str):
         return texto
 
+    return _normalizar_memo(texto)
+
+
+@lru_cache(maxsize=TAMANHO_MEMO)
+def _normalizar_memo(texto: str) -> str:
     # Remove acentos mantendo apenas caracteres ASCII
     texto = ''.join(
         c for c in unicodedata.normalize('NFD', texto)
@@ -24,46 +73,79 @@ def normalizar_texto(texto: str) -> str:
     # Converte tudo para minúsculas
     texto = texto.lower().strip()
 
-    # Corrige erros de digitação comuns (vocabulário técnico SIGMA-Q)
-    substituicoes = {
-        # termos técnicos frequentes
-        "qeimado": "queimado",
-        "qseimado": "queimado",
-        "queimdo": "queimado",
-        "qeimdo": "queimado",
-        "queimmado": "queimado",
-        "blutooth": "bluetooth",
-        "bluetooh": "bluetooth",
-        "bluetoth": "bluetooth",
-        "tweter": "tweeter",
-        "tweteer": "tweeter",
-        "sem som": "sem áudio",
-        "audio": "áudio",
-        "autonaticamente": "automaticamente",
-        "defeito": "defeito",
-        "reincidencia": "reincidência",
-        "vibracao": "vibração",
-        "mancha escura": "mancha",
-    }
-
-    for errado, certo in substituicoes.items():
-        texto = re.sub(rf"\b{errado}\b", certo, texto)
+    # Corrige erros de digitação comuns em uma única passada
+    texto = _PADRAO_SUBSTITUICOES.sub(lambda m: SUBSTITUICOES[m.group(0)], texto)
 
     # Remove palavras duplicadas consecutivas (ex: "ruido ruido")
-    texto = re.sub(r'\b(\w+)( \1\b)+', r'\1', texto)
+    texto = _PADRAO_DUPLICADAS.sub(r'\1', texto)
 
     # Remove pontuação no fim
-    texto = re.sub(r'[;.,]+$', '', texto)
+    texto = _PADRAO_PONTUACAO_FINAL.sub('', texto)
 
     # Normaliza espaços
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    texto = _PADRAO_ESPACOS.sub(' ', texto).strip()
 
     return texto
 
 
+# =========================
+# ⚙️ APLICAÇÃO SOBRE VALORES ÚNICOS
+# =========================
+def aplicar_unicos(serie: pd.Series, funcao) -> pd.Series:
+    """
+    Aplica `funcao` apenas aos valores distintos da série e replica o
+    resultado para todas as linhas (factorize + mapeamento por código).
+    Valores ausentes continuam ausentes.
+    """
+    codigos, unicos = pd.factorize(serie)
+    resultados = np.empty(len(unicos) + 1, dtype=object)
+    resultados[:-1] = [funcao(v) for v in unicos]
+    resultados[-1] = np.nan  # código -1 (ausente) aponta para a última posição
+    return pd.Series(resultados[codigos], index=serie.index, name=serie.name)
+
+
+def _strip_valor(valor):
+    # Equivalente ao .str.strip(): valores que não são texto viram NaN
+    return valor.strip() if isinstance(valor, str) else np.nan
+
+
+# =========================
+# 🏷️ NOMES DE COLUNAS
+# =========================
+def normalizar_colunas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Padroniza os nomes das colunas: maiúsculas, sem acentos e com "_"
+    no lugar de espaços (ex: "Desc. Falha" -> "DESC._FALHA").
+    """
+    df.columns = (
+        df.columns.astype(str).str.strip()
+        .str.upper()
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.replace(" ", "_")
+    )
+    return df
+
+
+# Colunas aceitas como descrição da falha, em ordem de preferência
+COLUNAS_DESCRICAO = ["DESCRICAO_DA_FALHA", "DESC_FALHA", "DESC._FALHA", "DESCRICAO"]
+
+
+def detectar_coluna_texto(df: pd.DataFrame) -> str | None:
+    """
+    Retorna o nome da coluna de descrição da falha (ou None).
+    """
+    for c in COLUNAS_DESCRICAO:
+        if c in df.columns:
+            return c
+    return None
+
+
 # =========================
 # 🧩 FUNÇÃO PARA DATAFRAMES
 # =========================
+@instrumentado()
 def normalizar_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Aplica normalização textual e padronização de campos em toda a base.
@@ -72,7 +154,7 @@ def normalizar_dataframe(df: pd.DataFrame) -> pd.DataFrame:
 
     for col in colunas_texto:
         if col in df.columns:
-            df[col] = df[col].astype(str).apply(normalizar_texto)
+            df[col] = aplicar_unicos(df[col].astype(str), normalizar_texto)
 
     # Padroniza colunas de categoria e motivo
     for col in ["Categoria", "Motivo"]:
@@ -80,6 +162,6 @@ def normalizar_dataframe(df: pd.DataFrame) -> pd.DataFrame:
             df[col] = df[col].astype(str).str.strip().str.upper()
 
     # Remove espaços de todas as colunas tipo string
-    df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+    df = df.apply(lambda x: aplicar_unicos(x, _strip_valor) if x.dtype == "object" else x)
 
     return df
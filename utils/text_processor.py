@@ -8,12 +8,29 @@
 
 import re
 import unicodedata
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 
-try:
-    import spacy
-except ImportError:
-    spacy = None
+from utils.text_normalizer import aplicar_unicos
+from utils.lazy import importar_tardio, disponivel
+from utils.instrumentacao import instrumentado
+
+# spaCy é opcional e pesado (~0,5 s de import): só é importado ao lematizar
+spacy = importar_tardio("spacy") if disponivel("spacy") else None
+
+# Componentes do pt_core_news_sm que a lematização não usa
+COMPONENTES_DESATIVADOS = ["parser", "ner"]
+
+# Tamanho máximo do cache de lemas (texto limpo -> texto lematizado)
+TAMANHO_CACHE_LEMAS = 200_000
+
+# Modelo spaCy carregado uma única vez por processo
+_NLP = None
+_NLP_CARREGADO = False
+
+# Cache de lemas compartilhado entre reruns
+_cache_lemas: OrderedDict = OrderedDict()
 
 
 # =========================
@@ -23,27 +40,35 @@ def carregar_spacy_modelo():
     """
     Carrega o modelo de linguagem em português do spaCy.
     Faz fallback automático caso o modelo não esteja instalado.
+    O modelo é carregado uma única vez por processo, sem parser e NER
+    (a lematização só precisa de tokenização, morfologia e lematizador).
     """
+    global _NLP, _NLP_CARREGADO
+    if _NLP_CARREGADO:
+        return _NLP
+
     if not spacy:
         print("⚠️ spaCy não instalado. Pré-processamento limitado.")
+        _NLP_CARREGADO = True
         return None
 
     try:
-        nlp = spacy.load("pt_core_news_sm")
+        nlp = spacy.load("pt_core_news_sm", disable=COMPONENTES_DESATIVADOS)
         print("✅ Modelo spaCy 'pt_core_news_sm' carregado com sucesso!")
-        return nlp
     except Exception as e:
         print(f"⚠️ Erro ao carregar modelo spaCy: {e}")
         print("Tentando baixar automaticamente...")
         try:
             from spacy.cli import download
             download("pt_core_news_sm")
-            nlp = spacy.load("pt_core_news_sm")
+            nlp = spacy.load("pt_core_news_sm", disable=COMPONENTES_DESATIVADOS)
             print("✅ Modelo spaCy instalado e carregado.")
-            return nlp
         except Exception as e2:
             print(f"❌ Falha ao baixar o modelo spaCy: {e2}")
-            return None
+            nlp = None
+
+    _NLP, _NLP_CARREGADO = nlp, True
+    return _NLP
 
 
 # =========================
@@ -69,6 +94,16 @@ def limpar_texto(texto: str) -> str:
 # =========================
 # LEMATIZAÇÃO COM spaCy
 # =========================
+def _lemas_doc(doc) -> str:
+    return " ".join(token.lemma_ for token in doc if not token.is_stop and not token.is_punct)
+
+
+def _guardar_lema(texto_limpo: str, lema: str):
+    _cache_lemas[texto_limpo] = lema
+    if len(_cache_lemas) > TAMANHO_CACHE_LEMAS:
+        _cache_lemas.popitem(last=False)
+
+
 def lematizar_texto(texto: str, nlp_model=None) -> str:
     """
     Lematiza um texto utilizando o modelo spaCy.
@@ -79,17 +114,46 @@ def lematizar_texto(texto: str, nlp_model=None) -> str:
     if not nlp_model:
         return texto_limpo
 
-    doc = nlp_model(texto_limpo)
-    tokens = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct]
-    return " ".join(tokens)
+    if texto_limpo not in _cache_lemas:
+        _guardar_lema(texto_limpo, _lemas_doc(nlp_model(texto_limpo)))
+    return _cache_lemas[texto_limpo]
+
+
+def lematizar_lote(textos_limpos: list, nlp_model=None, batch_size: int = 1000, n_process: int = 1) -> dict:
+    """
+    Lematiza uma lista de textos já limpos e distintos via nlp.pipe.
+    Textos já presentes no cache de lemas não passam pelo spaCy.
+    Retorna um dicionário texto_limpo -> texto lematizado.
+    """
+    if not nlp_model:
+        return {t: t for t in textos_limpos}
+
+    faltantes = [t for t in textos_limpos if t not in _cache_lemas]
+    resultado = {t: _cache_lemas[t] for t in textos_limpos if t in _cache_lemas}
+
+    docs = nlp_model.pipe(faltantes, batch_size=batch_size, n_process=n_process)
+    for texto_limpo, doc in zip(faltantes, docs):
+        lema = _lemas_doc(doc)
+        resultado[texto_limpo] = lema
+        _guardar_lema(texto_limpo, lema)
+
+    return resultado
 
 
 # =========================
 # PRÉ-PROCESSAMENTO EM LOTE
 # =========================
-def preprocessar_dataframe(df: pd.DataFrame, coluna_texto="DESCRIÇÃO DA FALHA") -> pd.DataFrame:
+@instrumentado()
+def preprocessar_dataframe(
+    df: pd.DataFrame,
+    coluna_texto="DESCRIÇÃO DA FALHA",
+    batch_size: int = 1000,
+    n_process: int = 1,
+) -> pd.DataFrame:
     """
     Aplica limpeza e lematização em toda a coluna de descrições.
+    Cada texto limpo distinto é lematizado uma única vez, em lotes de
+    `batch_size` documentos (`n_process` > 1 usa multiprocessamento do spaCy).
     Retorna o DataFrame atualizado com uma nova coluna 'TEXTO_PROCESSADO'.
     """
     if coluna_texto not in df.columns:
@@ -97,11 +161,11 @@ def preprocessar_dataframe(df: pd.DataFrame, coluna_texto="DESCRIÇÃO DA FALHA"
 
     nlp = carregar_spacy_modelo()
 
-    textos_processados = [
-        lematizar_texto(texto, nlp_model=nlp)
-        for texto in df[coluna_texto].astype(str)
-    ]
+    # Limpeza sobre valores distintos; lematização sobre textos limpos distintos
+    limpos = aplicar_unicos(df[coluna_texto].astype(str), limpar_texto)
+    codigos, unicos = pd.factorize(limpos)
+    lemas = lematizar_lote(list(unicos), nlp_model=nlp, batch_size=batch_size, n_process=n_process)
 
-    df["TEXTO_PROCESSADO"] = textos_processados
-    print(f"✅ {len(df)} textos processados com sucesso.")
+    df["TEXTO_PROCESSADO"] = np.array([lemas[t] for t in unicos], dtype=object)[codigos]
+    print(f"✅ {len(df)} textos processados com sucesso ({len(unicos)} distintos).")
     return df
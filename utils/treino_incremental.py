@@ -0,0 +1,166 @@
+# ============================================
+# utils/treino_incremental.py
+# ============================================
+# Treinamento incremental (online) do SIGMA-Q.
+# Alternativa ao refit completo do model_trainer:
+# HashingVectorizer (sem estado, não precisa de refit) +
+# classificadores SGD um-contra-todos atualizados com
+# partial_fit apenas sobre as linhas novas da base.
+# ============================================
+
+import os
+import time
+import hashlib
+import tempfile
+import numpy as np
+import joblib
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.exceptions import NotFittedError
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from utils.model_trainer import carregar_dados_treino, salvar_artefatos, _sem_progresso
+
+# Checkpoint do treinamento incremental
+ESTADO_PATH = os.path.join("model", "incremental", "estado.pkl")
+
+# Dimensão do espaço de hashing (colisões ficam desprezíveis para a base)
+N_FEATURES = 2 ** 20
+
+# Passadas do partial_fit sobre cada lote novo
+EPOCAS = 5
+
+
+# =========================
+# Classificador um-contra-todos incremental
+# =========================
+class ClassificadorIncremental(BaseEstimator, ClassifierMixin):
+    """
+    Um SGDClassifier binário (log_loss) por categoria.
+    Uma categoria nova ganha o seu próprio classificador na primeira vez
+    em que aparece, sem reiniciar os demais.
+    """
+
+    def __init__(self, alpha: float = 1e-5, epocas: int = EPOCAS, random_state: int = 42):
+        self.alpha = alpha
+        self.epocas = epocas
+        self.random_state = random_state
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return np.array(list(getattr(self, "classificadores_", {})), dtype=object)
+
+    def partial_fit(self, X, y):
+        if not hasattr(self, "classificadores_"):
+            self.classificadores_ = {}
+
+        y = np.asarray(y, dtype=object)
+        for categoria in dict.fromkeys(y):
+            if categoria not in self.classificadores_:
+                self.classificadores_[categoria] = SGDClassifier(
+                    loss="log_loss", alpha=self.alpha, random_state=self.random_state
+                )
+
+        rng = np.random.default_rng(self.random_state)
+        for _ in range(self.epocas):
+            ordem = rng.permutation(X.shape[0])
+            X_ep, y_ep = X[ordem], y[ordem]
+            for categoria, clf in self.classificadores_.items():
+                clf.partial_fit(X_ep, (y_ep == categoria).astype(int), classes=[0, 1])
+        return self
+
+    def fit(self, X, y):
+        self.classificadores_ = {}
+        return self.partial_fit(X, y)
+
+    def decision_function(self, X) -> np.ndarray:
+        # NotFittedError é um ValueError: mensagem clara em vez do erro do numpy
+        if not getattr(self, "classificadores_", None):
+            raise NotFittedError("ClassificadorIncremental sem categorias treinadas: chame fit ou partial_fit antes.")
+        return np.column_stack([clf.decision_function(X) for clf in self.classificadores_.values()])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+
+def novo_pipeline_incremental() -> Pipeline:
+    """
+    Pipeline compatível com o model_manager: o passo "tfidf" é o
+    HashingVectorizer (sem vocabulário a ajustar).
+    """
+    return Pipeline([
+        ("tfidf", HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), alternate_sign=False)),
+        ("clf", ClassificadorIncremental()),
+    ])
+
+
+# =========================
+# Checkpoint
+# =========================
+def _assinatura(texto, categoria) -> str:
+    return hashlib.sha1(f"{texto}\x1f{categoria}".encode("utf-8")).hexdigest()
+
+
+def carregar_estado() -> dict | None:
+    try:
+        return joblib.load(ESTADO_PATH)
+    except Exception:
+        return None
+
+
+def _salvar_estado(estado: dict):
+    os.makedirs(os.path.dirname(ESTADO_PATH), exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(ESTADO_PATH), suffix=".tmp")
+    os.close(fd)
+    joblib.dump(estado, temporario)
+    os.replace(temporario, ESTADO_PATH)
+
+
+# =========================
+# Treinamento incremental
+# =========================
+def treinar_incremental(publicar: bool = False, progresso=_sem_progresso) -> tuple[Pipeline, int]:
+    """
+    Atualiza o modelo incremental apenas com as linhas acrescentadas à
+    base desde o último checkpoint e persiste o novo estado.
+
+    Se alguma linha já consumida foi alterada (a assinatura da última linha
+    processada não confere), o estado é descartado e o treino recomeça.
+    Com `publicar=True` o modelo também substitui o modelo ativo em model/.
+    Retorna (pipeline, quantidade de linhas novas consumidas).
+    """
+    textos, rotulos = carregar_dados_treino(progresso)
+    estado = carregar_estado()
+
+    if estado is not None:
+        ultimo = estado["ultimo_indice"]
+        if ultimo not in textos.index or _assinatura(textos.loc[ultimo], rotulos.loc[ultimo]) != estado["assinatura"]:
+            print("⚠️ Linhas já treinadas foram alteradas — reiniciando o modelo incremental.")
+            estado = None
+
+    if estado is None:
+        estado = {"pipeline": novo_pipeline_incremental(), "ultimo_indice": -1, "assinatura": None, "linhas": 0}
+
+    novas = textos.index > estado["ultimo_indice"]
+    pipeline = estado["pipeline"]
+
+    if novas.any():
+        progresso(0.40, f"🧠 Atualizando modelo incremental ({int(novas.sum())} linhas novas)...")
+        X = pipeline.named_steps["tfidf"].transform(textos[novas].astype(str))
+        pipeline.named_steps["clf"].partial_fit(X, rotulos[novas].to_numpy())
+
+        ultimo = textos.index[-1]
+        estado.update(
+            ultimo_indice=ultimo,
+            assinatura=_assinatura(textos.loc[ultimo], rotulos.loc[ultimo]),
+            linhas=estado["linhas"] + int(novas.sum()),
+            atualizado_em=time.time(),
+        )
+        progresso(0.90, "💾 Salvando checkpoint...")
+        _salvar_estado(estado)
+
+        if publicar:
+            salvar_artefatos(pipeline)
+
+    return pipeline, int(novas.sum())
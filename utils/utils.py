@@ -1,6 +1,8 @@
 import pandas as pd
 import os
 
+from utils.ingestao_excel import ler_planilha
+
 def carregar_dados(caminho_arquivo=None):
     """
     Carrega o arquivo Excel da base de dados e retorna um DataFrame limpo.
@@ -19,8 +21,8 @@ def carregar_dados(caminho_arquivo=None):
     if not os.path.exists(caminho_arquivo):
         raise FileNotFoundError(f"❌ Arquivo não encontrado: {caminho_arquivo}")
 
-    # Carrega a planilha
-    df = pd.read_excel(caminho_arquivo, engine="openpyxl")
+    # Carrega a planilha (leitura em streaming, ver utils.ingestao_excel)
+    df = ler_planilha(caminho_arquivo)
 
 
     # Padroniza nomes das colunas